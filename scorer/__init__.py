@@ -0,0 +1,28 @@
+"""
+Rubric-based communication scorer.
+
+Headless scoring library behind the Streamlit app. Importing it does no UI
+work and starts no NLP engines - LanguageTool and VADER load lazily on the
+first score (see scorer.engines).
+"""
+from .analyzers import (
+    analyze_salutation, analyze_keywords, analyze_flow, analyze_speech_rate,
+    analyze_grammar_advanced, analyze_grammar_fallback, analyze_vocabulary,
+    analyze_clarity, analyze_engagement_advanced, analyze_engagement_fallback,
+)
+from .core import score_transcript
+from .document import Document
+from .engines import EngineUnavailable, advanced_nlp_available, warm_up
+from .result import ScoreResult
+from .samples import SAMPLE_TRANSCRIPT
+
+
+def __getattr__(name):
+    # batch pulls in multiprocessing and frame pandas - only import them when asked for
+    if name == 'score_transcripts':
+        from .batch import score_transcripts
+        return score_transcripts
+    if name == 'score_frame':
+        from .frame import score_frame
+        return score_frame
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
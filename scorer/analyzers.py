@@ -0,0 +1,362 @@
+"""
+Rubric criteria - each analyze_* function scores one part of the rubric.
+"""
+import re
+
+from .checks import check_grammar, polarity_scores
+from .document import as_document
+from .matcher import PhraseMatcher
+
+MUST_HAVE_PHRASES = {
+    'Name': ['my name is', 'myself', 'i am', "i'm"],
+    'Age': ['year', 'age'],
+    'School/Class': ['school', 'class', 'grade', 'studying'],
+    'Family': ['family', 'mother', 'father', 'parents', 'siblings', 'brother', 'sister'],
+    'Hobbies/Interest': ['hobby', 'hobbies', 'enjoy', 'like', 'love', 'play', 'playing', 'interest', 'free time']
+}
+
+GOOD_TO_HAVE_PHRASES = {
+    'About Family': ['special thing about', 'my family is', 'kind', 'caring'],
+    'Origin/Location': ['from', 'live in', 'staying in', 'born in', 'parents are from'],
+    'Ambition/Goal/Dream': ['goal', 'dream', 'ambition', 'want to', 'aspire', 'improve', 'future'],
+    'Fun fact/Unique thing': ['fun fact', 'interesting', 'unique', 'special about me', "don't know about me"],
+    'Strengths/Achievements': ['strength', 'achievement', 'good at', 'best at', 'proud of']
+}
+
+CLOSING_PHRASES = ['thank you', 'thanks', "that's all", 'that is all']
+
+OPENING_RE = re.compile(r'(hi|hello|good morning|good afternoon|good evening)')
+NAME_INTRO_RE = re.compile(r'(my name is|myself|i am|i\'m)\s+[A-Za-z]+', re.IGNORECASE)
+
+FILLER_WORDS = ['um', 'uh', 'like', 'you know', 'so', 'actually', 'basically', 
+                'right', 'i mean', 'well', 'kinda', 'sort of', 'okay', 'hmm', 'ah']
+
+POSITIVE_WORDS = frozenset([
+    'enjoy', 'love', 'like', 'interesting', 'excited', 'happy', 
+    'great', 'wonderful', 'amazing', 'fantastic', 'favorite', 
+    'special', 'kind', 'explore', 'improve', 'discover', 'grateful',
+    'good', 'best', 'thank', 'appreciate', 'enthusiastic', 'passionate',
+    'fun', 'awesome', 'excellent', 'beautiful', 'brilliant', 'perfect',
+    'nice', 'lovely', 'pleasant', 'delightful', 'marvelous'])
+
+NEGATIVE_WORDS = frozenset([
+    'hate', 'boring', 'bad', 'terrible', 'awful', 'dislike', 
+    'sad', 'angry', 'anxious', 'dull', 'stole', 'worst', 'horrible'])
+
+# Tails of the two keyword patterns that aren't plain phrases:
+#   Name: (my name is|myself|i am|i'm)\s+[A-Z][a-z]+
+#   Age:  \d+\s*years?\s*old | age\s*\d+
+NAME_TAIL_RE = re.compile(r'\s+[A-Z][a-z]+', re.IGNORECASE)
+YEARS_OLD_TAIL_RE = re.compile(r's?\s*old')
+AGE_NUMBER_TAIL_RE = re.compile(r'\s*\d')
+
+def _name_follows(text, start, end):
+    return NAME_TAIL_RE.match(text, end) is not None
+
+def digits_before(text, start):
+    i = start - 1
+    while i >= 0 and text[i].isspace():
+        i -= 1
+    return i >= 0 and text[i].isdecimal()
+
+def _years_old(text, start, end):
+    return digits_before(text, start) and YEARS_OLD_TAIL_RE.match(text, end) is not None
+
+def _age_number(text, start, end):
+    return AGE_NUMBER_TAIL_RE.match(text, end) is not None
+
+PHRASE_CHECKS = {
+    ('Name', 'my name is'): _name_follows,
+    ('Name', 'myself'): _name_follows,
+    ('Name', 'i am'): _name_follows,
+    ('Name', "i'm"): _name_follows,
+    ('Age', 'year'): _years_old,
+    ('Age', 'age'): _age_number,
+}
+
+def _rubric_rules():
+    for categories in (MUST_HAVE_PHRASES, GOOD_TO_HAVE_PHRASES):
+        for category, phrases in categories.items():
+            for phrase in phrases:
+                yield phrase, category, False, PHRASE_CHECKS.get((category, phrase))
+    for phrase in CLOSING_PHRASES:
+        yield phrase, 'closing', False
+    for phrase in FILLER_WORDS:
+        yield phrase, 'filler', True
+    for word in POSITIVE_WORDS:
+        yield word, 'positive', True
+    for word in NEGATIVE_WORDS:
+        yield word, 'negative', True
+
+_rubric_matcher = None
+
+def rubric_matcher():
+    """
+    Every rubric phrase in one matcher - a single scan of the lowercased text
+    yields the keyword categories, closings, fillers and sentiment words.
+    Compiled on first use and shared afterwards.
+    """
+    global _rubric_matcher
+    if _rubric_matcher is None:
+        _rubric_matcher = PhraseMatcher(_rubric_rules())
+    return _rubric_matcher
+
+# Checked in order against the start of the transcript - the first level with a phrase in it wins
+SALUTATION_LEVELS = [
+    (5, "Excellent - Enthusiastic introduction", ['i am excited to introduce', 'feeling great']),
+    (4, "Good - Professional greeting", ['good morning', 'good afternoon', 'good evening', 'good day', 'hello everyone']),
+    (2, "Normal - Basic greeting", ['hi', 'hello']),
+]
+
+FALLBACK_GRAMMAR_CHECKS = [
+    (re.compile(r'\bmyself\s+[A-Z]'), "Use 'I am' instead of 'myself'"),
+    (re.compile(r'\b(ain\'t|gonna|wanna|gotta)\b', re.IGNORECASE), "Informal contractions"),
+    (re.compile(r'\bi\s+[a-z]'), "'I' should be capitalized"),
+    (re.compile(r'\s+[,.]'), "Spacing issues"),
+]
+
+def analyze_salutation(doc):
+    """Score salutation level (0-5 points) - EXACT rubric match"""
+    doc = as_document(doc)
+    return salutation_from_start(doc.lower_stripped[:50])
+
+def salutation_from_start(text_start):
+    """Salutation points for the first 50 characters of the lowercased, stripped transcript"""
+    for points, label, phrases in SALUTATION_LEVELS:
+        if any(phrase in text_start for phrase in phrases):
+            return points, label
+    
+    return 0, "No salutation found"
+
+def analyze_keywords(doc, semantic=None):
+    """
+    Score keyword presence (0-30 points) - EXACT rubric match
+    Must-have: 4 points each (max 20)
+    Good-to-have: 2 points each (max 10)
+    semantic: categories found by scorer.semantic, counted on top of the phrase matches
+    """
+    return keywords_from_hits(as_document(doc).match(rubric_matcher()), semantic)
+
+def keywords_from_hits(hits, semantic=None):
+    """Keyword points from the per-category counts of the rubric matcher (plus semantic matches)"""
+    semantic = semantic or ()
+    must_have_found = []
+    must_have_score = 0
+    for key in MUST_HAVE_PHRASES:
+        if hits[key] or key in semantic:
+            must_have_found.append(key)
+            must_have_score += 4
+    
+    good_to_have_found = []
+    good_to_have_score = 0
+    for key in GOOD_TO_HAVE_PHRASES:
+        if hits[key] or key in semantic:
+            good_to_have_found.append(key)
+            good_to_have_score += 2
+    
+    must_have_score = min(must_have_score, 20)
+    good_to_have_score = min(good_to_have_score, 10)
+    
+    total_score = must_have_score + good_to_have_score
+    
+    return total_score, must_have_found, good_to_have_found
+
+def analyze_flow(doc, semantic=None):
+    """
+    Score flow/structure (0-5 points) - EXACT rubric match
+    Order: Salutation → Name → Mandatory details → Optional Details → Closing
+    semantic: {category: first sentence} from scorer.semantic - a name given in
+    other words in the first two sentences also counts
+    """
+    doc = as_document(doc)
+    
+    has_opening = bool(OPENING_RE.match(doc.lower_stripped))
+    has_closing = doc.match(rubric_matcher())['closing'] > 0
+    
+    name_early = False
+    if doc.sentence_count >= 1:
+        first_two = ' '.join(doc.text[start:end] for start, end in doc.sentence_spans[:2]).lower()
+        name_early = bool(NAME_INTRO_RE.search(first_two))
+    if semantic and semantic.get('Name', 2) < 2:
+        name_early = True
+    
+    return flow_from(has_opening, name_early, has_closing)
+
+def flow_from(has_opening, name_early, has_closing):
+    if has_opening and name_early and has_closing:
+        return 5, "Excellent flow - Proper structure followed"
+    else:
+        return 0, "Flow not followed - Missing proper opening, name introduction, or closing"
+
+def analyze_speech_rate(word_count, duration_sec):
+    """
+    Score speech rate (0-10 points) - EXACT rubric match
+    Based on WPM (Words Per Minute)
+    """
+    wpm = (word_count / duration_sec) * 60
+    
+    if wpm > 161:
+        return 2, wpm, "Too Fast"
+    elif 141 <= wpm <= 160:
+        return 6, wpm, "Fast (Good)"
+    elif 111 <= wpm <= 140:
+        return 10, wpm, "Ideal pace"
+    elif 81 <= wpm <= 110:
+        return 6, wpm, "Slow (Acceptable)"
+    else:  
+        return 2, wpm, "Too Slow"
+
+def analyze_grammar_advanced(doc, strict=False):
+    """
+    Score grammar using LanguageTool (0-10 points) - EXACT rubric match
+    Formula: Grammar Score = 1 - min(errors_per_100_words / 10, 1)
+    With strict=True LanguageTool failures raise instead of falling back.
+    """
+    doc = as_document(doc)
+    
+    try:
+        matches = check_grammar(doc.text)
+        error_count = len(matches)
+        
+        errors_per_100 = (error_count / doc.word_count) * 100
+        
+        grammar_ratio = 1 - min(errors_per_100 / 10, 1)
+        
+        issues = [match['rule_id'] for match in matches[:3]]  # Top 3 issues
+        
+        return grammar_points(grammar_ratio), issues, grammar_ratio, error_count
+    except Exception:
+        if strict:
+            raise
+        return analyze_grammar_fallback(doc)
+
+def analyze_grammar_fallback(doc):
+    """Fallback grammar check if LanguageTool not available"""
+    doc = as_document(doc)
+    issues = [message for pattern, message in FALLBACK_GRAMMAR_CHECKS if pattern.search(doc.text)]
+    
+    error_count = len(issues)
+    errors_per_100 = (error_count / doc.word_count) * 100
+    grammar_ratio = 1 - min(errors_per_100 / 10, 1)
+    
+    return grammar_points(grammar_ratio), issues, grammar_ratio, error_count
+
+def grammar_points(grammar_ratio):
+    if grammar_ratio >= 0.9:
+        return 10
+    elif grammar_ratio >= 0.7:
+        return 8
+    elif grammar_ratio >= 0.5:
+        return 6
+    elif grammar_ratio >= 0.3:
+        return 4
+    else:
+        return 2
+
+def analyze_vocabulary(doc):
+    """
+    Score vocabulary richness using TTR (0-10 points) - EXACT rubric match
+    TTR = Distinct words ÷ Total words
+    """
+    words = as_document(doc).tokens
+    unique_words = set(w.lower() for w in words if w.isalpha())
+    ttr = len(unique_words) / len(words)
+    
+    return vocabulary_points(ttr), ttr, len(unique_words)
+
+def vocabulary_points(ttr):
+    if ttr >= 0.9:
+        return 10
+    elif ttr >= 0.7:
+        return 8
+    elif ttr >= 0.5:
+        return 6
+    elif ttr >= 0.3:
+        return 4
+    else:
+        return 2
+
+def analyze_clarity(doc):
+    """
+    Score clarity based on filler words (0-15 points) - EXACT rubric match
+    Filler words from rubric: um, uh, like, you know, so, actually, basically, right, i mean, well, kinda, sort of, okay, hmm, ah
+    """
+    doc = as_document(doc)
+    filler_count = doc.match(rubric_matcher())['filler']
+    
+    filler_rate = (filler_count / doc.word_count) * 100
+    
+    return clarity_points(filler_rate), filler_count, filler_rate
+
+def clarity_points(filler_rate):
+    if filler_rate <= 3:
+        return 15
+    elif filler_rate <= 6:
+        return 12
+    elif filler_rate <= 9:
+        return 9
+    elif filler_rate <= 12:
+        return 6
+    else:  
+        return 3
+
+def analyze_engagement_advanced(doc, strict=False):
+    """
+    Score engagement using VADER sentiment (0-15 points) - EXACT rubric match
+    Uses VADER to calculate positive sentiment probability (0 to 1)
+    With strict=True VADER failures raise instead of falling back.
+    """
+    doc = as_document(doc)
+    
+    try:
+        scores = polarity_scores(doc.text)
+        positive_score = scores['pos']  
+        
+        return engagement_points(positive_score), positive_score, scores['compound']
+    except Exception:
+        if strict:
+            raise
+        return analyze_engagement_fallback(doc)
+
+
+def analyze_engagement_fallback(doc):
+    """Fallback engagement analysis if VADER not available"""
+    doc = as_document(doc)
+    hits = doc.match(rubric_matcher())
+    
+    positive_count = hits['positive']
+    positive_score = fallback_positive_score(positive_count, hits['negative'], len(doc.lower_tokens))
+    
+    return engagement_points(positive_score), positive_score, positive_count
+
+def fallback_positive_score(positive_count, negative_count, token_count):
+    """Word-based stand-in for VADER's positive score"""
+    positive_rate = (positive_count / token_count) * 100
+    
+    if positive_rate >= 8:
+        positive_score = 0.9
+    elif positive_rate >= 6:
+        positive_score = 0.7
+    elif positive_rate >= 4:
+        positive_score = 0.5
+    elif positive_rate >= 2:
+        positive_score = 0.3
+    else:
+        positive_score = 0.1
+    
+    if negative_count > 0:
+        positive_score = max(positive_score - (negative_count * 0.1), 0.1)
+    
+    return positive_score
+
+def engagement_points(positive_score):
+    if positive_score >= 0.9:
+        return 15
+    elif positive_score >= 0.7:
+        return 12
+    elif positive_score >= 0.5:
+        return 9
+    elif positive_score >= 0.3:
+        return 6
+    else:
+        return 3
@@ -0,0 +1,414 @@
+"""
+Grammar backends - where LanguageTool checks actually run.
+
+InProcessBackend uses the process-wide language_tool_python instance
+(the default). ServerPoolBackend talks HTTP to a pool of local LanguageTool
+servers - spawned and supervised here, or already running elsewhere - so
+checks run concurrently instead of queueing behind one JVM handle:
+
+    * several short texts are joined into one request (up to batch_chars),
+    * requests are spread over the servers, one in flight per server,
+    * every request has a timeout, and a server that times out is restarted,
+    * spawned servers whose resident memory passes max_rss_mb are recycled.
+
+Every backend returns matches as plain dicts (see match_to_dict).
+Point a pool at the stub server in scorer.ltstub to benchmark without a JVM.
+"""
+import atexit
+import http.client
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from .engines import LANGUAGE, EngineUnavailable, get_language_tool, restart_language_tool
+
+# Texts sent to LanguageTool together are separated as paragraphs
+BATCH_SEPARATOR = '\n\n'
+DEFAULT_BATCH_CHARS = 20_000
+DEFAULT_TIMEOUT = 30.0
+STARTUP_TIMEOUT = 120.0
+# How long a check waits for a free server before giving up
+ACQUIRE_TIMEOUT = STARTUP_TIMEOUT + DEFAULT_TIMEOUT
+
+
+def match_to_dict(match):
+    """language_tool_python Match -> plain dict"""
+    return {
+        'rule_id': match.ruleId,
+        'offset': match.offset,
+        'length': match.errorLength,
+        'message': match.message,
+        'category': match.category,
+        'replacements': list(match.replacements[:3]),
+    }
+
+
+def api_match_to_dict(match):
+    """LanguageTool HTTP API match -> the same plain dict"""
+    rule = match.get('rule', {})
+    return {
+        'rule_id': rule.get('id'),
+        'offset': match['offset'],
+        'length': match['length'],
+        'message': match.get('message', ''),
+        'category': rule.get('category', {}).get('id'),
+        'replacements': [r['value'] for r in match.get('replacements', [])[:3]],
+    }
+
+
+def join_batch(texts):
+    """Join texts into one request body; returns (body, start offset of each text)"""
+    starts = []
+    position = 0
+    for text in texts:
+        starts.append(position)
+        position += len(text) + len(BATCH_SEPARATOR)
+    return BATCH_SEPARATOR.join(texts), starts
+
+
+def split_batch(texts, starts, matches):
+    """Hand each match of a joined request back to its text, with offsets relative to that text"""
+    results = [[] for _ in texts]
+    for match in matches:
+        i = bisect_right(starts, match['offset']) - 1
+        offset = match['offset'] - starts[i]
+        # Anything flagged in the separator itself belongs to no text
+        if offset + match['length'] <= len(texts[i]):
+            results[i].append(dict(match, offset=offset))
+    return results
+
+
+def _batches(texts, batch_chars):
+    batch = []
+    size = 0
+    for i, text in enumerate(texts):
+        if batch and size + len(text) > batch_chars:
+            yield batch
+            batch = []
+            size = 0
+        batch.append(i)
+        size += len(text) + len(BATCH_SEPARATOR)
+    if batch:
+        yield batch
+
+
+class GrammarBackend:
+    """
+    check_many(texts) -> one list of match dicts per text. join=False checks
+    every text on its own, for texts whose matches must not depend on what
+    else is in the request.
+    """
+    name = 'grammar'
+
+    def check(self, text):
+        return self.check_many([text])[0]
+
+    def check_many(self, texts, join=True):
+        raise NotImplementedError
+
+    def start(self):
+        """Bring the backend up now instead of on the first check"""
+        return self
+
+    def warm(self):
+        """True once the backend can serve requests"""
+        return True
+
+    def close(self):
+        pass
+
+
+class InProcessBackend(GrammarBackend):
+    """The shared in-process LanguageTool from scorer.engines; one joined request per call"""
+    name = 'languagetool'
+
+    def check_many(self, texts, join=True):
+        if not texts:
+            return []
+        if get_language_tool() is None:
+            raise EngineUnavailable("LanguageTool is not available")
+        if not join:
+            return [[match_to_dict(m) for m in self._check(text)] for text in texts]
+        body, starts = join_batch(texts)
+        return split_batch(texts, starts, [match_to_dict(m) for m in self._check(body)])
+
+    def _check(self, text):
+        try:
+            return get_language_tool().check(text)
+        except Exception:
+            # The JVM may have died mid-request - restart it and retry once
+            return restart_language_tool().check(text)
+
+    def start(self):
+        if get_language_tool() is None:
+            raise EngineUnavailable("LanguageTool is not available")
+        return self
+
+    def warm(self):
+        return get_language_tool() is not None
+
+
+def _rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class LanguageToolServer:
+    """
+    One LanguageTool HTTP server. With a command it is spawned (and respawned)
+    here; with only a url it is assumed to be managed elsewhere.
+    """
+
+    def __init__(self, url, command=None, language=LANGUAGE, timeout=DEFAULT_TIMEOUT):
+        self.url = url.rstrip('/')
+        self.command = command
+        self.language = language
+        self.timeout = timeout
+        self.process = None
+        self.requests = 0
+        self.restarts = 0
+        parts = urlsplit(self.url)
+        self._host, self._port, self._path = parts.hostname, parts.port, parts.path
+        self._conn = None
+
+    def start(self):
+        if self.command is not None:
+            self.process = subprocess.Popen(self.command, stdin=subprocess.DEVNULL,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._wait_ready()
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if self.process is not None and self.process.poll() is not None:
+                raise EngineUnavailable(f"LanguageTool server {self.url} exited during startup")
+            try:
+                self._request('GET', '/v2/languages', timeout=5)
+                return
+            except (OSError, http.client.HTTPException):
+                if time.monotonic() > deadline:
+                    raise EngineUnavailable(f"LanguageTool server {self.url} did not start")
+                time.sleep(0.2)
+
+    def _request(self, method, path, body=None, timeout=None):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self._host, self._port, timeout=timeout or self.timeout)
+            self._conn.connect()
+            # Headers and body go out as separate writes - don't let Nagle hold the body back
+            self._conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._conn.timeout = timeout or self.timeout
+        if self._conn.sock is not None:
+            self._conn.sock.settimeout(self._conn.timeout)
+        headers = {'Content-Type': 'application/x-www-form-urlencoded', 'Accept': 'application/json'}
+        try:
+            self._conn.request(method, self._path + path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = None
+            raise
+        if response.status != 200:
+            raise EngineUnavailable(f"LanguageTool server {self.url} returned {response.status}")
+        return json.loads(data)
+
+    def check(self, text):
+        body = urlencode({'language': self.language, 'text': text}).encode('ascii')
+        self.requests += 1
+        return [api_match_to_dict(m) for m in self._request('POST', '/v2/check', body)['matches']]
+
+    def alive(self):
+        return self.process is None or self.process.poll() is None
+
+    def rss_mb(self):
+        return _rss_mb(self.process.pid) if self.process is not None else None
+
+    def restart(self):
+        if self.command is None:
+            return
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def stop(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+
+def languagetool_command(port):
+    """Command line for a local LanguageTool server (downloads LanguageTool if needed)"""
+    from language_tool_python.download_lt import download_lt
+    from language_tool_python.utils import get_server_cmd
+    download_lt()
+    return get_server_cmd(port)
+
+
+def stub_command(port, delay_ms=0):
+    """Command line for the stub server in scorer.ltstub"""
+    return [sys.executable, '-m', 'scorer.ltstub', '--port', str(port), '--delay-ms', str(delay_ms)]
+
+
+class ServerPoolBackend(GrammarBackend):
+    """
+    Pool of LanguageTool HTTP servers.
+
+    urls: use servers that are already running, or
+    size + command(port): spawn that many servers on consecutive ports from start_port.
+    """
+    name = 'languagetool-server'
+
+    def __init__(self, urls=None, size=None, command=languagetool_command, start_port=8081,
+                 language=LANGUAGE, timeout=DEFAULT_TIMEOUT, batch_chars=DEFAULT_BATCH_CHARS,
+                 max_rss_mb=None, acquire_timeout=ACQUIRE_TIMEOUT):
+        if urls:
+            self.servers = [LanguageToolServer(url, language=language, timeout=timeout) for url in urls]
+        else:
+            size = size or os.cpu_count() or 1
+            self.servers = [
+                LanguageToolServer(f'http://127.0.0.1:{port}', command(port), language, timeout)
+                for port in range(start_port, start_port + size)
+            ]
+        self.batch_chars = batch_chars
+        self.max_rss_mb = max_rss_mb
+        self.acquire_timeout = acquire_timeout
+        self._free = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.servers), thread_name_prefix='languagetool')
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start (or wait for) every server in parallel; if any fails, the others are stopped again"""
+        with self._start_lock:
+            if self._started.is_set():
+                return self
+            errors = []
+            for future in [self._executor.submit(server.start) for server in self.servers]:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                for server in self.servers:
+                    server.stop()
+                raise errors[0]
+            for server in self.servers:
+                self._free.put(server)
+            if any(server.command is not None for server in self.servers):
+                atexit.register(self.close)
+            self._started.set()
+        return self
+
+    def warm(self):
+        return self._started.is_set()
+
+    def _run(self, body):
+        try:
+            server = self._free.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise EngineUnavailable(f"no LanguageTool server was free within {self.acquire_timeout:.0f}s")
+        failed = False
+        try:
+            return server.check(body)
+        except (OSError, http.client.HTTPException):
+            # Timed out or connection lost - the server is hung or dead
+            failed = True
+            raise
+        finally:
+            try:
+                if failed or not server.alive() or (self.max_rss_mb and (server.rss_mb() or 0) > self.max_rss_mb):
+                    server.restart()
+            finally:
+                # Even if the restart failed: the next check on it retries the restart
+                self._free.put(server)
+
+    def check_many(self, texts, join=True):
+        if not texts:
+            return []
+        self.start()
+        results = [None] * len(texts)
+        jobs = []
+        batches = _batches(texts, self.batch_chars) if join else ([i] for i in range(len(texts)))
+        for batch in batches:
+            batch_texts = [texts[i] for i in batch]
+            body, starts = join_batch(batch_texts)
+            jobs.append((batch, batch_texts, starts, self._executor.submit(self._run, body)))
+        for batch, batch_texts, starts, future in jobs:
+            for i, matches in zip(batch, split_batch(batch_texts, starts, future.result())):
+                results[i] = matches
+        return results
+
+    def stats(self):
+        return [{'url': s.url, 'requests': s.requests, 'restarts': s.restarts, 'rss_mb': s.rss_mb()}
+                for s in self.servers]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for server in self.servers:
+            server.stop()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # The parent's backend owns threads and server handles that don't exist in the child
+    global _backend, _backend_lock
+    _backend = None
+    _backend_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_grammar_backend():
+    """
+    The process-wide grammar backend: a pool of the servers listed in
+    SCORER_LT_SERVERS (comma-separated URLs) if set, otherwise in-process.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                urls = [u.strip() for u in os.environ.get('SCORER_LT_SERVERS', '').split(',') if u.strip()]
+                _backend = ServerPoolBackend(urls=urls) if urls else InProcessBackend()
+    return _backend
+
+
+def current_grammar_backend():
+    """The configured backend, without creating one"""
+    return _backend
+
+
+def configure_grammar_backend(backend):
+    """Route all grammar checks in this process through backend (None restores the default)"""
+    global _backend
+    with _backend_lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
+    return backend
@@ -0,0 +1,214 @@
+"""
+Bulk scoring - stream transcripts through a process pool.
+
+Records are read lazily from JSONL or CSV, scored on every core by workers
+forked from a preloaded parent that each start LanguageTool once (see
+scorer.prefork), and yielded back as they are
+ready. Only a bounded window of records is in flight at any time, so memory
+stays flat however large the input is. Every record is scored in isolation:
+a bad transcript produces an error record instead of stopping the run or
+quietly switching the remaining records to the fallback methods.
+"""
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .cache import configure_result_cache
+from .checks import check_grammar_many
+from .core import score_transcript
+from .engines import EngineUnavailable, advanced_nlp_available, warm_up
+
+DEFAULT_CHUNKSIZE = 16
+
+log = logging.getLogger(__name__)
+
+
+def _parse_duration(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def normalize_record(record, index, text_field='text', duration_field='duration_sec'):
+    """Turn a raw input record (str or dict) into {'id', 'text', 'duration_sec'}"""
+    if isinstance(record, str):
+        return {'id': index, 'text': record, 'duration_sec': None}
+    if 'error' in record:
+        # Unreadable input line - carried through so it shows up in the output
+        return {'id': record.get('id', index), 'text': None, 'duration_sec': None, 'error': record['error']}
+
+    duration = record.get(duration_field)
+    if duration is None and duration_field == 'duration_sec':
+        duration = record.get('duration')
+    return {
+        'id': record.get('id', index),
+        'text': record.get(text_field),
+        'duration_sec': duration,
+    }
+
+
+def read_records(path):
+    """
+    Lazily read raw transcript records from a .jsonl or .csv file ('-' reads JSONL from stdin).
+    Lines that can't be parsed are yielded as {'error': ...} records.
+    """
+    if path == '-':
+        yield from _read_jsonl(sys.stdin)
+        return
+
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            yield from _read_jsonl(f)
+
+
+def _read_jsonl(f):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = {'error': f"invalid JSON: {e}"}
+        yield record
+
+
+def score_record(record, strict=True, deadline_ms=None, timings=False, compact=False, semantic=False,
+                 rubric=None):
+    """Score one normalized record; any failure is returned as {'id', 'error'}"""
+    if record.get('error'):
+        return {'id': record['id'], 'error': record['error']}
+    try:
+        text = record['text']
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("transcript is empty")
+        result = score_transcript(text, _parse_duration(record.get('duration_sec')), strict=strict,
+                                  deadline_ms=deadline_ms, timings=timings, compact=compact, semantic=semantic,
+                                  rubric=rubric)
+        return {'id': record['id'], 'result': result}
+    except Exception as e:
+        return {'id': record['id'], 'error': f"{type(e).__name__}: {e}"}
+
+
+def _score_chunk(chunk, strict, deadline_ms=None, timings=False, compact=False, semantic=False, rubric=None):
+    texts = [r['text'] for r in chunk if isinstance(r.get('text'), str) and r['text'].strip()]
+    # With a deadline each record has its own budget, so no up-front prefetch
+    if advanced_nlp_available() and deadline_ms is None:
+        # One grammar request for the whole chunk - score_transcript then hits the sentence cache
+        try:
+            check_grammar_many(texts)
+        except EngineUnavailable as e:
+            # Each record then fails (or falls back) on its own below
+            log.warning("grammar prefetch for %d transcripts failed: %s", len(texts), e)
+    if semantic:
+        # Likewise one embedding batch for every sentence of the chunk
+        from .semantic import semantic_categories_many
+        try:
+            semantic_categories_many(texts)
+        except EngineUnavailable as e:
+            log.warning("embedding prefetch for %d transcripts failed: %s", len(texts), e)
+    return [score_record(record, strict, deadline_ms, timings, compact, semantic, rubric) for record in chunk]
+
+
+def _init_worker(cache_dir=None):
+    # Each worker starts its own LanguageTool JVM and VADER lexicon exactly once
+    if cache_dir:
+        configure_result_cache(cache_dir)
+    warm_up()
+
+
+def _chunks(records, chunksize, text_field, duration_field):
+    chunk = []
+    for index, record in enumerate(records):
+        chunk.append(normalize_record(record, index, text_field, duration_field))
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_transcripts(records, workers=None, ordered=True, chunksize=DEFAULT_CHUNKSIZE,
+                      max_pending=None, strict=True, progress=None,
+                      text_field='text', duration_field='duration_sec', cache_dir=None, timings=False,
+                      compact=False, semantic=False, rubric=None):
+    """
+    Score an iterable of transcripts (strings or dicts with text and optional duration).
+
+    Yields {'id', 'result'} or {'id', 'error'} per record - in input order when
+    ordered=True, otherwise as soon as each chunk finishes. At most max_pending
+    chunks (default 4 per worker) are in flight. progress(done, errors, elapsed)
+    is called after every chunk. cache_dir points every worker at a shared
+    persistent result cache (see scorer.cache). timings=True adds a
+    per-criterion timing breakdown to every result (see scorer.metrics).
+    compact=True yields ScoreResult objects instead of result dicts, which
+    are much smaller to ship back from the workers and to keep in memory.
+    semantic=True adds semantic keyword matching (see scorer.semantic), with
+    the sentences of each chunk embedded in one batch. rubric scores against
+    a custom rubric (see scorer.rubric); a rubric file is compiled once per
+    worker and reloaded there when it changes.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    chunks = _chunks(records, chunksize, text_field, duration_field)
+    started = time.perf_counter()
+    done = errors = 0
+
+    def report(outputs):
+        nonlocal done, errors
+        done += len(outputs)
+        errors += sum(1 for o in outputs if 'error' in o)
+        if progress is not None:
+            progress(done, errors, time.perf_counter() - started)
+        return outputs
+
+    if workers == 1:
+        _init_worker(cache_dir)
+        for chunk in chunks:
+            yield from report(_score_chunk(chunk, strict, None, timings, compact, semantic, rubric))
+        return
+
+    from .prefork import worker_pool
+    with worker_pool(workers, cache_dir, semantic, rubric) as pool:
+        pending = deque() if ordered else set()
+        for chunk in chunks:
+            if len(pending) >= max_pending:
+                if ordered:
+                    yield from report(pending.popleft().result())
+                else:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield from report(future.result())
+
+            future = pool.submit(_score_chunk, chunk, strict, None, timings, compact, semantic, rubric)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+
+        if ordered:
+            while pending:
+                yield from report(pending.popleft().result())
+        else:
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield from report(future.result())
+
+
+def write_jsonl(outputs, f):
+    """Write scored records as JSON lines, flushing as they arrive"""
+    count = 0
+    for output in outputs:
+        f.write(json.dumps(output) + '\n')
+        count += 1
+        if count % 100 == 0:
+            f.flush()
+    f.flush()
+    return count
@@ -0,0 +1,321 @@
+"""
+Benchmarks for the scoring pipeline.
+
+Synthetic transcripts are built from the sentences of SAMPLE_TRANSCRIPT and
+'Sample text for case study.txt', at several lengths, filler densities and
+grammar-error densities. Each run measures, per mode (advanced / fallback):
+
+    * latency percentiles of every criterion on its own (fresh Document each
+      time, so shared work like the phrase scan is counted in each),
+    * end-to-end score_transcript latency, overall and per length,
+    * batch throughput on one core and on many (worker start-up included).
+
+Result caching is off and the sentence memo is cleared before every timed
+call, so the numbers are for text the engines have not seen. Batch
+throughput keeps the memo, as a real batch run does.
+
+    python -m scorer bench -o bench.json
+    python -m scorer bench --baseline bench.json     # exit 1 on regression
+    python -m scorer bench --baseline bench.json --update-baseline
+"""
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+
+from .analyzers import (
+    FILLER_WORDS, analyze_salutation, analyze_keywords, analyze_flow, analyze_speech_rate,
+    analyze_grammar_advanced, analyze_grammar_fallback, analyze_vocabulary, analyze_clarity,
+    analyze_engagement_advanced, analyze_engagement_fallback,
+)
+from .cache import configure_result_cache
+from .checks import clear_sentence_memo, split_sentences
+from .core import score_transcript
+from .document import Document
+from .engines import advanced_nlp_available, engine_status, force_fallback, warm_up
+from .samples import SAMPLE_TRANSCRIPT
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'Sample text for case study.txt')
+
+LENGTHS = (60, 150, 400, 1200)
+FILLER_RATES = (0.0, 0.03, 0.08)
+ERROR_RATES = (0.0, 0.15, 0.4)
+DEFAULT_TOLERANCE = 0.25
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_DELTA_MS = 0.05
+
+# Edits that introduce the kind of mistakes both LanguageTool and the fallback rules flag
+GRAMMAR_ERRORS = [
+    lambda s, rng: re.sub(r'\bI\b', 'i', s, count=1),
+    lambda s, rng: s.replace(' is ', ' are ', 1),
+    lambda s, rng: s.replace(', ', ' , ', 1),
+    lambda s, rng: s.replace(' going to ', ' gonna ', 1) if ' going to ' in s else 'I gonna say ' + s,
+    lambda s, rng: _repeat_word(s, rng),
+]
+
+
+def _repeat_word(sentence, rng):
+    words = sentence.split(' ')
+    i = rng.randrange(len(words))
+    return ' '.join(words[:i + 1] + words[i:])
+
+
+def seed_sentences():
+    """(openers, body, closers) sentence pools from the bundled transcripts"""
+    texts = [SAMPLE_TRANSCRIPT]
+    if os.path.exists(SAMPLE_FILE):
+        with open(SAMPLE_FILE, encoding='utf-8') as f:
+            texts.append(f.read())
+    sentences = []
+    for text in texts:
+        sentences.extend(' '.join(text[start:end].split()) for start, end in split_sentences(text))
+    openers = [s for s in sentences if re.match(r'(hi|hello|good (morning|afternoon|evening))', s, re.IGNORECASE)]
+    closers = [s for s in sentences if re.match(r'(thank|that\'s all|that is all)', s, re.IGNORECASE)]
+    body = [s for s in sentences if s not in openers and s not in closers]
+    return openers, body, closers
+
+
+def synthetic_transcript(rng, words, filler_rate=0.0, error_rate=0.0, pools=None):
+    """
+    A transcript of about `words` words: an opener, body sentences, a closer.
+    filler_rate - fillers inserted per word; error_rate - share of sentences given a grammar error
+    """
+    openers, body, closers = pools or seed_sentences()
+    sentences = [rng.choice(openers)]
+    count = len(sentences[0].split())
+    while count < words:
+        sentence = rng.choice(body)
+        if rng.random() < error_rate:
+            sentence = rng.choice(GRAMMAR_ERRORS)(sentence, rng)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    sentences.append(rng.choice(closers))
+
+    out = []
+    for token in ' '.join(sentences).split(' '):
+        if filler_rate and rng.random() < filler_rate:
+            out.append(rng.choice(FILLER_WORDS))
+        out.append(token)
+    return ' '.join(out)
+
+
+def synthetic_corpus(n, seed=0, lengths=LENGTHS, filler_rates=FILLER_RATES, error_rates=ERROR_RATES):
+    """n records {'id', 'text', 'duration_sec', 'length'} cycling over every length/filler/error combination"""
+    rng = random.Random(seed)
+    pools = seed_sentences()
+    grid = [(l, f, e) for l in lengths for f in filler_rates for e in error_rates]
+    records = []
+    for i in range(n):
+        length, filler_rate, error_rate = grid[i % len(grid)]
+        text = synthetic_transcript(rng, length, filler_rate, error_rate, pools)
+        # 1.6-2.8 words/s spans every speech-rate band of the rubric
+        duration = round(len(text.split()) / rng.uniform(1.6, 2.8), 1)
+        records.append({'id': i, 'text': text, 'duration_sec': duration, 'length': length})
+    return records
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of sorted values, linearly interpolated"""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def summarize(samples_ns):
+    values = sorted(ns / 1e6 for ns in samples_ns)
+    total = sum(values)
+    return {
+        'p50_ms': round(percentile(values, 50), 4),
+        'p90_ms': round(percentile(values, 90), 4),
+        'p99_ms': round(percentile(values, 99), 4),
+        'mean_ms': round(total / len(values), 4) if values else 0.0,
+        'per_sec': round(len(values) / total * 1000, 1) if total else 0.0,
+    }
+
+
+def _criteria(advanced):
+    grammar = (lambda doc: analyze_grammar_advanced(doc, True)) if advanced else analyze_grammar_fallback
+    engagement = (lambda doc: analyze_engagement_advanced(doc, True)) if advanced else analyze_engagement_fallback
+    return [
+        ('salutation', lambda doc, duration: analyze_salutation(doc)),
+        ('keywords', lambda doc, duration: analyze_keywords(doc)),
+        ('flow', lambda doc, duration: analyze_flow(doc)),
+        ('speech_rate', lambda doc, duration: analyze_speech_rate(doc.word_count, duration)),
+        ('grammar', lambda doc, duration: grammar(doc)),
+        ('vocabulary', lambda doc, duration: analyze_vocabulary(doc)),
+        ('clarity', lambda doc, duration: analyze_clarity(doc)),
+        ('engagement', lambda doc, duration: engagement(doc)),
+    ]
+
+
+def _time_criteria(records, advanced):
+    timer = time.perf_counter_ns
+    samples = {'document': []}
+    for record in records:
+        start = timer()
+        Document(record['text'])
+        samples['document'].append(timer() - start)
+    for name, fn in _criteria(advanced):
+        samples[name] = times = []
+        for record in records:
+            doc = Document(record['text'])
+            clear_sentence_memo()
+            start = timer()
+            fn(doc, record['duration_sec'])
+            times.append(timer() - start)
+    return {name: summarize(times) for name, times in samples.items()}
+
+
+def _time_end_to_end(records):
+    timer = time.perf_counter_ns
+    times = []
+    by_length = {}
+    for record in records:
+        clear_sentence_memo()
+        start = timer()
+        score_transcript(record['text'], record['duration_sec'], strict=True)
+        elapsed = timer() - start
+        times.append(elapsed)
+        by_length.setdefault(str(record['length']), []).append(elapsed)
+    return summarize(times), {length: summarize(t) for length, t in sorted(by_length.items(), key=lambda i: int(i[0]))}
+
+
+def _throughput(records, workers):
+    from .batch import score_transcripts
+    clear_sentence_memo()
+    start = time.perf_counter()
+    count = sum(1 for _ in score_transcripts(records, workers=workers, ordered=False, strict=True))
+    return round(count / (time.perf_counter() - start), 1)
+
+
+def run_mode(mode, records, workers=(1,), warmup=5):
+    """Benchmark one mode ('advanced' or 'fallback'); returns its section of the report"""
+    force_fallback(mode == 'fallback')
+    try:
+        if mode == 'advanced' and not (warm_up() and advanced_nlp_available()):
+            return {'skipped': f"advanced engines not available: {engine_status()}"}
+        # First calls pay for imports, engine start-up and regex compilation
+        for record in records[:warmup]:
+            score_transcript(record['text'], record['duration_sec'])
+        _throughput(records[:warmup], 1)
+        end_to_end, by_length = _time_end_to_end(records)
+        return {
+            'criteria': _time_criteria(records, mode == 'advanced'),
+            'end_to_end': end_to_end,
+            'by_length': by_length,
+            'throughput': {str(w): _throughput(records, w) for w in workers},
+        }
+    finally:
+        force_fallback(False)
+
+
+def run(n=200, seed=0, modes=('fallback', 'advanced'), workers=None, progress=None):
+    """Full benchmark report as a JSON-serializable dict"""
+    configure_result_cache(None)
+    workers = workers or sorted({1, os.cpu_count() or 1})
+    records = synthetic_corpus(n, seed)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'transcripts': n,
+            'seed': seed,
+            'workers': list(workers),
+            'engines': engine_status(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'modes': {},
+    }
+    for mode in modes:
+        if progress:
+            progress(mode)
+        report['modes'][mode] = run_mode(mode, records, workers)
+    return report
+
+
+def _metrics(report):
+    """Flatten a report to {name: (value, higher_is_better)}"""
+    out = {}
+    for mode, section in report.get('modes', {}).items():
+        for name, stats in section.get('criteria', {}).items():
+            for key in ('p50_ms', 'p90_ms'):
+                out[f'{mode}.{name}.{key}'] = (stats[key], False)
+        for key in ('p50_ms', 'p90_ms', 'p99_ms'):
+            if 'end_to_end' in section:
+                out[f'{mode}.end_to_end.{key}'] = (section['end_to_end'][key], False)
+        for workers, rate in section.get('throughput', {}).items():
+            out[f'{mode}.throughput.{workers}'] = (rate, True)
+    return out
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions of report against baseline, as human-readable strings (empty = pass)"""
+    current = _metrics(report)
+    regressions = []
+    for name, (old, higher_is_better) in sorted(_metrics(baseline).items()):
+        if name not in current:
+            continue
+        new = current[name][0]
+        if higher_is_better:
+            if old and new < old / (1 + tolerance):
+                regressions.append(f"{name}: {new}/s vs baseline {old}/s")
+        elif new > old * (1 + tolerance) and new - old > MIN_DELTA_MS:
+            regressions.append(f"{name}: {new} ms vs baseline {old} ms")
+    return regressions
+
+
+def format_report(report):
+    lines = []
+    for mode, section in report['modes'].items():
+        if 'skipped' in section:
+            lines.append(f"[{mode}] skipped - {section['skipped']}")
+            continue
+        lines.append(f"[{mode}]  {'':<12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'per s':>10}")
+        rows = list(section['criteria'].items()) + [('END TO END', section['end_to_end'])]
+        for name, s in rows:
+            lines.append(f"  {name:<19}{s['p50_ms']:>10.3f}{s['p90_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['per_sec']:>10.1f}")
+        for length, s in section['by_length'].items():
+            lines.append(f"  ~{length} words{'':<{10 - len(length)}}{s['p50_ms']:>10.3f}{s['p90_ms']:>10.3f}{s['p99_ms']:>10.3f}")
+        lines.append('  throughput: ' + ', '.join(f"{w} worker(s) {r}/s" for w, r in section['throughput'].items()))
+    return '\n'.join(lines)
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(args):
+    if args.update_baseline and not args.baseline:
+        print("--update-baseline needs --baseline FILE", file=sys.stderr)
+        return 2
+    if args.baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        # A missing baseline must not turn the regression gate into a pass
+        print(f"baseline {args.baseline} not found (record one with --update-baseline)", file=sys.stderr)
+        return 2
+    report = run(args.transcripts, args.seed, args.modes, args.workers,
+                 progress=None if args.quiet else lambda mode: print(f"benchmarking {mode} ...", file=sys.stderr))
+    if not args.quiet:
+        print(format_report(report), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote baseline {args.baseline}", file=sys.stderr)
+    elif args.baseline:
+        regressions = compare(report, load_report(args.baseline), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
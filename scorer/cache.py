@@ -0,0 +1,163 @@
+"""
+Persistent, content-addressed cache for engine results.
+
+LanguageTool matches and VADER polarity scores depend only on the text and
+the engine version, so they are stored in a local SQLite file keyed by a
+hash of (normalized text, engine namespace). Re-scoring a transcript that
+has been seen before skips the JVM entirely.
+
+The database runs in WAL mode with a busy timeout, so several worker
+processes can share one cache directory. Entries are evicted least recently
+used first once the entry or byte limit is exceeded.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_MAX_ENTRIES = 200_000
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_FILENAME = 'results.sqlite3'
+
+# last-access times are only rewritten when older than this, to keep hits read-mostly
+_TOUCH_INTERVAL = 60.0
+# eviction is checked every this many writes
+_EVICT_EVERY = 256
+
+
+def normalize_text(text):
+    """Canonical form used for hashing - and for checking, so cached results match the key"""
+    return unicodedata.normalize('NFC', text.replace('\r\n', '\n').replace('\r', '\n'))
+
+
+def content_key(text, namespace):
+    digest = hashlib.sha256()
+    digest.update(namespace.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite result cache shared by all threads and processes using the same directory.
+    Values are anything JSON-serializable.
+    """
+
+    def __init__(self, directory, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # sqlite connections must not cross a fork - reopen in each process
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL,'
+                ' size INTEGER NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, kind, key):
+        """Cached value or None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('SELECT value, accessed FROM entries WHERE key = ? AND kind = ?',
+                               (key, kind)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            if now - row[1] > _TOUCH_INTERVAL:
+                conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def put(self, kind, key, value):
+        data = json.dumps(value, separators=(',', ':'))
+        with self._lock:
+            conn = self._connection()
+            conn.execute('INSERT OR REPLACE INTO entries (key, kind, value, size, accessed) VALUES (?, ?, ?, ?, ?)',
+                         (key, kind, data, len(data), time.time()))
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        count, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        # Evict down to ~90% of the limits in one statement, least recently used first
+        excess = max(count - self.max_entries, 0)
+        if size > self.max_bytes and count:
+            excess = max(excess, int(count * (size - self.max_bytes) / size) + 1)
+        excess += self.max_entries // 10
+        conn.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)',
+                     (excess,))
+
+    def stats(self):
+        with self._lock:
+            count, size = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': count, 'bytes': size}
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute('DELETE FROM entries')
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+_result_cache = None
+_configured = False
+
+
+def _reset_after_fork():
+    # The connection is already reopened per process; its lock needs the same
+    if _result_cache is not None:
+        _result_cache._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_result_cache():
+    """The process-wide cache, or None when caching is off (set SCORER_CACHE_DIR to turn it on)"""
+    global _result_cache, _configured
+    if not _configured:
+        _configured = True
+        if os.environ.get('SCORER_CACHE_DIR'):
+            _result_cache = ResultCache(os.environ['SCORER_CACHE_DIR'])
+    return _result_cache
+
+
+def configure_result_cache(directory, **limits):
+    """Use a cache in `directory` for this process (None turns caching off)"""
+    global _result_cache, _configured
+    if _result_cache is not None:
+        _result_cache.close()
+    _result_cache = ResultCache(directory, **limits) if directory else None
+    _configured = True
+    return _result_cache
@@ -0,0 +1,266 @@
+"""
+Calls into the heavy engines, with the persistent result cache in front.
+
+Grammar matches are returned as plain dicts (not language_tool_python Match
+objects) so they can be cached, sent between processes and serialized. The
+checks themselves run on the configured grammar backend (scorer.backends).
+
+Grammar results are kept sentence by sentence: each sentence's matches are
+stored in an in-process LRU (and the persistent cache, if enabled) with
+offsets relative to the sentence, keyed by the sentence together with its
+neighbours - rules like repeated sentence beginnings or the spacing between
+sentences look across them. When a transcript is edited, only the new or
+changed sentences go to LanguageTool, checked inside a slice of the
+transcript that includes their neighbours; the matches that start inside
+them are kept, shifted back to transcript offsets and merged. A transcript
+seen for the first time is checked whole, exactly as before.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from .engines import LANGUAGE, EngineUnavailable, get_sentiment_analyzer
+from .metrics import note
+
+SENTENCE_CHUNK_RE = re.compile(r'[^.!?]*(?:[.!?]+|$)')
+SENTENCE_MEMO_SIZE = 50_000
+# Neighbouring sentences a sentence is checked and cached together with
+CONTEXT_BEFORE = 2
+CONTEXT_AFTER = 1
+
+_namespaces = {}
+_sentence_memo = OrderedDict()
+_sentence_memo_lock = threading.Lock()
+sentence_stats = {'hits': 0, 'misses': 0}
+
+
+def _reset_after_fork():
+    global _sentence_memo_lock
+    _sentence_memo_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _namespace(engine, package, extra=''):
+    # The package version pins the engine version, so upgrading invalidates old entries
+    name = _namespaces.get(engine)
+    if name is None:
+        from importlib import metadata
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = 'unknown'
+        name = _namespaces[engine] = f"{engine}:{version}:{extra}"
+    return name
+
+
+def _grammar_namespace():
+    return _namespace('languagetool', 'language-tool-python', LANGUAGE)
+
+
+def split_sentences(text):
+    """(start, end) spans of the sentences sent to LanguageTool, end punctuation included"""
+    spans = []
+    for m in SENTENCE_CHUNK_RE.finditer(text):
+        piece = m.group()
+        stripped = piece.strip()
+        if stripped:
+            start = m.start() + len(piece) - len(piece.lstrip())
+            spans.append((start, start + len(stripped)))
+    return spans
+
+
+def _memo_get(sentence):
+    with _sentence_memo_lock:
+        matches = _sentence_memo.get(sentence)
+        if matches is not None:
+            _sentence_memo.move_to_end(sentence)
+        return matches
+
+
+def _memo_put(sentence, matches):
+    with _sentence_memo_lock:
+        _sentence_memo[sentence] = matches
+        _sentence_memo.move_to_end(sentence)
+        while len(_sentence_memo) > SENTENCE_MEMO_SIZE:
+            _sentence_memo.popitem(last=False)
+
+
+def clear_sentence_memo():
+    """Forget the in-process sentence results (the persistent cache is untouched)"""
+    with _sentence_memo_lock:
+        _sentence_memo.clear()
+
+
+def _result_cache():
+    # sqlite3/hashlib are only imported once something is actually checked
+    from .cache import get_result_cache
+    return get_result_cache()
+
+
+def get_grammar_backend():
+    # scorer.backends pulls in http/subprocess/thread pools - import on first check
+    from .backends import get_grammar_backend
+    return get_grammar_backend()
+
+
+def grammar_backend_name():
+    """Name of the backend check_grammar sends its requests to ('languagetool', 'languagetool-server')"""
+    return get_grammar_backend().name
+
+
+def sentence_regions(text):
+    """
+    (start, end) of the part of text each sentence owns: from its first
+    character up to the next sentence, so the whitespace between sentences
+    belongs to the sentence before it (and leading whitespace to the first)
+    """
+    spans = split_sentences(text)
+    regions = []
+    for i, (start, _) in enumerate(spans):
+        end = spans[i + 1][0] if i + 1 < len(spans) else len(text)
+        regions.append((0 if i == 0 else start, end))
+    return regions
+
+
+def _context_key(text, regions, i):
+    # A sentence's matches can depend on its neighbours (repeated sentence
+    # beginnings, spacing between sentences), so they are part of its key
+    parts = []
+    for j in range(i - CONTEXT_BEFORE, i + CONTEXT_AFTER + 1):
+        parts.append(text[regions[j][0]:regions[j][1]] if 0 <= j < len(regions) else '')
+    return '\x1f'.join(parts)
+
+
+def _runs(missing, count):
+    """Group missing sentence indexes into (first, last, indexes) ranges to check, context included"""
+    runs = []
+    for i in missing:
+        first, last = max(i - CONTEXT_BEFORE, 0), min(i + CONTEXT_AFTER, count - 1)
+        if runs and first <= runs[-1][1] + 1:
+            runs[-1][1] = max(runs[-1][1], last)
+            runs[-1][2].append(i)
+        else:
+            runs.append([first, last, [i]])
+    return runs
+
+
+def check_grammar_many(texts):
+    """
+    LanguageTool matches (as dicts, offsets into each text) for several texts.
+    Only sentences that aren't cached (with their context) are checked. Each
+    run of them goes to the backend as one slice of its own transcript -
+    texts are never checked together - and the slices of all texts go out
+    in one backend call. A text seen for the first time is one slice: itself.
+    """
+    cache = _result_cache()
+    if cache is not None:
+        from .cache import content_key, normalize_text
+        texts = [normalize_text(text) for text in texts]
+        namespace = _grammar_namespace() + ':sentence-context'
+
+    all_regions = [sentence_regions(text) for text in texts]
+    all_keys = [[_context_key(text, regions, i) for i in range(len(regions))]
+                for text, regions in zip(texts, all_regions)]
+    found = {}
+    requests = []
+    memo_hits = cache_hits = checked = 0
+    for t, (text, regions, keys) in enumerate(zip(texts, all_regions, all_keys)):
+        missing = []
+        for i, key in enumerate(keys):
+            if key in found:
+                continue
+            matches = _memo_get(key)
+            if matches is not None:
+                memo_hits += 1
+            elif cache is not None:
+                matches = cache.get('grammar', content_key(key, namespace))
+                if matches is not None:
+                    cache_hits += 1
+                    _memo_put(key, matches)
+            if matches is None:
+                missing.append(i)
+            else:
+                sentence_stats['hits'] += 1
+            found[key] = matches
+        checked += len(missing)
+        for first, last, indexes in _runs(missing, len(regions)):
+            requests.append((t, regions[first][0], regions[last][1], indexes))
+
+    note('memo_hits', memo_hits)
+    note('cache_hits', cache_hits)
+    note('sentences_checked', checked)
+    if requests:
+        sentence_stats['misses'] += checked
+        slices = [texts[t][lo:hi] for t, lo, hi, _ in requests]
+        for (t, lo, hi, indexes), matches in zip(requests, get_grammar_backend().check_many(slices, join=False)):
+            for i in indexes:
+                start, end = all_regions[t][i]
+                # Only the matches that start inside this sentence are its own
+                own = [dict(m, offset=lo + m['offset'] - start) for m in matches
+                       if start <= lo + m['offset'] < end]
+                key = all_keys[t][i]
+                _memo_put(key, own)
+                if cache is not None:
+                    cache.put('grammar', content_key(key, namespace), own)
+                found[key] = own
+
+    results = []
+    for regions, keys in zip(all_regions, all_keys):
+        merged = []
+        for (start, _), key in zip(regions, keys):
+            merged.extend(dict(m, offset=m['offset'] + start) for m in found[key])
+        results.append(merged)
+    return results
+
+
+def check_grammar(text):
+    """
+    LanguageTool matches for text as dicts (offsets into text), checking only
+    the sentences that aren't already cached
+    """
+    return check_grammar_many([text])[0]
+
+
+def check_grammar_whole(text):
+    """LanguageTool matches for the whole text in one request (cached as a unit)"""
+    cache = _result_cache()
+    if cache is not None:
+        from .cache import content_key, normalize_text
+        text = normalize_text(text)
+        key = content_key(text, _grammar_namespace())
+        matches = cache.get('grammar', key)
+        if matches is not None:
+            return matches
+
+    matches = get_grammar_backend().check(text)
+
+    if cache is not None:
+        cache.put('grammar', key, matches)
+    return matches
+
+
+def polarity_scores(text):
+    """VADER polarity scores for text, served from the result cache when possible"""
+    cache = _result_cache()
+    if cache is not None:
+        from .cache import content_key, normalize_text
+        text = normalize_text(text)
+        key = content_key(text, _namespace('vader', 'vaderSentiment'))
+        scores = cache.get('sentiment', key)
+        if scores is not None:
+            note('cache_hits')
+            return scores
+        note('cache_misses')
+
+    analyzer = get_sentiment_analyzer()
+    if analyzer is None:
+        raise EngineUnavailable("VADER is not available")
+    scores = analyzer.polarity_scores(text)
+
+    if cache is not None:
+        cache.put('sentiment', key, scores)
+    return scores
@@ -0,0 +1,460 @@
+"""
+Command line entry point: python -m scorer <command> ...
+"""
+import argparse
+import json
+import os
+import sys
+
+from . import batch
+
+
+def _progress_printer(every):
+    last = [0]
+
+    def progress(done, errors, elapsed):
+        if done - last[0] >= every:
+            last[0] = done
+            rate = done / elapsed if elapsed else 0.0
+            print(f"scored {done} records ({errors} errors) - {rate:.1f}/s", file=sys.stderr)
+    return progress
+
+
+def _output_format(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == '.parquet':
+        return 'parquet'
+    if suffix in ('.arrow', '.feather'):
+        return 'arrow'
+    return 'jsonl'
+
+
+def _count_errors(outputs, errors):
+    for output in outputs:
+        if 'error' in output:
+            errors[0] += 1
+        yield output
+
+
+def cmd_batch(args):
+    if args.lt_servers:
+        # Inherited by the worker processes, which each pool over these servers
+        os.environ['SCORER_LT_SERVERS'] = args.lt_servers
+    output_format = args.format or _output_format(args.output)
+    if output_format != 'jsonl' and args.output == '-':
+        print(f"{output_format} output needs a file (-o)", file=sys.stderr)
+        return 2
+    if output_format != 'jsonl' and args.rubric:
+        print(f"{output_format} output has the built-in rubric's columns - use JSONL with --rubric", file=sys.stderr)
+        return 2
+    if args.rubric and not _rubric_ok(args.rubric):
+        return 2
+    records = batch.read_records(args.input)
+    outputs = batch.score_transcripts(
+        records,
+        workers=args.workers,
+        ordered=not args.unordered,
+        chunksize=args.chunksize,
+        strict=not args.allow_fallback,
+        progress=None if args.quiet else _progress_printer(args.progress_every),
+        text_field=args.text_field,
+        duration_field=args.duration_field,
+        cache_dir=args.cache_dir,
+        timings=args.timings,
+        compact=output_format != 'jsonl',
+        semantic=args.semantic,
+        rubric=args.rubric,
+    )
+    errors = [0]
+    outputs = _count_errors(outputs, errors)
+    if output_format != 'jsonl':
+        from .columnar import write_results
+        count = write_results(outputs, args.output, output_format)
+    elif args.output == '-':
+        count = batch.write_jsonl(outputs, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            count = batch.write_jsonl(outputs, f)
+    if not args.quiet:
+        print(f"done: {count} records ({errors[0]} errors)", file=sys.stderr)
+    # Every record is written either way; the exit status tells a script some failed
+    return 1 if errors[0] else 0
+
+
+def cmd_serve(args):
+    from .service import run
+    if args.lt_servers:
+        os.environ['SCORER_LT_SERVERS'] = args.lt_servers
+
+    if args.rubric and not _rubric_ok(args.rubric):
+        return 2
+
+    def started(service):
+        print(f"scoring service on http://{service.host}:{service.port} ({service.workers} workers)", file=sys.stderr)
+
+    run(
+        args.host, args.port, on_start=started,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        deadline_ms=args.deadline_ms,
+        strict=args.strict,
+        cache_dir=args.cache_dir,
+        rubric=args.rubric,
+    )
+    return 0
+
+
+def _rubric_ok(path):
+    from .rubric import RubricError, get_plan
+    try:
+        get_plan(path)
+    except RubricError as e:
+        print(f"bad rubric: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+def cmd_rubric(args):
+    from .rubric import RubricError, compile_rubric, default_rubric, load_rubric
+    if args.action == 'dump':
+        rubric = default_rubric()
+        if args.format == 'yaml':
+            try:
+                import yaml
+            except ImportError:
+                print("YAML rubrics need PyYAML (pip install pyyaml)", file=sys.stderr)
+                return 1
+            text = yaml.safe_dump(rubric, sort_keys=False, allow_unicode=True)
+        else:
+            text = json.dumps(rubric, indent=2) + '\n'
+        if args.output == '-':
+            sys.stdout.write(text)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return 0
+    try:
+        plan = compile_rubric(load_rubric(args.file))
+    except (OSError, RubricError) as e:
+        print(f"bad rubric: {e}", file=sys.stderr)
+        return 1
+    print(f"{plan.name}: ok ({plan.digest[:12]}) - criteria: {', '.join(plan.enabled)}")
+    for name, members, max_points, weight in plan.groups:
+        print(f"  {name}: {' + '.join(members)} (max {max_points}, weight {weight})")
+    return 0
+
+
+def cmd_ingest(args):
+    from .ingest import ingest_file
+    sources = {}
+
+    def counted(records):
+        for record in records:
+            source = 'error' if 'error' in record or 'duration_error' in record else record['duration_source']
+            sources[source] = sources.get(source, 0) + 1
+            yield record
+
+    records = counted(ingest_file(args.manifest, args.workers))
+    if args.output == '-':
+        count = batch.write_jsonl(records, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            count = batch.write_jsonl(records, f)
+    if not args.quiet:
+        found = ', '.join(f"{source or 'none'}: {n}" for source, n in sorted(sources.items(), key=lambda i: str(i[0])))
+        print(f"done: {count} records (durations from {found})", file=sys.stderr)
+    return 0
+
+
+def cmd_cohort(args):
+    from .cohort import CRITERIA, METRICS, CohortSummary
+    if args.action == 'build':
+        from .columnar import open_results
+        summary = CohortSummary()
+        for path in args.results:
+            summary.add_columns(open_results(path))
+        summary.save(args.output)
+        print(f"{args.output}: {summary.count} transcripts", file=sys.stderr)
+        return 0
+    if args.action == 'merge':
+        summary = CohortSummary.merged(CohortSummary.load(path) for path in args.summaries)
+        summary.save(args.output)
+        print(f"{args.output}: {summary.count} transcripts", file=sys.stderr)
+        return 0
+
+    if (args.metric is None) != (args.value is None):
+        print("--metric and --value go together", file=sys.stderr)
+        return 2
+    if args.metric is not None and args.metric not in METRICS + CRITERIA:
+        print(f"unknown metric {args.metric!r} (one of {', '.join(METRICS + CRITERIA)})", file=sys.stderr)
+        return 2
+    summary = CohortSummary.load(args.summary)
+    if args.metric:
+        if not summary.count:
+            print(f"{args.summary} is empty", file=sys.stderr)
+            return 1
+        share = summary.rank(args.metric, args.value)
+        band = summary.band(args.metric, args.value) if args.metric != 'wpm' else None
+        print(f"{args.metric} {args.value}: above {share:.0%} of {summary.count}" + (f" ({band})" if band else ''))
+        return 0
+    print(f"{summary.count} transcripts")
+    for name in METRICS + CRITERIA:
+        p25, p50, p75 = (summary.quantile(name, q) for q in (0.25, 0.5, 0.75))
+        print(f"  {name:<14} p25 {p25:>8.2f}  median {p50:>8.2f}  p75 {p75:>8.2f}")
+    for key, share in summary.coverage().items():
+        print(f"  {key:<24} {share:.0%}")
+    return 0
+
+
+def cmd_job(args):
+    from . import jobs
+    if args.action == 'create':
+        if args.rubric and not _rubric_ok(args.rubric):
+            return 2
+        try:
+            queue = jobs.create_job(batch.read_records(args.input), args.job_dir, args.shard_size,
+                                    strict=not args.allow_fallback, semantic=args.semantic, rubric=args.rubric,
+                                    text_field=args.text_field, duration_field=args.duration_field,
+                                    source=args.input)
+        except jobs.JobError as e:
+            print(e, file=sys.stderr)
+            return 2
+        status = queue.status()
+        print(f"{args.job_dir}: {status['records']} records in {status['total']} shards", file=sys.stderr)
+        return 0
+
+    queue = jobs.SQLiteQueue(args.job_dir, max_attempts=getattr(args, 'max_attempts', jobs.DEFAULT_MAX_ATTEMPTS))
+    if queue.created() is None:
+        print(f"{args.job_dir}: no job here - run 'job create' first", file=sys.stderr)
+        return 2
+    if args.action == 'run':
+        if args.lt_servers:
+            os.environ['SCORER_LT_SERVERS'] = args.lt_servers
+
+        def progress(shard, scored, dead):
+            if not args.quiet:
+                status = queue.status()
+                print(f"shard {shard.id}: {scored} scored, {dead} dead-lettered"
+                      f" - {status['done']}/{status['total']} shards done", file=sys.stderr)
+        jobs.run_worker(args.job_dir, queue, workers=args.workers, retries=args.retries, cache_dir=args.cache_dir,
+                        chunksize=args.chunksize, lease_sec=args.lease_sec, progress=progress)
+    elif args.action == 'retry':
+        print(f"requeued {queue.requeue_dead()} dead shards", file=sys.stderr)
+    elif args.action == 'collect':
+        dead_letter = open(args.dead_letter, 'w', encoding='utf-8') if args.dead_letter else None
+        try:
+            if args.output == '-':
+                counts = jobs.collect_results(args.job_dir, sys.stdout, dead_letter, args.partial, queue)
+            else:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    counts = jobs.collect_results(args.job_dir, f, dead_letter, args.partial, queue)
+        except jobs.JobError as e:
+            print(f"{args.job_dir}: {e}", file=sys.stderr)
+            return 1
+        finally:
+            if dead_letter is not None:
+                dead_letter.close()
+        print(f"{counts[0]} results, {counts[1]} dead letters", file=sys.stderr)
+        return 0
+
+    status = queue.status()
+    print(f"{status['records']} records in {status['total']} shards: {status['done']} done,"
+          f" {status['running']} running, {status['pending']} pending, {status['dead']} dead")
+    for shard_id, name, count, state, attempts, error in queue.shards():
+        if state == 'dead':
+            print(f"  shard {shard_id} ({count} records) dead after {attempts} attempts: {error}")
+    return 0
+
+
+def cmd_workers(args):
+    from .prefork import WarmPool, prefork_available
+    if not prefork_available():
+        print("warm-fork workers need Linux (and SCORER_PREFORK unset or 1)", file=sys.stderr)
+        return 2
+    if args.rubric and not _rubric_ok(args.rubric):
+        return 2
+    if args.lt_servers:
+        os.environ['SCORER_LT_SERVERS'] = args.lt_servers
+    with WarmPool(args.workers, args.cache_dir, args.semantic, args.rubric) as pool:
+        report = pool.start(timeout=args.timeout)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    parent = report['parent']
+    memory = parent['memory'] or {}
+    print(f"parent: preloaded in {parent['seconds']:.2f}s, RSS {memory.get('rss_mb', '?')} MB")
+    print(f"{'pid':>8} {'startup':>9} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11}  engines")
+    for worker in report['workers']:
+        engines = ', '.join(f"{name} {status}" for name, status in worker['engines'].items())
+        print(f"{worker['pid']:>8} {worker['startup_sec']:>8.2f}s {worker['rss_mb']:>8.1f} {worker['pss_mb']:>8.1f}"
+              f" {worker['private_mb']:>11.1f}  {engines}")
+    workers = report['workers']
+    if workers:
+        print(f"{len(workers)} workers: {sum(w['private_mb'] for w in workers) / len(workers):.1f} MB private each,"
+              f" {sum(w['pss_mb'] for w in workers):.1f} MB PSS in total")
+    return 0
+
+
+def cmd_long(args):
+    from .longform import GRAMMAR_WORKERS, score_file
+    if args.lt_servers:
+        os.environ['SCORER_LT_SERVERS'] = args.lt_servers
+    result = score_file(args.file, args.duration, strict=args.strict, chunk_bytes=args.chunk_kb * 1024,
+                        workers=args.workers or GRAMMAR_WORKERS)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+def cmd_bench(args):
+    from . import bench
+    if args.lt_servers:
+        os.environ['SCORER_LT_SERVERS'] = args.lt_servers
+    return bench.main(args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m scorer', description="Rubric-based communication scorer")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('batch', help="score a JSONL/CSV file of transcripts (exit 1 if any record failed)")
+    p.add_argument('input', help="input .jsonl or .csv file ('-' for JSONL on stdin)")
+    p.add_argument('-o', '--output', default='-', help="output file (default: JSONL on stdout)")
+    p.add_argument('--format', choices=['jsonl', 'parquet', 'arrow'], default=None,
+                   help="output format (default: from the -o suffix - .parquet, .arrow/.feather, else JSONL)")
+    p.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    p.add_argument('--chunksize', type=int, default=batch.DEFAULT_CHUNKSIZE, help="records per worker task")
+    p.add_argument('--unordered', action='store_true', help="write results as they finish instead of in input order")
+    p.add_argument('--text-field', default='text')
+    p.add_argument('--duration-field', default='duration_sec')
+    p.add_argument('--allow-fallback', action='store_true',
+                   help="let records fall back to the rule-based methods if LanguageTool/VADER fail")
+    p.add_argument('--cache-dir', default=os.environ.get('SCORER_CACHE_DIR'),
+                   help="persistent grammar/sentiment result cache shared by all workers")
+    p.add_argument('--lt-servers', help="comma-separated LanguageTool server URLs to check grammar against")
+    p.add_argument('--timings', action='store_true', help="add a per-criterion timing breakdown to every result")
+    p.add_argument('--semantic', action='store_true',
+                   help="also match keywords said in other words (needs sentence-transformers)")
+    p.add_argument('--rubric', help="JSON/YAML rubric file to score against (see 'rubric dump')")
+    p.add_argument('--progress-every', type=int, default=500, help="report progress every N records")
+    p.add_argument('-q', '--quiet', action='store_true')
+    p.set_defaults(func=cmd_batch)
+
+    p = commands.add_parser('serve', help="run the HTTP scoring service")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8000)
+    p.add_argument('-w', '--workers', type=int, default=None, help="scoring processes (default: all cores)")
+    p.add_argument('--max-pending', type=int, default=None,
+                   help="transcripts admitted at once before answering 429 (default: 8 per worker)")
+    p.add_argument('--deadline-ms', type=float, default=None,
+                   help="default time budget for grammar/engagement before falling back")
+    p.add_argument('--strict', action='store_true', help="answer 503 instead of fallback scores when the engines fail")
+    p.add_argument('--cache-dir', default=os.environ.get('SCORER_CACHE_DIR'))
+    p.add_argument('--lt-servers', help="comma-separated LanguageTool server URLs to check grammar against")
+    p.add_argument('--rubric', help="JSON/YAML rubric file to score against, reloaded when it changes")
+    p.set_defaults(func=cmd_serve)
+
+    p = commands.add_parser('ingest', help="fill in recording durations for a manifest of transcripts")
+    p.add_argument('manifest', help="JSONL/CSV manifest with text or text_path, and audio_path or timestamps_path")
+    p.add_argument('-o', '--output', default='-', help="JSONL ready for 'batch' (default: stdout)")
+    p.add_argument('-w', '--workers', type=int, default=32, help="files read at once")
+    p.add_argument('-q', '--quiet', action='store_true')
+    p.set_defaults(func=cmd_ingest)
+
+    p = commands.add_parser('job', help="resumable sharded batch jobs, on one node or several")
+    actions = p.add_subparsers(dest='action', required=True)
+    q = actions.add_parser('create', help="shard a JSONL/CSV file into a job directory")
+    q.add_argument('input')
+    q.add_argument('job_dir')
+    q.add_argument('--shard-size', type=int, default=500, help="records per shard")
+    q.add_argument('--allow-fallback', action='store_true',
+                   help="score with the fallback methods instead of failing when the engines fail")
+    q.add_argument('--semantic', action='store_true', help="also match keyword categories semantically")
+    q.add_argument('--rubric', help="JSON/YAML rubric file to score against")
+    q.add_argument('--text-field', default='text')
+    q.add_argument('--duration-field', default='duration_sec')
+    q = actions.add_parser('run', help="score shards until none are left (start one per node; rerun to resume)")
+    q.add_argument('job_dir')
+    q.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    q.add_argument('--chunksize', type=int, default=batch.DEFAULT_CHUNKSIZE, help="records per worker task")
+    q.add_argument('--retries', type=int, default=2, help="extra attempts for a failed transcript")
+    q.add_argument('--max-attempts', type=int, default=3, help="leases before a shard is dead-lettered whole")
+    q.add_argument('--lease-sec', type=float, default=600.0,
+                   help="how long a silent node keeps its shard before another may take it")
+    q.add_argument('--cache-dir', default=os.environ.get('SCORER_CACHE_DIR'))
+    q.add_argument('--lt-servers', help="comma-separated LanguageTool server URLs to check grammar against")
+    q.add_argument('-q', '--quiet', action='store_true')
+    q = actions.add_parser('status', help="shards done, running, pending and dead")
+    q.add_argument('job_dir')
+    q = actions.add_parser('retry', help="put dead shards back in the queue")
+    q.add_argument('job_dir')
+    q = actions.add_parser('collect', help="write all results in input order, and the dead letters")
+    q.add_argument('job_dir')
+    q.add_argument('-o', '--output', default='-', help="JSONL results (default: stdout)")
+    q.add_argument('--dead-letter', help="JSONL of transcripts that kept failing, with their input records")
+    q.add_argument('--partial', action='store_true', help="collect the finished shards of an unfinished job")
+    p.set_defaults(func=cmd_job)
+
+    p = commands.add_parser('cohort', help="percentile summaries of scored cohorts")
+    actions = p.add_subparsers(dest='action', required=True)
+    q = actions.add_parser('build', help="summarize Parquet/Arrow results files (batch --format)")
+    q.add_argument('results', nargs='+')
+    q.add_argument('-o', '--output', required=True, help="summary JSON file")
+    q = actions.add_parser('merge', help="combine summaries, e.g. classes into a school")
+    q.add_argument('summaries', nargs='+')
+    q.add_argument('-o', '--output', required=True)
+    q = actions.add_parser('show', help="quantiles and keyword coverage, or where one value stands")
+    q.add_argument('summary')
+    q.add_argument('--metric', help="overall_score, wpm, ttr, filler_rate or a criterion (content, clarity, ...)")
+    q.add_argument('--value', type=float, help="the value to place in the cohort (needs --metric)")
+    p.set_defaults(func=cmd_cohort)
+
+    p = commands.add_parser('workers', help="start warm-forked workers and report their startup time and memory")
+    p.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    p.add_argument('--semantic', action='store_true', help="also preload the sentence-transformers model")
+    p.add_argument('--rubric', help="JSON/YAML rubric file to preload")
+    p.add_argument('--cache-dir', default=os.environ.get('SCORER_CACHE_DIR'))
+    p.add_argument('--lt-servers', help="comma-separated LanguageTool server URLs to check grammar against")
+    p.add_argument('--timeout', type=float, default=120.0, help="seconds to wait for the workers to start")
+    p.add_argument('--json', action='store_true', help="print the report as JSON")
+    p.set_defaults(func=cmd_workers)
+
+    p = commands.add_parser('long', help="score one very long transcript file in bounded memory")
+    p.add_argument('file', help="UTF-8 text file")
+    p.add_argument('--duration', type=float, default=None, help="recording length in seconds")
+    p.add_argument('--chunk-kb', type=int, default=256, help="size of the pieces the file is read in")
+    p.add_argument('-w', '--workers', type=int, default=None, help="grammar checks running at once (default: 4)")
+    p.add_argument('--strict', action='store_true', help="fail instead of falling back when the engines fail")
+    p.add_argument('--lt-servers', help="comma-separated LanguageTool server URLs to check grammar against")
+    p.set_defaults(func=cmd_long)
+
+    p = commands.add_parser('rubric', help="write out the built-in rubric, or check a rubric file")
+    actions = p.add_subparsers(dest='action', required=True)
+    q = actions.add_parser('dump', help="write the built-in rubric (a starting point for your own)")
+    q.add_argument('-o', '--output', default='-')
+    q.add_argument('--format', choices=['json', 'yaml'], default='json')
+    q = actions.add_parser('check', help="compile a rubric file and show its criteria")
+    q.add_argument('file')
+    p.set_defaults(func=cmd_rubric)
+
+    p = commands.add_parser('bench', help="benchmark the pipeline on synthetic transcripts")
+    p.add_argument('-n', '--transcripts', type=int, default=200, help="synthetic transcripts to score")
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--modes', nargs='+', choices=['fallback', 'advanced'], default=['fallback', 'advanced'])
+    p.add_argument('-w', '--workers', type=int, nargs='+', default=None,
+                   help="worker counts to measure batch throughput with (default: 1 and all cores)")
+    p.add_argument('-o', '--output', help="write the JSON report here")
+    p.add_argument('--baseline',
+                   help="JSON report to compare against; exit 1 if anything regressed, 2 if it is missing")
+    p.add_argument('--update-baseline', action='store_true', help="write this run to --baseline instead of comparing")
+    p.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown vs the baseline (0.25 = 25%%)")
+    p.add_argument('--lt-servers', help="comma-separated LanguageTool server URLs for the advanced mode")
+    p.add_argument('-q', '--quiet', action='store_true')
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
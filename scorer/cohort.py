@@ -0,0 +1,328 @@
+"""
+Streaming cohort summaries with mergeable quantile sketches.
+
+A CohortSummary takes scored transcripts one at a time (or a whole column
+batch at once) and keeps only fixed-size state:
+
+  - a quantile sketch per metric (overall_score, wpm, ttr, filler_rate):
+    log-spaced buckets in the style of DDSketch, so every quantile is within
+    RELATIVE_ACCURACY of the true value, whatever the cohort size
+  - exact histograms of the points of each criterion
+  - how many transcripts mention each keyword category
+
+Summaries merge by adding counts, so worker processes, classes or schools
+can each build one and combine them - a district summary is the merge of
+its schools'. to_dict()/save() persist them as JSON. Rank and quantile
+queries walk a few hundred buckets at most, independent of the cohort size.
+"""
+import json
+import math
+
+import numpy as np
+
+from .result import GOOD_TO_HAVE_KEYS, MUST_HAVE_KEYS
+
+RELATIVE_ACCURACY = 0.01
+# Values this small count as zero (a filler rate of 0 is common)
+MIN_VALUE = 1e-9
+
+METRICS = ('overall_score', 'wpm', 'ttr', 'filler_rate')
+CRITERIA = ('content', 'speech_rate', 'language', 'clarity', 'engagement')
+
+# Which way is better, for band(); WPM has no better direction
+HIGHER_IS_BETTER = {
+    'overall_score': True, 'ttr': True, 'filler_rate': False,
+    'content': True, 'speech_rate': True, 'language': True, 'clarity': True, 'engagement': True,
+}
+DEFAULT_BANDS = (10, 20, 50)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch over non-negative values. quantile(q) is within
+    relative_accuracy of the exact answer; rank(value) counts the values in
+    value's bucket as half below, half above.
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value):
+        if value < 0 or value != value:
+            raise ValueError(f"sketch values must be non-negative numbers, got {value!r}")
+        if value < MIN_VALUE:
+            self.zero_count += 1
+        else:
+            index = self._index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values):
+        """Add an array of values in one go (NaNs are skipped)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        if (values < 0).any():
+            raise ValueError("sketch values must be non-negative")
+        positive = values[values >= MIN_VALUE]
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                    return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("can't merge sketches with different accuracies")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """The value below which a fraction q of the cohort falls (None when empty)"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def rank(self, value):
+        """Fraction of the cohort below value (0-1), ties counted half"""
+        if not self.count:
+            return None
+        if value < MIN_VALUE:
+            return (self.zero_count / 2 if value >= 0 else 0) / self.count
+        index = self._index(value)
+        below = self.zero_count + sum(count for i, count in self.buckets.items() if i < index)
+        return (below + self.buckets.get(index, 0) / 2) / self.count
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'buckets': {str(index): count for index, count in sorted(self.buckets.items())},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.buckets = {int(index): count for index, count in data['buckets'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.total = data['total']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+def _column(columns, name):
+    """A column as a float array with NaN for missing values"""
+    values = columns[name]
+    if hasattr(values, 'iloc'):  # pandas
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    if hasattr(values, 'to_numpy'):  # pyarrow
+        return np.asarray(values.to_numpy(zero_copy_only=False), dtype=float)
+    return np.asarray(values, dtype=float)
+
+
+class CohortSummary:
+    """
+    summary = CohortSummary()
+    for output in score_transcripts(records, compact=True):
+        summary.add(output)
+    summary.band('filler_rate', 2.1)     # 'top 20%'
+    school = CohortSummary.merged([class_a, class_b])
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.sketches = {name: QuantileSketch(relative_accuracy) for name in METRICS}
+        self.criteria = {name: {} for name in CRITERIA}
+        self.keywords = dict.fromkeys(MUST_HAVE_KEYS + GOOD_TO_HAVE_KEYS, 0)
+        self.count = 0
+
+    def add(self, result):
+        """Add one ScoreResult (or a batch output {'id', 'result'}; errors are skipped)"""
+        if isinstance(result, dict) and 'id' in result:
+            result = result.get('result')
+            if result is None:
+                return
+        if not hasattr(result, 'must_have_mask'):
+            raise TypeError("cohort summaries need compact results - score with compact=True")
+        self.sketches['overall_score'].add(result.overall_score)
+        self.sketches['wpm'].add(result.wpm)
+        self.sketches['ttr'].add(result.ttr)
+        self.sketches['filler_rate'].add(result.filler_rate)
+        for name, points in zip(CRITERIA, (result.content_score, result.speech_rate, result.language_score,
+                                           result.clarity, result.engagement)):
+            histogram = self.criteria[name]
+            histogram[points] = histogram.get(points, 0) + 1
+        for key in result.must_have + result.good_to_have:
+            self.keywords[key] += 1
+        self.count += 1
+
+    def add_columns(self, columns):
+        """
+        Add a batch of rows at once from columns named as in scorer.columnar's
+        SCHEMA - a score_frame DataFrame or a table from open_results(). Rows
+        with an error are skipped.
+        """
+        scored = ~np.isnan(_column(columns, 'overall_score'))
+        for name in METRICS:
+            self.sketches[name].add_many(_column(columns, name)[scored])
+        for name in CRITERIA:
+            points, counts = np.unique(_column(columns, name)[scored], return_counts=True)
+            histogram = self.criteria[name]
+            for value, count in zip(points.tolist(), counts.tolist()):
+                value = int(value) if value.is_integer() else value
+                histogram[value] = histogram.get(value, 0) + count
+        for mask_name, keys in (('must_have_mask', MUST_HAVE_KEYS), ('good_to_have_mask', GOOD_TO_HAVE_KEYS)):
+            masks = _column(columns, mask_name)[scored].astype(np.int64)
+            for bit, key in enumerate(keys):
+                self.keywords[key] += int(((masks >> bit) & 1).sum())
+        self.count += int(scored.sum())
+
+    def merge(self, other):
+        """Fold another summary into this one"""
+        for name, sketch in self.sketches.items():
+            sketch.merge(other.sketches[name])
+        for name, histogram in self.criteria.items():
+            for points, count in other.criteria[name].items():
+                histogram[points] = histogram.get(points, 0) + count
+        for key, count in other.keywords.items():
+            self.keywords[key] = self.keywords.get(key, 0) + count
+        self.count += other.count
+        return self
+
+    @classmethod
+    def merged(cls, summaries):
+        summaries = list(summaries)
+        total = cls(summaries[0].relative_accuracy if summaries else RELATIVE_ACCURACY)
+        for summary in summaries:
+            total.merge(summary)
+        return total
+
+    def rank(self, name, value):
+        """Fraction of the cohort below value (0-1, ties counted half) for a metric or criterion"""
+        if name in self.sketches:
+            return self.sketches[name].rank(value)
+        if name not in self.criteria:
+            raise KeyError(f"unknown metric {name!r}")
+        if not self.count:
+            return None
+        histogram = self.criteria[name]
+        below = sum(count for points, count in histogram.items() if points < value)
+        return (below + histogram.get(value, 0) / 2) / self.count
+
+    def quantile(self, name, q):
+        """The metric's value at quantile q (0-1), or a criterion's points"""
+        if name in self.sketches:
+            return self.sketches[name].quantile(q)
+        if name not in self.criteria:
+            raise KeyError(f"unknown metric {name!r}")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for points in sorted(self.criteria[name]):
+            seen += self.criteria[name][points]
+            if seen > rank:
+                return points
+        return None
+
+    def top_share(self, name, value):
+        """Share of the cohort (0-1) doing at least as well as value"""
+        higher = HIGHER_IS_BETTER.get(name)
+        if higher is None:
+            raise ValueError(f"{name} has no better direction - use rank()")
+        rank = self.rank(name, value)
+        if rank is None:
+            return None
+        return 1 - rank if higher else rank
+
+    def band(self, name, value, bands=DEFAULT_BANDS):
+        """'top 10%', 'top 20%', ... for the first band value falls in, else 'bottom 50%'"""
+        share = self.top_share(name, value)
+        if share is None:
+            return None
+        for band in bands:
+            if share <= band / 100:
+                return f"top {band}%"
+        return f"bottom {100 - bands[-1]}%"
+
+    def coverage(self):
+        """Fraction of the cohort mentioning each keyword category"""
+        return {key: count / self.count if self.count else 0.0 for key, count in self.keywords.items()}
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'sketches': {name: sketch.to_dict() for name, sketch in self.sketches.items()},
+            'criteria': {name: [[points, count] for points, count in sorted(histogram.items())]
+                         for name, histogram in self.criteria.items()},
+            'keywords': self.keywords,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['relative_accuracy'])
+        summary.count = data['count']
+        summary.sketches = {name: QuantileSketch.from_dict(sketch) for name, sketch in data['sketches'].items()}
+        summary.criteria = {name: {points: count for points, count in histogram}
+                            for name, histogram in data['criteria'].items()}
+        summary.keywords = dict(data['keywords'])
+        return summary
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __repr__(self):
+        return f"CohortSummary(count={self.count})"
@@ -0,0 +1,260 @@
+"""
+Columnar export of scored cohorts - Parquet or Arrow IPC files.
+
+Every file has the same schema (SCHEMA): one row per transcript with the
+criterion points, the raw metrics, the keyword categories found as bitmaps
+(bit i of must_have_mask is MUST_HAVE_KEYS[i]) and the fallback reasons.
+Rows are written in batches, so a batch run never holds more than
+batch_rows results in memory.
+
+open_results() reads a file back as a pyarrow Table. Arrow IPC files are
+memory-mapped and the columns are used straight from the page cache, so
+filtering and aggregating hundreds of thousands of rows creates no Python
+objects per row. Parquet is smaller on disk and decodes only the columns
+and row groups a query needs.
+"""
+import json
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .result import GOOD_TO_HAVE_KEYS, MUST_HAVE_KEYS
+
+SCHEMA_VERSION = '1'
+DEFAULT_BATCH_ROWS = 10_000
+
+_labels = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema(
+    [
+        ('id', pa.string()),
+        ('word_count', pa.int32()),
+        ('sentence_count', pa.int32()),
+        ('duration_sec', pa.float64()),
+        ('wpm', pa.float64()),
+        ('salutation', pa.int8()),
+        ('keywords', pa.int8()),
+        ('must_have_mask', pa.uint8()),
+        ('good_to_have_mask', pa.uint8()),
+        ('flow', pa.int8()),
+        ('content', pa.int8()),
+        ('speech_rate', pa.int8()),
+        ('speech_rate_label', _labels),
+        ('grammar_errors', pa.int32()),
+        ('grammar_ratio', pa.float64()),
+        ('grammar', pa.int8()),
+        ('unique_words', pa.int32()),
+        ('ttr', pa.float64()),
+        ('vocabulary', pa.int8()),
+        ('language', pa.int8()),
+        ('filler_count', pa.int32()),
+        ('filler_rate', pa.float64()),
+        ('clarity', pa.int8()),
+        ('positive_score', pa.float64()),
+        ('engagement', pa.int8()),
+        ('grammar_reason', _labels),
+        ('engagement_reason', _labels),
+        ('overall_score', pa.float64()),
+        ('error', pa.string()),
+    ],
+    metadata={
+        'scorer.schema_version': SCHEMA_VERSION,
+        'scorer.must_have_keys': json.dumps(MUST_HAVE_KEYS),
+        'scorer.good_to_have_keys': json.dumps(GOOD_TO_HAVE_KEYS),
+    },
+)
+
+
+def _format(path, format=None):
+    if format is not None:
+        return format
+    return 'parquet' if str(path).lower().endswith('.parquet') else 'arrow'
+
+
+def result_row(record_id, result=None, error=None):
+    """One row of SCHEMA from a ScoreResult (or an error)"""
+    if result is None:
+        row = dict.fromkeys(SCHEMA.names)
+        row['id'] = str(record_id)
+        row['error'] = error
+        return row
+    return {
+        'id': str(record_id),
+        'word_count': result.word_count,
+        'sentence_count': result.sentence_count,
+        'duration_sec': result.duration_sec,
+        'wpm': result.wpm,
+        'salutation': result.salutation,
+        'keywords': result.keywords,
+        'must_have_mask': result.must_have_mask,
+        'good_to_have_mask': result.good_to_have_mask,
+        'flow': result.flow,
+        'content': result.content_score,
+        'speech_rate': result.speech_rate,
+        'speech_rate_label': result.speech_detail,
+        'grammar_errors': result.error_count,
+        'grammar_ratio': result.grammar_ratio,
+        'grammar': result.grammar,
+        'unique_words': result.unique_words,
+        'ttr': result.ttr,
+        'vocabulary': result.vocabulary,
+        'language': result.language_score,
+        'filler_count': result.filler_count,
+        'filler_rate': result.filler_rate,
+        'clarity': result.clarity,
+        'positive_score': result.sentiment_score,
+        'engagement': result.engagement,
+        'grammar_reason': result.grammar_reason,
+        'engagement_reason': result.engagement_reason,
+        'overall_score': result.overall_score,
+        'error': None,
+    }
+
+
+class ResultWriter:
+    """
+    with ResultWriter('scores.parquet') as writer:
+        for output in score_transcripts(records, compact=True):
+            writer.write(output)
+
+    Takes the {'id', 'result'} / {'id', 'error'} outputs of batch scoring with
+    compact results. format is 'parquet' or 'arrow' (default: from the suffix).
+    """
+
+    def __init__(self, path, format=None, batch_rows=DEFAULT_BATCH_ROWS):
+        self.path = path
+        self.format = _format(path, format)
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._columns = {name: [] for name in SCHEMA.names}
+        if self.format == 'parquet':
+            self._writer = pq.ParquetWriter(path, SCHEMA, compression='zstd')
+        elif self.format == 'arrow':
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, SCHEMA)
+        else:
+            raise ValueError(f"unknown format {format!r} (use 'parquet' or 'arrow')")
+
+    def write(self, output):
+        result = output.get('result')
+        if result is not None and not hasattr(result, 'must_have_mask'):
+            raise TypeError("columnar export needs compact results - score with compact=True")
+        self.write_row(result_row(output['id'], result, output.get('error')))
+
+    def write_row(self, row):
+        for name, column in self._columns.items():
+            column.append(row[name])
+        if len(self._columns['id']) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        count = len(self._columns['id'])
+        if not count:
+            return
+        arrays = [pa.array(self._columns[field.name], type=field.type) for field in SCHEMA]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+        if self.format == 'parquet':
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+        self.rows += count
+        for column in self._columns.values():
+            column.clear()
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self.format == 'arrow':
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_results(outputs, path, format=None, batch_rows=DEFAULT_BATCH_ROWS):
+    """Write batch outputs (with compact results) to a Parquet/Arrow file; returns the row count"""
+    with ResultWriter(path, format, batch_rows) as writer:
+        for output in outputs:
+            writer.write(output)
+    return writer.rows
+
+
+def frame_to_table(frame):
+    """A score_frame DataFrame as a Table with SCHEMA"""
+    frame = frame.reset_index()
+    frame['id'] = frame['id'].astype(str)
+    arrays = []
+    for field in SCHEMA:
+        values = frame[field.name]
+        if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+            values = values.astype(object).where(values.notna(), None).tolist()
+        arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def write_frame(frame, path, format=None):
+    """Write a score_frame DataFrame to a Parquet/Arrow file"""
+    table = frame_to_table(frame)
+    if _format(path, format) == 'parquet':
+        pq.write_table(table, path, compression='zstd')
+    else:
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+    return table.num_rows
+
+
+def open_results(path, columns=None, filter=None, format=None):
+    """
+    A results file as a pyarrow Table. Arrow files are memory-mapped (no copy);
+    Parquet reads only the columns asked for. filter is a pyarrow.compute
+    expression, e.g. (pc.field('overall_score') >= 80) & has_keyword('Family').
+    """
+    if _format(path, format) == 'parquet':
+        return pq.read_table(path, columns=columns, filters=filter, memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if filter is not None:
+        table = table.filter(filter)
+    if columns is not None:
+        table = table.select(columns)
+    return table
+
+
+def has_keyword(category):
+    """Filter expression: rows where the keyword category was found"""
+    for column, keys in (('must_have_mask', MUST_HAVE_KEYS), ('good_to_have_mask', GOOD_TO_HAVE_KEYS)):
+        if category in keys:
+            bit = pa.scalar(1 << keys.index(category), pa.uint8())
+            return pc.not_equal(pc.bit_wise_and(pc.field(column), bit), pa.scalar(0, pa.uint8()))
+    raise KeyError(f"unknown keyword category {category!r}")
+
+
+def keyword_coverage(table):
+    """Fraction of scored rows that mention each keyword category"""
+    scored = table.filter(pc.is_null(table['error']))
+    total = scored.num_rows
+    coverage = {}
+    for column, keys in (('must_have_mask', MUST_HAVE_KEYS), ('good_to_have_mask', GOOD_TO_HAVE_KEYS)):
+        masks = scored[column]
+        for bit, key in enumerate(keys):
+            found = pc.sum(pc.not_equal(pc.bit_wise_and(masks, pa.scalar(1 << bit, pa.uint8())), 0)).as_py() or 0
+            coverage[key] = found / total if total else 0.0
+    return coverage
+
+
+CRITERIA = ['content', 'speech_rate', 'language', 'clarity', 'engagement', 'overall_score']
+
+
+def summarize(table, by=None):
+    """Count and mean of every criterion, over the scored rows, optionally per group column(s)"""
+    scored = table.filter(pc.is_null(table['error']))
+    aggregations = [('id', 'count')] + [(name, 'mean') for name in CRITERIA]
+    if by is None:
+        return pa.table({
+            'id_count': [scored.num_rows],
+            **{f'{name}_mean': [pc.mean(scored[name]).as_py()] for name in CRITERIA},
+        })
+    return scored.group_by(by).aggregate(aggregations)
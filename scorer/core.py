@@ -0,0 +1,185 @@
+"""
+End-to-end scoring of a transcript against the rubric.
+"""
+import contextvars
+import os
+import threading
+import time
+
+from .analyzers import (
+    analyze_salutation, analyze_keywords, analyze_flow, analyze_speech_rate,
+    analyze_grammar_advanced, analyze_grammar_fallback, analyze_vocabulary,
+    analyze_clarity, analyze_engagement_advanced, analyze_engagement_fallback,
+)
+from .document import as_document
+from .engines import EngineUnavailable, advanced_nlp_available, advanced_nlp_installed, fallback_forced
+from .metrics import Recorder, metrics_enabled, record
+from .result import ScoreResult
+
+# Threads running LanguageTool/VADER for requests with a deadline
+ADVANCED_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Threads don't survive a fork
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _advanced_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _executor = ThreadPoolExecutor(max_workers=ADVANCED_WORKERS, thread_name_prefix='scorer-advanced')
+    return _executor
+
+
+def _call(recorder, name, fn, *args):
+    if recorder is None:
+        return fn(*args)
+    return recorder.call(name, fn, *args)
+
+
+def _submit(recorder, name, analyzer, doc):
+    if recorder is None:
+        return _advanced_executor().submit(analyzer, doc, True)
+    # The job runs in a pool thread - carry the timing context over to it
+    context = contextvars.copy_context()
+    return _advanced_executor().submit(context.run, recorder.call, name, analyzer, doc, True, background=True)
+
+
+def _advanced_or_fallback(name, analyzer, fallback, doc, strict, job=None, deadline=None, recorder=None):
+    """
+    (result, reason) of one advanced criterion. reason is None when the advanced
+    analyzer was used, otherwise why the fallback was: 'deadline' or 'error'.
+    """
+    try:
+        if job is None:
+            return _call(recorder, name, analyzer, doc, True), None
+        from concurrent.futures import wait
+        if job in wait([job], timeout=max(deadline - time.monotonic(), 0)).done:
+            return job.result(), None
+        # Not started yet: drop it. Already running: it finishes in the
+        # background and still fills the result cache for the next request.
+        job.cancel()
+        reason = 'deadline'
+    except Exception:
+        if strict:
+            raise
+        reason = 'error'
+    return _call(recorder, name, fallback, doc), reason
+
+
+def score_transcript(text, duration_sec=None, strict=False, deadline_ms=None, timings=False, compact=False,
+                     semantic=False, rubric=None):
+    """
+    Main scoring function - EXACT rubric implementation
+    strict=True raises instead of silently switching to the fallback methods
+    when LanguageTool/VADER are installed but fail (used by batch scoring).
+    deadline_ms bounds the time spent on grammar and engagement: whichever of
+    them is not done by then is scored with its fallback method for this call.
+    result['methods'] records the method used for both, and why.
+    timings=True adds result['timings'] (see scorer.metrics).
+    compact=True returns a ScoreResult (see scorer.result) instead of the dict.
+    semantic=True also finds keywords said in other words (see scorer.semantic).
+    rubric scores against a custom rubric instead - a rubric file path, a
+    rubric mapping or a compiled ScoringPlan (see scorer.rubric). The other
+    options don't apply to custom rubrics.
+    """
+    if rubric is not None:
+        from .rubric import get_plan
+        return get_plan(rubric).score(text, duration_sec, strict)
+    
+    start = time.monotonic()
+    recorder = Recorder() if timings or metrics_enabled() else None
+    doc = _call(recorder, 'document', as_document, text)
+    word_count = doc.word_count
+    sentence_count = doc.sentence_count
+    
+    if duration_sec is None:
+        duration_sec = word_count / 2.58
+    
+    duration_sec = max(duration_sec, 1)  
+    
+    advanced = advanced_nlp_available()
+    if strict and not advanced and advanced_nlp_installed() and not fallback_forced():
+        raise EngineUnavailable("advanced NLP engines are installed but failed to start")
+    
+    # With a deadline the slow criteria start first and run while the cheap ones are scored
+    grammar_job = engagement_job = deadline = None
+    if advanced and deadline_ms is not None:
+        deadline = start + deadline_ms / 1000
+        grammar_job = _submit(recorder, 'grammar', analyze_grammar_advanced, doc)
+        engagement_job = _submit(recorder, 'engagement', analyze_engagement_advanced, doc)
+    
+    found = None
+    if semantic:
+        from .semantic import semantic_categories
+        found = _call(recorder, 'semantic', semantic_categories, doc)
+        if found is None and strict:
+            raise EngineUnavailable("sentence-transformers is not available")
+    
+    salutation = _call(recorder, 'salutation', analyze_salutation, doc)
+    keywords = _call(recorder, 'keywords', analyze_keywords, doc, found)
+    flow = _call(recorder, 'flow', analyze_flow, doc, found)
+    speech_rate = _call(recorder, 'speech_rate', analyze_speech_rate, word_count, duration_sec)
+    vocabulary = _call(recorder, 'vocabulary', analyze_vocabulary, doc)
+    clarity = _call(recorder, 'clarity', analyze_clarity, doc)
+    
+    if advanced:
+        grammar, grammar_reason = _advanced_or_fallback(
+            'grammar', analyze_grammar_advanced, analyze_grammar_fallback, doc, strict,
+            grammar_job, deadline, recorder)
+        engagement, engagement_reason = _advanced_or_fallback(
+            'engagement', analyze_engagement_advanced, analyze_engagement_fallback, doc, strict,
+            engagement_job, deadline, recorder)
+    else:
+        reason = 'forced' if fallback_forced() else 'unavailable'
+        grammar, grammar_reason = _call(recorder, 'grammar', analyze_grammar_fallback, doc), reason
+        engagement, engagement_reason = _call(recorder, 'engagement', analyze_engagement_fallback, doc), reason
+    
+    result = ScoreResult.from_analyses(word_count, sentence_count, duration_sec, salutation, keywords, flow,
+                                       speech_rate, grammar, vocabulary, clarity, engagement,
+                                       grammar_reason, engagement_reason)
+    
+    if recorder is not None:
+        rules = ('rules', None)
+        keyword_backend = rules
+        if semantic:
+            keyword_backend = ('semantic', None) if found is not None else ('rules', 'unavailable')
+        backends = {
+            'salutation': rules,
+            'keywords': keyword_backend,
+            'flow': keyword_backend,
+            'speech_rate': rules,
+            'grammar': ('fallback', grammar_reason) if grammar_reason else (result.grammar_method, None),
+            'vocabulary': rules,
+            'clarity': rules,
+            'engagement': ('fallback', engagement_reason) if engagement_reason else ('vader', None),
+        }
+        if semantic:
+            backends['semantic'] = keyword_backend
+        observed = recorder.finish(backends)
+        if metrics_enabled():
+            record(observed)
+        if timings:
+            result.timings = observed
+    return result if compact else result.to_dict()
+
+
+def build_result(word_count, sentence_count, duration_sec, salutation, keywords, flow, speech_rate,
+                 grammar, vocabulary, clarity, engagement, grammar_reason=None, engagement_reason=None):
+    """The score_transcript result dict, from the return values of the analyze_* functions"""
+    return ScoreResult.from_analyses(word_count, sentence_count, duration_sec, salutation, keywords, flow,
+                                     speech_rate, grammar, vocabulary, clarity, engagement,
+                                     grammar_reason, engagement_reason).to_dict()
@@ -0,0 +1,88 @@
+"""
+Shared, precomputed view of a transcript.
+
+A Document is built once per transcript and handed to every analyze_*
+function, so the text is lowercased, tokenized and split into sentences a
+single time instead of once per criterion.
+"""
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r'\b\w+\b')
+SENTENCE_RE = re.compile(r'[^.!?]+')
+
+
+class Document:
+    """
+    text / lower          - raw and lowercased transcript
+    lower_stripped        - lowercased transcript without surrounding whitespace
+    tokens                - raw \\w+ tokens (what the rubric counts as words)
+    lower_tokens          - tokens of the lowercased text, with lower_spans
+    token_counts          - Counter over lower_tokens
+    sentence_spans        - (start, end) of each non-empty, stripped sentence
+
+    match(matcher) runs a PhraseMatcher over the lowercased text once and
+    keeps the per-category counts for every analyzer that asks again.
+    """
+    __slots__ = ('text', 'lower', 'lower_stripped', 'tokens', '_lower_tokens', '_lower_spans',
+                 '_token_counts', 'sentence_spans', 'word_count', 'sentence_count', '_matches')
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = lower = text.lower()
+        self.lower_stripped = lower.strip()
+        self.tokens = TOKEN_RE.findall(text)
+        self.word_count = len(self.tokens)
+        self._lower_tokens = None
+        self._lower_spans = None
+        self._token_counts = None
+
+        # Same segmentation as re.split(r'[.!?]+', text) keeping the stripped, non-empty parts
+        spans = []
+        for m in SENTENCE_RE.finditer(text):
+            piece = m.group()
+            stripped = piece.strip()
+            if stripped:
+                start = m.start() + len(piece) - len(piece.lstrip())
+                spans.append((start, start + len(stripped)))
+        self.sentence_spans = spans
+        self.sentence_count = len(spans)
+        self._matches = {}
+
+    # The lowercase token index is only built if an analyzer asks for it
+
+    @property
+    def lower_tokens(self):
+        if self._lower_tokens is None:
+            self._lower_tokens = TOKEN_RE.findall(self.lower)
+        return self._lower_tokens
+
+    @property
+    def lower_spans(self):
+        if self._lower_spans is None:
+            self._lower_spans = [m.span() for m in TOKEN_RE.finditer(self.lower)]
+        return self._lower_spans
+
+    @property
+    def token_counts(self):
+        if self._token_counts is None:
+            self._token_counts = Counter(self.lower_tokens)
+        return self._token_counts
+
+    @property
+    def sentences(self):
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+    def match(self, matcher):
+        counts = self._matches.get(matcher)
+        if counts is None:
+            counts = self._matches[matcher] = matcher.scan(self.lower)
+        return counts
+
+    def __repr__(self):
+        return f"Document(words={self.word_count}, sentences={self.sentence_count})"
+
+
+def as_document(text):
+    """Accept either raw text or an already built Document"""
+    return text if isinstance(text, Document) else Document(text)
@@ -0,0 +1,191 @@
+"""
+Process-wide NLP engines, created lazily on first use.
+
+Importing this module is cheap: LanguageTool (a JVM), VADER and the
+sentence-transformers/torch stack are only imported and started the first
+time something asks for them, and every caller in the process shares the
+same instance afterwards.
+"""
+import atexit
+import importlib.util
+import os
+import threading
+
+LANGUAGE = 'en-US'
+SENTENCE_MODEL = 'all-MiniLM-L6-v2'
+
+_lock = threading.RLock()
+_language_tool = None
+_sentiment_analyzer = None
+_sentence_models = {}
+_failed = set()
+_forced_fallback = False
+
+
+def _reset_after_fork():
+    # The JVM handle belongs to the parent; a forked child starts its own
+    global _lock, _language_tool
+    _lock = threading.RLock()
+    _language_tool = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class EngineUnavailable(RuntimeError):
+    """Raised in strict mode when an advanced engine is installed but can't be used"""
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def advanced_nlp_installed():
+    """True if language-tool-python and vaderSentiment can be imported"""
+    return _installed('language_tool_python') and _installed('vaderSentiment')
+
+
+def advanced_nlp_available():
+    """True unless the advanced libraries are missing, an engine failed to start or fallback is forced"""
+    return not _forced_fallback and advanced_nlp_installed() and not ({'language_tool', 'vader'} & _failed)
+
+
+def force_fallback(enabled=True):
+    """Score with the rule-based fallback methods even when the engines work (benchmarks, comparisons)"""
+    global _forced_fallback
+    _forced_fallback = enabled
+
+
+def fallback_forced():
+    return _forced_fallback
+
+
+def language_tool_alive(tool):
+    """Health check - a local LanguageTool is only usable while its JVM is running"""
+    return tool._remote or tool._server_is_alive()
+
+
+def _close_language_tool(tool):
+    try:
+        tool.close()
+    except Exception:
+        pass
+
+
+def get_language_tool():
+    """Shared LanguageTool instance (None if unavailable); restarts the JVM if it has died"""
+    global _language_tool
+    tool = _language_tool
+    if tool is not None and language_tool_alive(tool):
+        return tool
+
+    with _lock:
+        if _language_tool is not None:
+            if language_tool_alive(_language_tool):
+                return _language_tool
+            _close_language_tool(_language_tool)
+            _language_tool = None
+
+        if 'language_tool' in _failed or not _installed('language_tool_python'):
+            return None
+
+        try:
+            import language_tool_python
+            _language_tool = language_tool_python.LanguageTool(LANGUAGE)
+        except Exception:
+            _failed.add('language_tool')
+        return _language_tool
+
+
+def restart_language_tool():
+    """Shut down the current LanguageTool JVM and start a fresh one"""
+    global _language_tool
+    with _lock:
+        if _language_tool is not None:
+            _close_language_tool(_language_tool)
+            _language_tool = None
+        return get_language_tool()
+
+
+def get_sentiment_analyzer():
+    """Shared VADER analyzer (None if unavailable) - the lexicon is loaded once per process"""
+    global _sentiment_analyzer
+    if _sentiment_analyzer is not None:
+        return _sentiment_analyzer
+
+    with _lock:
+        if _sentiment_analyzer is None and 'vader' not in _failed and _installed('vaderSentiment'):
+            try:
+                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                _sentiment_analyzer = SentimentIntensityAnalyzer()
+            except Exception:
+                _failed.add('vader')
+        return _sentiment_analyzer
+
+
+def get_sentence_model(name=SENTENCE_MODEL):
+    """Shared sentence-transformers model (None if unavailable) - torch is only imported here"""
+    model = _sentence_models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        if name not in _sentence_models and ('sentence_transformers', name) not in _failed:
+            if not _installed('sentence_transformers'):
+                return None
+            try:
+                from sentence_transformers import SentenceTransformer
+                _sentence_models[name] = SentenceTransformer(name, device='cpu')
+            except Exception:
+                _failed.add(('sentence_transformers', name))
+        return _sentence_models.get(name)
+
+
+def warm_up():
+    """Start the grammar backend and VADER now instead of on the first request"""
+    from .backends import get_grammar_backend
+    try:
+        get_grammar_backend().start()
+    except Exception:
+        _failed.add('language_tool')
+    get_sentiment_analyzer()
+    return advanced_nlp_available()
+
+
+def engine_status():
+    """Report each engine as 'warm', 'cold', 'failed' or 'missing'"""
+    def status(key, module, engine):
+        if key in _failed:
+            return 'failed'
+        if not _installed(module):
+            return 'missing'
+        return 'warm' if engine is not None else 'cold'
+
+    from .backends import InProcessBackend, current_grammar_backend
+    backend = current_grammar_backend()
+    if backend is not None and not isinstance(backend, InProcessBackend):
+        grammar = 'failed' if 'language_tool' in _failed else 'warm' if backend.warm() else 'cold'
+    else:
+        tool = _language_tool
+        if tool is not None and not language_tool_alive(tool):
+            tool = None
+        grammar = status('language_tool', 'language_tool_python', tool)
+    return {
+        'language_tool': grammar,
+        'vader': status('vader', 'vaderSentiment', _sentiment_analyzer),
+    }
+
+
+def shutdown():
+    """Stop the LanguageTool JVM and drop all cached engines"""
+    global _language_tool, _sentiment_analyzer
+    with _lock:
+        if _language_tool is not None:
+            _close_language_tool(_language_tool)
+        _language_tool = None
+        _sentiment_analyzer = None
+        _sentence_models.clear()
+
+
+atexit.register(shutdown)
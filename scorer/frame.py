@@ -0,0 +1,259 @@
+"""
+Columnar scoring for cohort-level runs.
+
+score_frame() pulls the raw metrics of every transcript - word count, WPM,
+TTR, filler rate, grammar errors, positive sentiment - into NumPy arrays,
+then maps whole columns to rubric points with vectorized bucketing instead
+of the per-record if/elif ladders. The result is a pandas DataFrame with one
+row per transcript and plain numeric columns, no preformatted strings.
+
+Points are identical to score_transcript's. Grammar goes to LanguageTool as
+one batched request for the whole cohort.
+"""
+import numpy as np
+import pandas as pd
+
+from .analyzers import (
+    FALLBACK_GRAMMAR_CHECKS, GOOD_TO_HAVE_PHRASES, MUST_HAVE_PHRASES, NAME_INTRO_RE, OPENING_RE,
+    rubric_matcher, salutation_from_start,
+)
+from .batch import _parse_duration, normalize_record
+from .checks import check_grammar_many, polarity_scores
+from .document import Document
+from .engines import EngineUnavailable, advanced_nlp_available, advanced_nlp_installed, fallback_forced
+
+SPEECH_RATE_LABELS = ['Too Fast', 'Fast (Good)', 'Ideal pace', 'Slow (Acceptable)', 'Too Slow']
+
+# Raw per-transcript metrics, in the order _extract returns them
+_METRICS = [
+    'word_count', 'sentence_count', 'salutation', 'must_have_mask', 'good_to_have_mask', 'has_opening',
+    'name_early', 'closing_count', 'unique_words', 'filler_count', 'positive_count', 'negative_count',
+    'lower_token_count', 'fallback_errors',
+]
+
+
+def speech_rate_points(wpm):
+    """analyze_speech_rate's ladder over an array of WPM - including its gaps (140-141 WPM is 'Too Slow')"""
+    wpm = np.asarray(wpm, dtype=float)
+    conditions = [
+        wpm > 161,
+        (wpm >= 141) & (wpm <= 160),
+        (wpm >= 111) & (wpm <= 140),
+        (wpm >= 81) & (wpm <= 110),
+    ]
+    points = np.select(conditions, [2, 6, 10, 6], default=2)
+    labels = np.select(conditions, SPEECH_RATE_LABELS[:4], default=SPEECH_RATE_LABELS[4])
+    return points, labels
+
+
+def ratio_points(ratio):
+    """grammar_points / vocabulary_points over an array of ratios"""
+    ratio = np.asarray(ratio, dtype=float)
+    return np.select([ratio >= 0.9, ratio >= 0.7, ratio >= 0.5, ratio >= 0.3], [10, 8, 6, 4], default=2)
+
+
+def clarity_points(filler_rate):
+    filler_rate = np.asarray(filler_rate, dtype=float)
+    return np.select([filler_rate <= 3, filler_rate <= 6, filler_rate <= 9, filler_rate <= 12],
+                     [15, 12, 9, 6], default=3)
+
+
+def engagement_points(positive_score):
+    positive_score = np.asarray(positive_score, dtype=float)
+    return np.select([positive_score >= 0.9, positive_score >= 0.7, positive_score >= 0.5, positive_score >= 0.3],
+                     [15, 12, 9, 6], default=3)
+
+
+def fallback_positive_score(positive_count, negative_count, token_count):
+    """The word-based stand-in for VADER's positive score, over arrays"""
+    positive_rate = (positive_count / token_count) * 100
+    score = np.select([positive_rate >= 8, positive_rate >= 6, positive_rate >= 4, positive_rate >= 2],
+                      [0.9, 0.7, 0.5, 0.3], default=0.1)
+    return np.where(negative_count > 0, np.maximum(score - (negative_count * 0.1), 0.1), score)
+
+
+def _mask(hits, categories):
+    mask = 0
+    for bit, key in enumerate(categories):
+        if hits[key]:
+            mask |= 1 << bit
+    return mask
+
+
+def _extract(text):
+    """The raw metrics of one transcript (the only per-record Python work)"""
+    doc = Document(text)
+    hits = doc.match(rubric_matcher())
+    first_two = ' '.join(doc.text[start:end] for start, end in doc.sentence_spans[:2]).lower()
+    return (
+        doc.word_count,
+        doc.sentence_count,
+        salutation_from_start(doc.lower_stripped[:50])[0],
+        _mask(hits, MUST_HAVE_PHRASES),
+        _mask(hits, GOOD_TO_HAVE_PHRASES),
+        OPENING_RE.match(doc.lower_stripped) is not None,
+        NAME_INTRO_RE.search(first_two) is not None,
+        hits['closing'],
+        len(set(w.lower() for w in doc.tokens if w.isalpha())),
+        hits['filler'],
+        hits['positive'],
+        hits['negative'],
+        len(doc.lower_tokens),
+        sum(1 for pattern, _ in FALLBACK_GRAMMAR_CHECKS if pattern.search(text)),
+    )
+
+
+def _popcount(masks):
+    counts = np.zeros(len(masks), dtype=np.int64)
+    for bit in range(max(len(MUST_HAVE_PHRASES), len(GOOD_TO_HAVE_PHRASES))):
+        counts += (masks >> bit) & 1
+    return counts
+
+
+def _advanced_grammar(texts, strict):
+    """LanguageTool error counts (None if it failed and strict is off)"""
+    try:
+        return np.array([len(matches) for matches in check_grammar_many(texts)], dtype=np.int64)
+    except Exception:
+        if strict:
+            raise
+        return None
+
+
+def _advanced_sentiment(texts, strict):
+    scores = np.empty(len(texts))
+    failed = np.zeros(len(texts), dtype=bool)
+    for i, text in enumerate(texts):
+        try:
+            scores[i] = polarity_scores(text)['pos']
+        except Exception:
+            if strict:
+                raise
+            failed[i] = True
+    return scores, failed
+
+
+def score_frame(records, strict=False, text_field='text', duration_field='duration_sec'):
+    """
+    Score a cohort into a DataFrame indexed by id, one row per transcript.
+
+    records: strings or dicts as for score_transcripts, or a DataFrame with
+    text_field / duration_field (and optionally 'id') columns. Empty
+    transcripts and ones without a single word get an 'error' and NA
+    scores. must_have_mask/good_to_have_mask have bit i set when the i-th
+    MUST_HAVE_PHRASES/GOOD_TO_HAVE_PHRASES category was found. strict=True raises instead of falling back when
+    LanguageTool/VADER fail.
+    """
+    if isinstance(records, pd.DataFrame):
+        records = records.to_dict('records')
+    normalized = [normalize_record(record, index, text_field, duration_field) for index, record in enumerate(records)]
+    ids = [record['id'] for record in normalized]
+    errors = []
+    for record in normalized:
+        text = record['text']
+        if record.get('error'):
+            errors.append(record['error'])
+        elif not isinstance(text, str) or not text.strip():
+            errors.append("ValueError: transcript is empty")
+        else:
+            errors.append(None)
+    valid = [i for i, error in enumerate(errors) if error is None]
+
+    advanced = advanced_nlp_available()
+    if strict and not advanced and advanced_nlp_installed() and not fallback_forced():
+        raise EngineUnavailable("advanced NLP engines are installed but failed to start")
+
+    rows = np.array([_extract(normalized[i]['text']) for i in valid], dtype=np.int64).reshape(-1, len(_METRICS))
+    # Punctuation-only transcripts ("...") have no words to divide by
+    wordless = rows[:, _METRICS.index('word_count')] == 0
+    for i in np.flatnonzero(wordless):
+        errors[valid[i]] = "ValueError: transcript has no words"
+    rows = rows[~wordless]
+    valid = [i for i, skip in zip(valid, wordless) if not skip]
+    texts = [normalized[i]['text'] for i in valid]
+    metrics = dict(zip(_METRICS, rows.T))
+    word_count = metrics['word_count']
+
+    duration = np.array([_parse_duration(normalized[i]['duration_sec']) for i in valid], dtype=float)
+    duration = np.maximum(np.where(np.isnan(duration), word_count / 2.58, duration), 1)
+
+    must_have = _popcount(metrics['must_have_mask'])
+    good_to_have = _popcount(metrics['good_to_have_mask'])
+    keywords = np.minimum(must_have * 4, 20) + np.minimum(good_to_have * 2, 10)
+    flow = np.where(metrics['has_opening'].astype(bool) & metrics['name_early'].astype(bool)
+                    & (metrics['closing_count'] > 0), 5, 0)
+    content = metrics['salutation'] + keywords + flow
+
+    wpm = (word_count / duration) * 60
+    speech_rate, speech_rate_label = speech_rate_points(wpm)
+
+    fallback_reason = 'forced' if fallback_forced() else 'unavailable'
+    grammar_errors = _advanced_grammar(texts, strict) if advanced and texts else None
+    if grammar_errors is None:
+        grammar_errors = metrics['fallback_errors']
+        grammar_reason = np.full(len(texts), 'error' if advanced else fallback_reason, dtype=object)
+    else:
+        grammar_reason = np.full(len(texts), None, dtype=object)
+    grammar_ratio = 1 - np.minimum(((grammar_errors / word_count) * 100) / 10, 1)
+    grammar = ratio_points(grammar_ratio)
+
+    ttr = metrics['unique_words'] / word_count
+    vocabulary = ratio_points(ttr)
+
+    filler_rate = (metrics['filler_count'] / word_count) * 100
+    clarity = clarity_points(filler_rate)
+
+    fallback_positive = fallback_positive_score(metrics['positive_count'], metrics['negative_count'],
+                                                metrics['lower_token_count'])
+    if advanced:
+        positive_score, sentiment_failed = _advanced_sentiment(texts, strict)
+        positive_score = np.where(sentiment_failed, fallback_positive, positive_score)
+        engagement_reason = np.where(sentiment_failed, 'error', None)
+    else:
+        positive_score = fallback_positive
+        engagement_reason = np.full(len(texts), fallback_reason, dtype=object)
+    engagement = engagement_points(positive_score)
+
+    overall = (content + speech_rate + grammar + vocabulary + clarity + engagement).astype(float)
+
+    columns = {
+        'word_count': word_count,
+        'sentence_count': metrics['sentence_count'],
+        'duration_sec': duration,
+        'wpm': wpm,
+        'salutation': metrics['salutation'],
+        'keywords': keywords,
+        'must_have': must_have,
+        'good_to_have': good_to_have,
+        'must_have_mask': metrics['must_have_mask'],
+        'good_to_have_mask': metrics['good_to_have_mask'],
+        'flow': flow,
+        'content': content,
+        'speech_rate': speech_rate,
+        'speech_rate_label': speech_rate_label,
+        'grammar_errors': grammar_errors,
+        'grammar_ratio': grammar_ratio,
+        'grammar': grammar,
+        'unique_words': metrics['unique_words'],
+        'ttr': ttr,
+        'vocabulary': vocabulary,
+        'language': grammar + vocabulary,
+        'filler_count': metrics['filler_count'],
+        'filler_rate': filler_rate,
+        'clarity': clarity,
+        'positive_score': positive_score,
+        'engagement': engagement,
+        'grammar_reason': grammar_reason,
+        'engagement_reason': engagement_reason,
+        'overall_score': overall,
+    }
+    frame = pd.DataFrame(columns, index=valid)
+    if len(valid) < len(ids):
+        frame = frame.reindex(range(len(ids)))
+    frame.index = pd.Index(ids, name='id')
+    integer = [name for name, values in columns.items()
+               if isinstance(values, np.ndarray) and values.dtype.kind == 'i']
+    frame[integer] = frame[integer].astype('Int64')
+    frame['speech_rate_label'] = pd.Categorical(frame['speech_rate_label'], categories=SPEECH_RATE_LABELS)
+    frame['error'] = errors
+    return frame
@@ -0,0 +1,411 @@
+"""
+Resumable, sharded batch jobs.
+
+create_job() splits an input corpus into shards of shard_size records and
+writes them under a job directory:
+
+  job_dir/queue.sqlite3      the work queue (SQLiteQueue)
+  job_dir/inputs/NNNNN.jsonl  each shard's normalized records
+  job_dir/results/NNNNN.jsonl each finished shard's outputs, as from batch
+  job_dir/dead/NNNNN.jsonl    transcripts of that shard that kept failing
+
+Any number of run_worker() calls - on one machine, or on several nodes that
+share the job directory - claim shards from the queue until none are left.
+A claim is a lease: a node that dies mid-shard stops renewing it, and once
+it expires the shard goes to the next node that asks. A shard's results and
+dead letters are written to temporary files and renamed into place before
+the shard is marked done, so a finished shard is never scored again and a
+half-written one never counts. Transcripts that fail are retried; those
+that still fail are dead-lettered with their input record so they can be
+fed back in. A shard that keeps killing its worker is dead-lettered whole
+after max_attempts leases.
+
+SQLiteQueue is for one machine (SQLite locking can't be trusted on network
+filesystems). A networked queue implements WorkQueue over any store with an
+atomic claim and passes itself as run_worker(queue=...).
+"""
+import json
+import os
+import socket
+import sqlite3
+import time
+from collections import deque, namedtuple
+
+from .batch import _chunks, _init_worker, _score_chunk, write_jsonl
+
+DEFAULT_SHARD_SIZE = 500
+DEFAULT_LEASE_SEC = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 1.0
+QUEUE_FILENAME = 'queue.sqlite3'
+
+Shard = namedtuple('Shard', 'id name count attempts')
+
+
+class JobError(RuntimeError):
+    """A job directory that can't be created, run or collected as asked"""
+
+
+def _shard_name(shard_id):
+    return f"{shard_id:05d}.jsonl"
+
+
+def _write_atomic(path, rows):
+    # Written next to the target and renamed over it, so readers see all or nothing
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        write_jsonl(rows, f)
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class WorkQueue:
+    """
+    What run_worker needs from a queue. claim() must be atomic across every
+    node: a shard is pending, or leased to exactly one worker until
+    lease_until. Shards are identified by id; Shard.name locates its files
+    under the job directory.
+    """
+
+    def options(self):
+        """The scoring options the job was created with"""
+        raise NotImplementedError
+
+    def claim(self, worker_id, lease_sec):
+        """Lease the next pending (or expired) shard to worker_id, or None when there is none"""
+        raise NotImplementedError
+
+    def heartbeat(self, shard_id, worker_id, lease_sec):
+        """Extend worker_id's lease on a shard it is still working on"""
+        raise NotImplementedError
+
+    def complete(self, shard_id, worker_id):
+        raise NotImplementedError
+
+    def fail(self, shard_id, worker_id, error):
+        """Give a shard back after an error; it is dead once it has used up its attempts"""
+        raise NotImplementedError
+
+    def release(self, shard_id, worker_id):
+        """Give a shard back without using up an attempt (the worker is shutting down)"""
+        raise NotImplementedError
+
+    def status(self):
+        """{'total', 'records', 'pending', 'running', 'done', 'dead'}"""
+        raise NotImplementedError
+
+
+class SQLiteQueue(WorkQueue):
+    """WorkQueue in job_dir/queue.sqlite3, shared by every process on the machine"""
+
+    def __init__(self, job_dir, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = os.path.join(job_dir, QUEUE_FILENAME)
+        self.max_attempts = max_attempts
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        # sqlite connections must not cross a fork - reopen in each process
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS shards ('
+                ' id INTEGER PRIMARY KEY, name TEXT NOT NULL, count INTEGER NOT NULL,'
+                " state TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+                ' worker TEXT, lease_until REAL, error TEXT)'
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def created(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'job'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, job, shards):
+        """
+        Record the job and its shards in one transaction. Returns the job
+        that is queued - an earlier one if another process created it first.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute("INSERT OR IGNORE INTO meta VALUES ('job', ?)", (json.dumps(job),)).rowcount:
+                conn.executemany('INSERT INTO shards (id, name, count) VALUES (?, ?, ?)', shards)
+                return job
+        return self.created()
+
+    def options(self):
+        job = self.created()
+        if job is None:
+            raise JobError(f"{self.path}: no job here - create it first")
+        return job['options']
+
+    def claim(self, worker_id, lease_sec):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                "UPDATE shards SET state = 'dead', worker = NULL,"
+                " error = coalesce(error, 'worker lost') || ' (gave up after ' || attempts || ' attempts)'"
+                " WHERE state = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id, name, count, attempts FROM shards"
+                " WHERE state = 'pending' OR (state = 'running' AND lease_until < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE shards SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                (worker_id, now + lease_sec, row[0]),
+            )
+        return Shard(row[0], row[1], row[2], row[3] + 1)
+
+    def heartbeat(self, shard_id, worker_id, lease_sec):
+        self._connection().execute(
+            "UPDATE shards SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'running'",
+            (time.time() + lease_sec, shard_id, worker_id),
+        )
+
+    def complete(self, shard_id, worker_id):
+        # Unconditional: if the lease was lost meanwhile, the other worker's results are the same
+        self._connection().execute(
+            "UPDATE shards SET state = 'done', worker = NULL, lease_until = NULL, error = NULL WHERE id = ?",
+            (shard_id,),
+        )
+
+    def fail(self, shard_id, worker_id, error):
+        self._connection().execute(
+            "UPDATE shards SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END,"
+            " worker = NULL, lease_until = NULL, error = ? WHERE id = ? AND worker = ?",
+            (self.max_attempts, error, shard_id, worker_id),
+        )
+
+    def release(self, shard_id, worker_id):
+        self._connection().execute(
+            "UPDATE shards SET state = 'pending', worker = NULL, lease_until = NULL, attempts = attempts - 1"
+            " WHERE id = ? AND worker = ? AND state = 'running'",
+            (shard_id, worker_id),
+        )
+
+    def requeue_dead(self):
+        """Put dead shards back in the queue with fresh attempts; returns how many"""
+        return self._connection().execute(
+            "UPDATE shards SET state = 'pending', attempts = 0, error = NULL WHERE state = 'dead'"
+        ).rowcount
+
+    def status(self):
+        conn = self._connection()
+        counts = dict.fromkeys(('pending', 'running', 'done', 'dead'), 0)
+        counts.update(conn.execute('SELECT state, count(*) FROM shards GROUP BY state').fetchall())
+        total, records = conn.execute('SELECT count(*), coalesce(sum(count), 0) FROM shards').fetchone()
+        return dict(counts, total=total, records=records)
+
+    def shards(self):
+        """(id, name, count, state, attempts, error) for every shard, in order"""
+        return self._connection().execute(
+            'SELECT id, name, count, state, attempts, error FROM shards ORDER BY id'
+        ).fetchall()
+
+
+def create_job(records, job_dir, shard_size=DEFAULT_SHARD_SIZE, strict=True, semantic=False, rubric=None,
+               text_field='text', duration_field='duration_sec', source=None):
+    """
+    Shard records (as batch.read_records yields them) into job_dir and queue
+    the shards. The scoring options are stored with the job so every node
+    scores the same way. Creating a job that already exists is a no-op, but
+    JobError is raised if it was created with another shard size or options.
+    """
+    os.makedirs(job_dir, exist_ok=True)
+    queue = SQLiteQueue(job_dir)
+    existing = queue.created()
+    if existing is not None:
+        return _same_job(queue, existing, shard_size, strict, semantic, rubric)
+    for sub in ('inputs', 'results', 'dead'):
+        os.makedirs(os.path.join(job_dir, sub), exist_ok=True)
+    # Shard files are rewritten if an earlier create_job died before queueing them
+    shards = []
+    for shard_id, chunk in enumerate(_chunks(records, shard_size, text_field, duration_field)):
+        name = _shard_name(shard_id)
+        _write_atomic(os.path.join(job_dir, 'inputs', name), chunk)
+        shards.append((shard_id, name, len(chunk)))
+    job = {
+        'source': source,
+        'shard_size': shard_size,
+        'created': time.time(),
+        'options': {'strict': strict, 'semantic': semantic, 'rubric': rubric},
+    }
+    # A concurrent create_job may have queued the job first
+    existing = queue.create(job, shards)
+    return _same_job(queue, existing, shard_size, strict, semantic, rubric)
+
+
+def _same_job(queue, job, shard_size, strict, semantic, rubric):
+    if job['shard_size'] != shard_size or job['options'] != {'strict': strict, 'semantic': semantic, 'rubric': rubric}:
+        raise JobError(f"{queue.path}: a job with another shard size or options already exists"
+                       f" (shard size {job['shard_size']}, options {job['options']})")
+    return queue
+
+
+def _retryable(record):
+    # Unreadable input lines and empty transcripts fail the same way every time
+    return not record.get('error') and isinstance(record.get('text'), str) and bool(record['text'].strip())
+
+
+class _Scorer:
+    """Scores lists of records on a process pool that lives as long as the worker"""
+
+    def __init__(self, workers, cache_dir, chunksize):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.chunksize = chunksize
+        self.pool = None
+        if self.workers == 1:
+            _init_worker(cache_dir)
+
+    def _pool(self, options):
+        if self.pool is None:
+            from .prefork import worker_pool
+            self.pool = worker_pool(self.workers, self.cache_dir, options['semantic'], options['rubric'])
+        return self.pool
+
+    def score(self, records, options, on_chunk=None):
+        strict, semantic, rubric = options['strict'], options['semantic'], options['rubric']
+        chunks = [records[i:i + self.chunksize] for i in range(0, len(records), self.chunksize)]
+        outputs = []
+        if self.workers == 1:
+            for chunk in chunks:
+                outputs.extend(_score_chunk(chunk, strict, None, False, False, semantic, rubric))
+                if on_chunk is not None:
+                    on_chunk()
+            return outputs
+        pool = self._pool(options)
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= self.workers * 4:
+                outputs.extend(pending.popleft().result())
+                if on_chunk is not None:
+                    on_chunk()
+            pending.append(pool.submit(_score_chunk, chunk, strict, None, False, False, semantic, rubric))
+        while pending:
+            outputs.extend(pending.popleft().result())
+            if on_chunk is not None:
+                on_chunk()
+        return outputs
+
+    def reset(self):
+        """Drop a broken pool; the next score() starts a fresh one"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+
+def _run_shard(scorer, job_dir, shard, options, retries, on_chunk):
+    records = _read_jsonl(os.path.join(job_dir, 'inputs', shard.name))
+    outputs = scorer.score(records, options, on_chunk)
+    attempts = [1] * len(outputs)
+    for attempt in range(retries):
+        failed = [i for i, output in enumerate(outputs) if 'error' in output and _retryable(records[i])]
+        if not failed:
+            break
+        time.sleep(RETRY_BACKOFF * (attempt + 1))
+        for i, output in zip(failed, scorer.score([records[i] for i in failed], options, on_chunk)):
+            outputs[i] = output
+            attempts[i] += 1
+    dead = [{'id': output['id'], 'error': output['error'], 'attempts': attempts[i], 'record': records[i]}
+            for i, output in enumerate(outputs) if 'error' in output]
+    # Dead letters first: a shard counts as finished once its results file exists
+    _write_atomic(os.path.join(job_dir, 'dead', shard.name), dead)
+    _write_atomic(os.path.join(job_dir, 'results', shard.name), outputs)
+    return len(outputs), len(dead)
+
+
+def run_worker(job_dir, queue=None, workers=None, worker_id=None, retries=DEFAULT_RETRIES, cache_dir=None,
+               chunksize=None, lease_sec=DEFAULT_LEASE_SEC, progress=None):
+    """
+    Claim and score shards of the job in job_dir until the queue is empty.
+    Each shard's records are spread over `workers` processes (default: all
+    cores), which start LanguageTool/VADER once for the whole run. A failed
+    transcript is retried `retries` more times. progress(shard, scored,
+    dead) is called after every shard. Returns the number of shards scored.
+    Run it again (here or on another node) to resume an interrupted job.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    queue = queue or SQLiteQueue(job_dir)
+    options = queue.options()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    scorer = _Scorer(workers, cache_dir, chunksize or 16)
+    finished = 0
+    try:
+        while True:
+            shard = queue.claim(worker_id, lease_sec)
+            if shard is None:
+                break
+            try:
+                if os.path.exists(os.path.join(job_dir, 'results', shard.name)):
+                    # Written by a worker that died before marking the shard done
+                    scored, dead = shard.count, len(_read_jsonl(os.path.join(job_dir, 'dead', shard.name)))
+                else:
+                    scored, dead = _run_shard(scorer, job_dir, shard, options, retries,
+                                              lambda: queue.heartbeat(shard.id, worker_id, lease_sec))
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    queue.release(shard.id, worker_id)
+                    raise
+                queue.fail(shard.id, worker_id, f"{type(e).__name__}: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    scorer.reset()
+                continue
+            queue.complete(shard.id, worker_id)
+            finished += 1
+            if progress is not None:
+                progress(shard, scored, dead)
+    finally:
+        scorer.close()
+    return finished
+
+
+def collect_results(job_dir, output, dead_letter=None, partial=False, queue=None):
+    """
+    Write every shard's results, in input order, to the file object output,
+    and the dead letters to dead_letter. The records of a shard that was
+    dead-lettered whole go to dead_letter with the shard's error. Raises
+    JobError while shards are still pending or running, unless partial=True.
+    Returns (results written, dead letters written).
+    """
+    queue = queue or SQLiteQueue(job_dir)
+    shards = queue.shards()
+    unfinished = [shard_id for shard_id, _, _, state, _, _ in shards if state in ('pending', 'running')]
+    if unfinished and not partial:
+        raise JobError(f"{len(unfinished)} of {len(shards)} shards are not finished yet")
+    written = dead_written = 0
+    for shard_id, name, _, state, attempts, error in shards:
+        if state == 'done':
+            written += write_jsonl(_read_jsonl(os.path.join(job_dir, 'results', name)), output)
+            dead = _read_jsonl(os.path.join(job_dir, 'dead', name))
+        elif state == 'dead':
+            dead = [{'id': record['id'], 'error': error, 'attempts': attempts, 'record': record}
+                    for record in _read_jsonl(os.path.join(job_dir, 'inputs', name))]
+        else:
+            continue
+        if dead_letter is not None:
+            dead_written += write_jsonl(dead, dead_letter)
+    return written, dead_written
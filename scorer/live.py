@@ -0,0 +1,439 @@
+"""
+Incremental scoring for live, word-by-word ASR output.
+
+LiveScorer keeps running totals instead of re-scoring the whole transcript on
+every update, so appending words costs time proportional to the new words:
+
+    * word counts, unique words (TTR), fillers, keyword and closing hits and
+      sentiment words come from the new text only - the rubric matcher
+      re-scans just a short tail, since a phrase near the end may still be
+      completed by the next word,
+    * salutation and flow only ever look at the first words and the first
+      two sentences,
+    * WPM uses the ASR timestamps when given, otherwise wall-clock time since
+      the first word,
+    * LanguageTool checks each sentence once it is complete, and VADER
+      re-scores the completed sentences, both in the background.
+
+score() gives the live result in the same shape as score_transcript;
+finish() waits for the background checks and returns the final result. With
+the fallback methods it equals score_transcript(live.text, duration). With
+LanguageTool it can differ in the grammar criterion: every sentence is
+checked on its own as it completes, without its neighbours, while
+score_transcript checks the whole text at once.
+
+Words should carry their punctuation ("everyone," not "everyone" ","), as
+ASR engines emit it - the transcript is the words joined by single spaces.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from .analyzers import (
+    FALLBACK_GRAMMAR_CHECKS, NAME_INTRO_RE, OPENING_RE, analyze_speech_rate, clarity_points,
+    engagement_points, fallback_positive_score, flow_from, grammar_points, keywords_from_hits,
+    rubric_matcher, salutation_from_start, vocabulary_points,
+)
+from .checks import check_grammar, polarity_scores
+from .core import build_result
+from .document import TOKEN_RE
+from .engines import advanced_nlp_available, fallback_forced
+
+LIVE_WORKERS = 4
+# Characters of the lowercased transcript the opening criteria look at
+HEAD_CHARS = 64
+# Past the longest phrase, how far the keyword checks look ahead ("my name is X", "13 years old")
+_LOOKAHEAD = 8
+# Characters kept before the scan position for word boundaries and "13 years"
+_LOOKBEHIND = 8
+
+_TERMINATORS_RE = re.compile(r'([.!?]+)')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _background_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _executor = ThreadPoolExecutor(max_workers=LIVE_WORKERS, thread_name_prefix='scorer-live')
+    return _executor
+
+
+class StreamSearch:
+    """
+    Which of `patterns` occur anywhere in a stream of appended text. Each
+    feed only searches the new text plus `overlap` characters before it, so
+    matches must be shorter than overlap.
+    """
+
+    def __init__(self, patterns, overlap=16):
+        self.patterns = patterns
+        self.found = [False] * len(patterns)
+        self.overlap = overlap
+        self._tail = ''
+
+    def feed(self, text):
+        if all(self.found):
+            return
+        window = self._tail + text
+        start = max(len(self._tail) - self.overlap, 0)
+        for i, pattern in enumerate(self.patterns):
+            if not self.found[i] and pattern.search(window, start):
+                self.found[i] = True
+        self._tail = window[-2 * self.overlap:]
+
+
+class LiveScorer:
+    """
+    live = LiveScorer()
+    live.append('Hello', 0.0, 0.4)       # word, ASR start/end seconds (optional)
+    live.extend(['everyone,', 'myself', 'Ravi.'])
+    live.score()                          # same shape as score_transcript(), plus 'live'
+    live.finish()                         # final result once background checks are done
+
+    advanced=None uses LanguageTool/VADER when they are available.
+    """
+
+    def __init__(self, advanced=None, clock=time.monotonic):
+        self.advanced = advanced_nlp_available() if advanced is None else advanced
+        self.words = []
+        self.word_count = 0
+        self.finished = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # Running counts
+        self._lower_token_count = 0
+        self._unique_words = set()
+
+        # Rubric phrases: hits before _scanned are final, the rest are re-scanned each time
+        self._matcher = rubric_matcher()
+        self._margin = self._matcher.max_phrase_length + _LOOKAHEAD
+        self._hits = Counter()
+        self._provisional = Counter()
+        self._tail = ''
+        self._tail_start = 0
+        self._scanned = 0
+        self._lower_length = 0
+        self._head = ''
+
+        # Sentences: completed chunks (sentence + its end punctuation) and the current one
+        self._chunks = []
+        self._chunk = []
+        self._body_has_content = False
+        self._in_terminators = False
+        self._sentence_count = 0
+        # The first two sentences, stripped and joined by a space, as analyze_flow reads them
+        self._intro = StreamSearch([NAME_INTRO_RE])
+        self._intro_pending_space = ''
+        self._intro_started = False
+
+        self._fallback_grammar = StreamSearch([pattern for pattern, _ in FALLBACK_GRAMMAR_CHECKS])
+
+        # Timing
+        self._first_clock = None
+        self._finished_clock = None
+        self._first_start = None
+        self._last_time = None
+
+        # Background checks
+        self._grammar_jobs = {}
+        self._grammar_errors = 0
+        self._grammar_words = 0
+        self._grammar_issues = []
+        self._grammar_failed = False
+        self._sentiment = None
+        self._sentiment_job = None
+        self._sentiment_failed = False
+
+    @property
+    def text(self):
+        return ' '.join(self.words)
+
+    # ----- feeding
+
+    def append(self, word, start=None, end=None):
+        """Add one recognized word, with its ASR timestamps in seconds if known"""
+        if self.finished:
+            raise RuntimeError("LiveScorer is finished")
+        if self._first_clock is None:
+            self._first_clock = self._clock()
+        if start is not None:
+            if self._first_start is None:
+                self._first_start = start
+            self._last_time = max(self._last_time or start, start if end is None else end)
+        for piece in word.split():
+            self._add(piece)
+
+    def extend(self, words):
+        """Add several words - strings or (word, start, end) tuples"""
+        for word in words:
+            if isinstance(word, str):
+                self.append(word)
+            else:
+                self.append(*word)
+
+    def _add(self, word):
+        text = ' ' + word if self.words else word
+        self.words.append(word)
+
+        tokens = TOKEN_RE.findall(word)
+        self.word_count += len(tokens)
+        self._unique_words.update(t.lower() for t in tokens if t.isalpha())
+        lower = text.lower()
+        self._lower_token_count += len(TOKEN_RE.findall(lower))
+        if len(self._head) < HEAD_CHARS:
+            self._head = (self._head + lower)[:HEAD_CHARS]
+
+        self._lower_length += len(lower)
+        self._tail += lower
+        self._scan()
+        self._fallback_grammar.feed(text)
+        self._feed_sentences(text)
+
+    def _scan(self, final=False):
+        # A hit is final once the text runs far enough past its start that
+        # neither a longer phrase nor its look-ahead check can change
+        cutoff = self._lower_length if final else max(self._scanned, self._lower_length - self._margin)
+        offset = self._tail_start
+        provisional = Counter()
+        for category, start, _ in self._matcher.iter_hits(self._tail, self._scanned - offset):
+            if start + offset < cutoff:
+                self._hits[category] += 1
+            else:
+                provisional[category] += 1
+        self._provisional = provisional
+        self._scanned = cutoff
+        cut = cutoff - _LOOKBEHIND - offset
+        if cut > 0:
+            self._tail = self._tail[cut:]
+            self._tail_start += cut
+
+    def _feed_sentences(self, text):
+        for i, part in enumerate(_TERMINATORS_RE.split(text)):
+            if not part:
+                continue
+            if i % 2:
+                self._chunk.append(part)
+                self._in_terminators = True
+                continue
+            if self._in_terminators:
+                self._complete_chunk()
+            self._chunk.append(part)
+            if self._sentence_count < 2:
+                self._feed_intro(part)
+            if not self._body_has_content and part.strip():
+                self._body_has_content = True
+
+    def _feed_intro(self, part):
+        # Emit the sentence text with its surrounding whitespace stripped;
+        # inner whitespace is held back until something follows it
+        out = []
+        for piece in re.split(r'(\s+)', part):
+            if not piece:
+                continue
+            if piece.isspace():
+                if self._body_has_content:
+                    self._intro_pending_space += piece
+                continue
+            if not self._body_has_content and self._intro_started:
+                out.append(' ')
+            else:
+                out.append(self._intro_pending_space)
+            self._intro_pending_space = ''
+            self._intro_started = True
+            self._body_has_content = True
+            out.append(piece)
+        if out:
+            self._intro.feed(''.join(out).lower())
+
+    def _complete_chunk(self):
+        chunk = ''.join(self._chunk)
+        index = len(self._chunks)
+        self._chunks.append(chunk)
+        if self._body_has_content:
+            self._sentence_count += 1
+        self._chunk = []
+        self._body_has_content = False
+        self._in_terminators = False
+        self._intro_pending_space = ''
+
+        sentence = chunk.strip()
+        if self.advanced and sentence:
+            job = _background_executor().submit(check_grammar, sentence)
+            self._grammar_jobs[index] = (job, len(TOKEN_RE.findall(chunk)))
+            self._refresh_sentiment()
+
+    # ----- background checks
+
+    def _refresh_sentiment(self):
+        # At most one VADER job in flight; when it lands, it re-runs if more sentences completed
+        with self._lock:
+            if self._sentiment_failed or (self._sentiment_job is not None and not self._sentiment_job.done()):
+                return
+            count = len(self._chunks)
+            if self._sentiment is not None and self._sentiment[0] == count:
+                return
+            self._sentiment_job = _background_executor().submit(self._sentiment_upto, count)
+        self._sentiment_job.add_done_callback(self._sentiment_done)
+
+    def _sentiment_upto(self, count):
+        # VADER normalizes over the whole text, so it scores the completed prefix, not each sentence
+        return count, polarity_scores(''.join(self._chunks[:count]))
+
+    def _sentiment_done(self, job):
+        try:
+            result = job.result()
+        except Exception:
+            self._sentiment_failed = True
+            return
+        with self._lock:
+            if self._sentiment is None or result[0] > self._sentiment[0]:
+                self._sentiment = result
+        if result[0] < len(self._chunks):
+            self._refresh_sentiment()
+
+    def _collect_grammar(self, wait=False):
+        for index in sorted(self._grammar_jobs):
+            job, words = self._grammar_jobs[index]
+            if not (wait or job.done()):
+                continue
+            del self._grammar_jobs[index]
+            try:
+                matches = job.result()
+            except Exception:
+                self._grammar_failed = True
+                continue
+            self._grammar_errors += len(matches)
+            self._grammar_words += words
+            if matches:
+                # Keep the first three issues in transcript order
+                self._grammar_issues.append((index, [m['rule_id'] for m in matches[:3]]))
+                self._grammar_issues.sort(key=lambda item: item[0])
+                kept = 0
+                for i, (_, rule_ids) in enumerate(self._grammar_issues):
+                    kept += len(rule_ids)
+                    if kept >= 3:
+                        del self._grammar_issues[i + 1:]
+                        break
+
+    # ----- scoring
+
+    def elapsed(self):
+        """Speaking time so far in seconds: from the ASR timestamps, else the wall clock"""
+        if self._first_start is not None:
+            return self._last_time - self._first_start
+        if self._first_clock is not None:
+            return (self._finished_clock or self._clock()) - self._first_clock
+        return None
+
+    def _grammar(self, word_count):
+        if self.advanced and not self._grammar_failed and self._grammar_words:
+            errors_per_100 = (self._grammar_errors / self._grammar_words) * 100
+            grammar_ratio = 1 - min(errors_per_100 / 10, 1)
+            issues = [rule_id for _, rule_ids in self._grammar_issues for rule_id in rule_ids][:3]
+            return (grammar_points(grammar_ratio), issues, grammar_ratio, self._grammar_errors), None
+
+        issues = [message for (_, message), found in zip(FALLBACK_GRAMMAR_CHECKS, self._fallback_grammar.found)
+                  if found]
+        error_count = len(issues)
+        errors_per_100 = (error_count / word_count) * 100
+        grammar_ratio = 1 - min(errors_per_100 / 10, 1)
+        if not self.advanced:
+            reason = 'forced' if fallback_forced() else 'unavailable'
+        else:
+            reason = 'error' if self._grammar_failed else 'pending'
+        return (grammar_points(grammar_ratio), issues, grammar_ratio, error_count), reason
+
+    def _engagement(self, hits):
+        sentiment = self._sentiment
+        if self.advanced and sentiment is not None and not self._sentiment_failed:
+            scores = sentiment[1]
+            positive_score = scores['pos']
+            return (engagement_points(positive_score), positive_score, scores['compound']), None
+
+        positive_count = hits['positive']
+        positive_score = fallback_positive_score(positive_count, hits['negative'], self._lower_token_count)
+        if not self.advanced:
+            reason = 'forced' if fallback_forced() else 'unavailable'
+        else:
+            reason = 'error' if self._sentiment_failed else 'pending'
+        return (engagement_points(positive_score), positive_score, positive_count), reason
+
+    def score(self, duration_sec=None):
+        """The live result (None before the first word); duration_sec overrides the measured time"""
+        word_count = self.word_count
+        if not word_count:
+            return None
+        self._collect_grammar()
+
+        duration = duration_sec if duration_sec is not None else self.elapsed()
+        if not duration:
+            duration = word_count / 2.58
+        duration = max(duration, 1)
+
+        hits = self._hits + self._provisional
+        sentence_count = self._sentence_count + (1 if self._body_has_content else 0)
+        unique = len(self._unique_words)
+        ttr = unique / word_count
+        filler_rate = (hits['filler'] / word_count) * 100
+        grammar, grammar_reason = self._grammar(word_count)
+        engagement, engagement_reason = self._engagement(hits)
+
+        result = build_result(
+            word_count, sentence_count, duration,
+            salutation_from_start(self._head[:50]),
+            keywords_from_hits(hits),
+            flow_from(bool(OPENING_RE.match(self._head)), self._intro.found[0], hits['closing'] > 0),
+            analyze_speech_rate(word_count, duration),
+            grammar,
+            (vocabulary_points(ttr), ttr, unique),
+            (clarity_points(filler_rate), hits['filler'], filler_rate),
+            engagement,
+            grammar_reason, engagement_reason,
+        )
+        result['live'] = {
+            'final': self.finished,
+            'pending_sentences': len(self._grammar_jobs),
+            'sentiment_sentences': self._sentiment[0] if self._sentiment else 0,
+        }
+        return result
+
+    def finish(self, duration_sec=None):
+        """Close the transcript, wait for the background checks and return the final result"""
+        if not self.finished:
+            self.finished = True
+            self._finished_clock = self._clock()
+            if self._chunk:
+                self._complete_chunk()
+            self._scan(final=True)
+        self._collect_grammar(wait=True)
+        count = len(self._chunks)
+        if self.advanced and count and not self._sentiment_failed:
+            with self._lock:
+                current = self._sentiment
+            if current is None or current[0] < count:
+                try:
+                    result = self._sentiment_upto(count)
+                except Exception:
+                    self._sentiment_failed = True
+                else:
+                    with self._lock:
+                        self._sentiment = result
+        return self.score(duration_sec)
@@ -0,0 +1,296 @@
+"""
+Scoring transcripts too long to hold comfortably in memory.
+
+score_file() reads a transcript file in chunks - through mmap for large
+files - cutting each chunk right after a run of sentence-ending punctuation.
+A sentence longer than MAX_CHUNK_FACTOR chunks (unpunctuated ASR output) is
+cut at whitespace instead, so a word is never split. Only the running totals
+are kept: word and sentence counts, phrase hits, the set of distinct words,
+the first sentences. Phrases and patterns are matched with the tail of the
+previous chunk in front, so the ones across a cut are still found once, and
+a sentence left open at a cut is continued in the next chunk. LanguageTool
+checks the chunks in parallel threads, with a bounded number in flight.
+
+Every criterion adds up across chunks to exactly what score_transcript
+gives for the whole text, with two exceptions. VADER looks at the whole
+text at once (punctuation emphasis, "but" clauses), so per-chunk positive
+scores are combined as a word-weighted mean. LanguageTool checks a sentence
+cut at whitespace as two pieces. A transcript that fits in one chunk is
+scored exactly.
+"""
+import mmap
+import os
+import re
+from collections import Counter, deque
+
+from .analyzers import (
+    FALLBACK_GRAMMAR_CHECKS, NAME_INTRO_RE, OPENING_RE, analyze_speech_rate, clarity_points, engagement_points,
+    fallback_positive_score, flow_from, grammar_points, keywords_from_hits, rubric_matcher,
+    salutation_from_start, vocabulary_points,
+)
+from .checks import check_grammar, polarity_scores
+from .document import Document
+from .engines import EngineUnavailable, advanced_nlp_available, advanced_nlp_installed, fallback_forced
+from .matcher import is_word_char
+from .result import ScoreResult
+
+DEFAULT_CHUNK_BYTES = 256 * 1024
+DEFAULT_CHUNK_CHARS = 256 * 1024
+GRAMMAR_WORKERS = 4
+# A sentence running past this many chunk sizes is cut at whitespace
+MAX_CHUNK_FACTOR = 2
+
+_BYTE_TERMINATORS = (b'.', b'!', b'?')
+_TEXT_TERMINATORS = ('.', '!', '?')
+_BYTE_SPACES = (b' ', b'\t', b'\n')
+_TEXT_SPACES = (' ', '\t', '\n')
+_BYTE_RUN_RE = re.compile(rb'[.!?]+')
+_TEXT_RUN_RE = re.compile(r'[.!?]+')
+# Text kept on each side of a cut for phrases, their tail checks and the fallback patterns
+_SEAM_CHARS = 64
+
+
+def _next_cut(buf, start, limit, size, terminators, run_re, spaces):
+    """
+    Where the chunk starting at start ends: after the last run of sentence-ending
+    punctuation before limit, or after the first one past it. A sentence that
+    runs on past MAX_CHUNK_FACTOR times the chunk size is cut after the last
+    whitespace before limit instead (or the first one past it).
+    """
+    if limit >= size:
+        return size
+    last = max(buf.rfind(t, start, limit) for t in terminators)
+    if last < 0:
+        cap = min(start + (limit - start) * MAX_CHUNK_FACTOR, size)
+        later = [i for i in (buf.find(t, limit, cap) for t in terminators) if i >= 0]
+        if later:
+            last = min(later)
+        else:
+            space = max(buf.rfind(c, start, limit) for c in spaces)
+            if space < 0:
+                later = [i for i in (buf.find(c, limit) for c in spaces) if i >= 0]
+                if not later:
+                    return size
+                space = min(later)
+            return space + 1
+    return run_re.match(buf, last).end()
+
+
+def _seam_start(window, end):
+    # Keep _SEAM_CHARS before end for the next window, not starting inside a
+    # word, so that a \b at its start is a real word boundary
+    start = max(end - _SEAM_CHARS, 0)
+    while start and is_word_char(window[start - 1]):
+        start -= 1
+    return start
+
+
+def _newlines(text):
+    # What reading the file in text mode would give
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def split_text(text, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """Yield pieces of text of about chunk_chars, cut at sentence boundaries (see _next_cut)"""
+    size = len(text)
+    start = 0
+    while start < size:
+        end = _next_cut(text, start, start + chunk_chars, size, _TEXT_TERMINATORS, _TEXT_RUN_RE, _TEXT_SPACES)
+        yield text[start:end]
+        start = end
+
+
+def iter_file_chunks(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Yield the text of a UTF-8 transcript file in pieces of about chunk_bytes,
+    cut at sentence boundaries (see _next_cut). Files bigger than one chunk
+    are memory-mapped.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= chunk_bytes:
+            if size:
+                yield _newlines(f.read().decode('utf-8-sig'))
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            start = 3 if buf[:3] == b'\xef\xbb\xbf' else 0
+            while start < size:
+                # Terminators and spaces are ASCII, so a cut never lands inside a UTF-8 sequence
+                end = _next_cut(buf, start, start + chunk_bytes, size, _BYTE_TERMINATORS, _BYTE_RUN_RE,
+                                _BYTE_SPACES)
+                yield _newlines(buf[start:end].decode('utf-8'))
+                start = end
+
+
+def _grammar_job(text):
+    matches = check_grammar(text)
+    return len(matches), [match['rule_id'] for match in matches[:3]]
+
+
+def _sentiment_job(text, word_count):
+    return polarity_scores(text)['pos'] * word_count
+
+
+def score_chunks(chunks, duration_sec=None, strict=False, workers=GRAMMAR_WORKERS, compact=False):
+    """
+    Score a transcript given as consecutive pieces cut between words (as
+    split_text / iter_file_chunks produce them). Same result as
+    score_transcript on the joined text - see the module docstring for the
+    exceptions. compact=True returns a ScoreResult.
+    """
+    advanced = advanced_nlp_available()
+    if strict and not advanced and advanced_nlp_installed() and not fallback_forced():
+        raise EngineUnavailable("advanced NLP engines are installed but failed to start")
+
+    word_count = sentence_count = token_count = 0
+    head = ''
+    hits = Counter()
+    matcher = rubric_matcher()
+    # The end of the previous window, its lowercase, and where its uncounted hits start
+    carry = carry_lower = ''
+    counted = 0
+    # A sentence left open at the end of the previous chunk, and the space after it
+    open_sentence = False
+    pending = ''
+    # The first two sentences joined by a space, streamed through NAME_INTRO_RE
+    intro = ''
+    intro_count = 0
+    intro_open = False
+    name_early = False
+    unique_words = set()
+    fallback_found = set()
+    jobs = deque()
+    max_pending = workers * 2
+    grammar_failed = sentiment_failed = False
+    error_count = 0
+    grammar_issues = []
+    weighted_positive = 0.0
+
+    def feed_intro(piece):
+        nonlocal intro, name_early
+        if not name_early:
+            text = intro + piece.lower()
+            name_early = NAME_INTRO_RE.search(text) is not None
+            intro = text[-_SEAM_CHARS:]
+
+    def collect(job):
+        nonlocal grammar_failed, sentiment_failed, error_count, weighted_positive
+        grammar_job, sentiment_job = job
+        try:
+            count, issues = grammar_job.result()
+            error_count += count
+            grammar_issues.extend(issues[:3 - len(grammar_issues)])
+        except Exception:
+            if strict:
+                raise
+            grammar_failed = True
+        try:
+            weighted_positive += sentiment_job.result()
+        except Exception:
+            if strict:
+                raise
+            sentiment_failed = True
+
+    executor = None
+    if advanced:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scorer-longform')
+    try:
+        for chunk in chunks:
+            doc = Document(chunk)
+            word_count += doc.word_count
+            token_count += len(doc.lower_tokens)
+            if len(head) < 50:
+                head = (head + (doc.lower if head else doc.lower.lstrip()))[:50]
+            unique_words.update(w.lower() for w in doc.tokens if w.isalpha())
+
+            # A chunk cut at whitespace continues the sentence the last one left open
+            spans = doc.sentence_spans
+            stops = [i for i in (chunk.find(t) for t in _TEXT_TERMINATORS) if i >= 0]
+            continues = open_sentence and bool(spans) and spans[0][0] < min(stops, default=len(chunk))
+            sentence_count += len(spans) - continues
+            for i, (start, end) in enumerate(spans):
+                if i == 0 and continues:
+                    if intro_open:
+                        feed_intro(pending + chunk[:end])
+                else:
+                    intro_open = intro_count < 2
+                    if intro_open:
+                        feed_intro((' ' if intro_count else '') + chunk[start:end])
+                        intro_count += 1
+            last_stop = max(chunk.rfind(t) for t in _TEXT_TERMINATORS)
+            if spans and spans[-1][0] > last_stop:
+                open_sentence, pending = True, chunk[spans[-1][1]:][-_SEAM_CHARS:]
+            elif spans or last_stop >= 0:
+                open_sentence, pending = False, ''
+            elif open_sentence:
+                pending = (pending + chunk)[-_SEAM_CHARS:]
+
+            # Phrases and patterns across the cut are matched with the previous chunk's end in front;
+            # hits starting in the last _SEAM_CHARS wait for the next window, which can see past them
+            window, window_lower = carry + chunk, carry_lower + doc.lower
+            until = max(len(window) - _SEAM_CHARS, counted)
+            hits.update(category for category, start, _ in matcher.iter_hits(window_lower)
+                        if counted <= start < until)
+            fallback_found.update(i for i, (pattern, _) in enumerate(FALLBACK_GRAMMAR_CHECKS)
+                                  if i not in fallback_found and pattern.search(window))
+            keep = _seam_start(window, until)
+            carry, carry_lower, counted = window[keep:], window_lower[keep:], until - keep
+
+            if executor is not None:
+                jobs.append((executor.submit(_grammar_job, chunk),
+                             executor.submit(_sentiment_job, chunk, doc.word_count)))
+                while len(jobs) >= max_pending:
+                    collect(jobs.popleft())
+        while jobs:
+            collect(jobs.popleft())
+        hits.update(category for category, start, _ in matcher.iter_hits(carry_lower) if start >= counted)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if not word_count:
+        raise ValueError("transcript is empty")
+
+    if duration_sec is None:
+        duration_sec = word_count / 2.58
+    duration_sec = max(duration_sec, 1)
+
+    head = head.rstrip()
+    salutation = salutation_from_start(head)
+    keywords = keywords_from_hits(hits)
+    flow = flow_from(bool(OPENING_RE.match(head)), name_early, hits['closing'] > 0)
+    speech_rate = analyze_speech_rate(word_count, duration_sec)
+
+    ttr = len(unique_words) / word_count
+    vocabulary = vocabulary_points(ttr), ttr, len(unique_words)
+
+    filler_rate = (hits['filler'] / word_count) * 100
+    clarity = clarity_points(filler_rate), hits['filler'], filler_rate
+
+    reason = 'forced' if fallback_forced() else 'unavailable'
+    grammar_reason = engagement_reason = None
+    if not advanced or grammar_failed:
+        grammar_reason = 'error' if advanced else reason
+        grammar_issues = [FALLBACK_GRAMMAR_CHECKS[i][1] for i in sorted(fallback_found)]
+        error_count = len(grammar_issues)
+    grammar_ratio = 1 - min(((error_count / word_count) * 100) / 10, 1)
+    grammar = grammar_points(grammar_ratio), grammar_issues, grammar_ratio, error_count
+
+    if not advanced or sentiment_failed:
+        engagement_reason = 'error' if advanced else reason
+        positive_score = fallback_positive_score(hits['positive'], hits['negative'], token_count)
+    else:
+        positive_score = round(weighted_positive / word_count, 3)
+    engagement = engagement_points(positive_score), positive_score
+
+    result = ScoreResult.from_analyses(word_count, sentence_count, duration_sec, salutation, keywords, flow,
+                                       speech_rate, grammar, vocabulary, clarity, engagement,
+                                       grammar_reason, engagement_reason)
+    return result if compact else result.to_dict()
+
+
+def score_file(path, duration_sec=None, strict=False, chunk_bytes=DEFAULT_CHUNK_BYTES, workers=GRAMMAR_WORKERS,
+               compact=False):
+    """Score a UTF-8 transcript file chunk by chunk (see score_chunks)"""
+    return score_chunks(iter_file_chunks(path, chunk_bytes), duration_sec, strict, workers, compact)
@@ -0,0 +1,98 @@
+"""
+Stub LanguageTool HTTP server for tests and benchmarks without a JVM.
+
+Speaks the subset of the LanguageTool v2 API the scorer uses
+(GET /v2/languages, POST /v2/check) and flags a few simple patterns.
+--delay-ms and --per-char-us simulate the latency of the real server.
+
+    python -m scorer.ltstub --port 8081 --delay-ms 20
+"""
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+RULES = [
+    (re.compile(r'\bi\b'), 'I_LOWERCASE', 'CASING', "The personal pronoun 'I' should be uppercase.", 'I'),
+    (re.compile(r'\b(\w+) \1\b', re.IGNORECASE), 'ENGLISH_WORD_REPEAT_RULE', 'MISC', "Possible typo: you repeated a word.", None),
+    (re.compile(r' {2,}'), 'WHITESPACE_RULE', 'TYPOGRAPHY', "Possible typo: you repeated a whitespace.", ' '),
+    (re.compile(r'\b(gonna|wanna|gotta)\b', re.IGNORECASE), 'INFORMAL', 'STYLE', "Informal contraction.", None),
+]
+
+
+def check_text(text):
+    matches = []
+    for pattern, rule_id, category, message, replacement in RULES:
+        for m in pattern.finditer(text):
+            matches.append({
+                'message': message,
+                'replacements': [{'value': replacement}] if replacement else [],
+                'offset': m.start(),
+                'length': m.end() - m.start(),
+                'rule': {'id': rule_id, 'category': {'id': category}},
+            })
+    matches.sort(key=lambda m: m['offset'])
+    return matches
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    delay_ms = 0.0
+    per_char_us = 0.0
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.endswith('/v2/languages'):
+            self._send([{'name': 'English (US)', 'code': 'en', 'longCode': 'en-US'}])
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.endswith('/v2/check'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        text = form.get('text', [''])[0]
+        time.sleep((self.delay_ms * 1000 + self.per_char_us * len(text)) / 1e6)
+        self._send({'matches': check_text(text)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1', delay_ms=0.0, per_char_us=0.0):
+    handler = type('Handler', (StubHandler,), {'delay_ms': delay_ms, 'per_char_us': per_char_us})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m scorer.ltstub', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--delay-ms', type=float, default=0.0, help="fixed latency per request")
+    parser.add_argument('--per-char-us', type=float, default=0.0, help="extra latency per character checked")
+    args = parser.parse_args(argv)
+    server = serve(args.port, args.host, args.delay_ms, args.per_char_us)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
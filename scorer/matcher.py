@@ -0,0 +1,97 @@
+"""
+Compiled multi-phrase matcher.
+
+All rubric phrases (keyword categories, fillers, sentiment words, closings)
+are compiled once into a single regex of zero-width lookaheads, so one scan
+of the lowercased text finds every occurrence of every phrase - including
+overlapping ones - and reports per-category counts.
+
+The alternation is built as a character trie, so the regex engine tests
+one branch per character instead of every phrase at every position. At each
+position the lookahead reports the longest phrase starting there; every
+shorter phrase that also starts there is one of its prefixes, which are
+resolved ahead of time. Phrases can require whole-word boundaries
+(like \\bphrase\\b) or carry an extra check for the few regex-style rubric
+patterns (e.g. "13 years old").
+"""
+import re
+from collections import Counter
+
+
+def is_word_char(c):
+    """Same definition of a word character as \\w in re"""
+    return c.isalnum() or c == '_'
+
+
+def trie_pattern(phrases):
+    """Regex alternation of phrases factored into a prefix trie (longest match first)"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for c in phrase:
+            node = node.setdefault(c, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(c) + build(child) for c, child in sorted(node.items()) if c]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A phrase ends here too: try the longer continuations first, then stop
+        return '(?:' + pattern + ')?' if '' in node else pattern
+
+    return build(trie)
+
+
+class PhraseRule:
+    __slots__ = ('category', 'whole_word', 'check')
+
+    def __init__(self, category, whole_word=False, check=None):
+        self.category = category
+        self.whole_word = whole_word
+        self.check = check
+
+
+class PhraseMatcher:
+    """
+    rules: iterable of (phrase, category, whole_word) or
+    (phrase, category, whole_word, check) where check(text, start, end) -> bool.
+    Phrases are matched against lowercased text.
+    """
+
+    def __init__(self, rules):
+        by_phrase = {}
+        for rule in rules:
+            phrase, category, whole_word = rule[:3]
+            check = rule[3] if len(rule) > 3 else None
+            by_phrase.setdefault(phrase, []).append(PhraseRule(category, whole_word, check))
+
+        self.phrases = sorted(by_phrase, key=lambda p: (-len(p), p))
+        self.max_phrase_length = len(self.phrases[0]) if self.phrases else 0
+        self.categories = sorted({r.category for rules in by_phrase.values() for r in rules})
+
+        # For each phrase, the rules of every phrase that is a prefix of it (itself included)
+        self._rules = {
+            phrase: [(len(other), r) for other in self.phrases if phrase.startswith(other)
+                     for r in by_phrase[other]]
+            for phrase in self.phrases
+        }
+        self._regex = re.compile('(?=(' + trie_pattern(self.phrases) + '))')
+
+    def iter_hits(self, text, start=0):
+        """Yield (category, start, end) for every phrase occurrence in text (from index start on)"""
+        size = len(text)
+        for m in self._regex.finditer(text, start):
+            start = m.start()
+            for length, rule in self._rules[m.group(1)]:
+                end = start + length
+                if rule.whole_word and ((start and is_word_char(text[start - 1])) or
+                                        (end < size and is_word_char(text[end]))):
+                    continue
+                if rule.check is not None and not rule.check(text, start, end):
+                    continue
+                yield rule.category, start, end
+
+    def scan(self, text):
+        """Count occurrences per category in a single pass"""
+        return Counter(category for category, _, _ in self.iter_hits(text))
@@ -0,0 +1,219 @@
+"""
+Opt-in instrumentation for score_transcript.
+
+score_transcript(..., timings=True) adds a 'timings' section to the result:
+wall and CPU time of the whole call, of building the Document and of every
+criterion, the backend each criterion used, and the cache hits behind the
+grammar and sentiment checks.
+
+With metrics enabled (enable() or SCORER_METRICS=1) every call is also
+folded into process-wide counters and histograms - render_prometheus()
+gives them in the Prometheus text format - and handed to any hook added
+with add_hook(). With neither on, instrumentation costs one flag check
+per call.
+"""
+import contextvars
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.environ.get('SCORER_METRICS', '') not in ('', '0')
+_hooks = []
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+def _reset_after_fork():
+    # A lock some other parent thread held at the fork would stay held in the child
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# The criterion section being timed in this thread/task, if any
+_section = contextvars.ContextVar('scorer_metrics_section', default=None)
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def enable(enabled=True):
+    """Turn process-wide aggregation on (or off)"""
+    global _enabled
+    _enabled = enabled
+
+
+def add_hook(hook):
+    """Call hook(timings) after every instrumented score_transcript"""
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def note(key, amount=1):
+    """Count an event (cache hit, sentences checked, ...) against the criterion being timed"""
+    section = _section.get()
+    if section is not None:
+        section[key] = section.get(key, 0) + amount
+
+
+class Recorder:
+    """Timings of one score_transcript call"""
+
+    def __init__(self):
+        self.sections = {}
+        self._settled = set()
+        self._wall = time.perf_counter_ns()
+        self._cpu = time.thread_time_ns()
+
+    def call(self, name, fn, *args, background=False):
+        """
+        fn(*args), timed as section `name`. A background call (a deadline job)
+        doesn't overwrite a section the calling thread has already settled.
+        """
+        section = {'wall_ms': 0.0, 'cpu_ms': 0.0}
+        token = _section.set(section)
+        wall = time.perf_counter_ns()
+        cpu = time.thread_time_ns()
+        try:
+            return fn(*args)
+        finally:
+            section['wall_ms'] = round((time.perf_counter_ns() - wall) / 1e6, 3)
+            section['cpu_ms'] = round((time.thread_time_ns() - cpu) / 1e6, 3)
+            _section.reset(token)
+            if not (background and name in self._settled):
+                self.sections[name] = section
+            if not background:
+                self._settled.add(name)
+
+    def finish(self, backends):
+        """The 'timings' dict; backends maps criterion -> (backend, fallback reason or None)"""
+        timings = {
+            'total': {
+                'wall_ms': round((time.perf_counter_ns() - self._wall) / 1e6, 3),
+                'cpu_ms': round((time.thread_time_ns() - self._cpu) / 1e6, 3),
+            },
+            'document': self.sections.get('document', {}),
+            'criteria': {},
+        }
+        for name, (backend, reason) in backends.items():
+            section = dict(self.sections.get(name, {}), backend=backend)
+            if reason:
+                section['fallback_reason'] = reason
+            timings['criteria'][name] = section
+        return timings
+
+
+def _inc(name, labels, amount=1):
+    key = (name, labels)
+    _counters[key] = _counters.get(key, 0) + amount
+
+
+def _observe(name, labels, value):
+    key = (name, labels)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+    counts = histogram[0]
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if value <= bound:
+            counts[i] += 1
+            break
+    histogram[1] += value
+    histogram[2] += 1
+
+
+def record(timings):
+    """Fold one call's timings into the process-wide metrics and run the hooks"""
+    with _lock:
+        _inc('scorer_transcripts_total', ())
+        _observe('scorer_score_seconds', (), timings['total']['wall_ms'] / 1000)
+        for name, section in timings['criteria'].items():
+            criterion = (('criterion', name),)
+            if 'wall_ms' in section:
+                _observe('scorer_criterion_seconds', criterion, section['wall_ms'] / 1000)
+                _inc('scorer_criterion_cpu_seconds_total', criterion, section['cpu_ms'] / 1000)
+            _inc('scorer_criterion_backend_total', criterion + (('backend', section['backend']),))
+            if 'fallback_reason' in section:
+                _inc('scorer_fallbacks_total', criterion + (('reason', section['fallback_reason']),))
+            for key, value in section.items():
+                if key not in ('wall_ms', 'cpu_ms', 'backend', 'fallback_reason'):
+                    _inc('scorer_cache_events_total', criterion + (('event', key),), value)
+    for hook in list(_hooks):
+        hook(timings)
+
+
+def snapshot():
+    """Counters and histograms as plain dicts (for tests and JSON dumps)"""
+    with _lock:
+        return {
+            'counters': {_series(name, labels): value for (name, labels), value in _counters.items()},
+            'histograms': {
+                _series(name, labels): {'buckets': dict(zip(LATENCY_BUCKETS, counts)), 'sum': total, 'count': count}
+                for (name, labels), (counts, total, count) in _histograms.items()
+            },
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _series(name, labels, extra=()):
+    labels = labels + extra
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+_HELP = {
+    'scorer_transcripts_total': ('counter', "Transcripts scored with instrumentation on"),
+    'scorer_criterion_cpu_seconds_total': ('counter', "CPU time spent in each criterion (this process only)"),
+    'scorer_criterion_backend_total': ('counter', "Criterion evaluations by backend"),
+    'scorer_fallbacks_total': ('counter', "Criteria scored with a fallback method, by reason"),
+    'scorer_cache_events_total': ('counter', "Cache hits and checks behind each criterion"),
+    'scorer_score_seconds': ('histogram', "End-to-end score_transcript latency"),
+    'scorer_criterion_seconds': ('histogram', "Wall time of each criterion"),
+}
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items())
+    lines = []
+    seen = set()
+
+    def header(name):
+        if name not in seen:
+            seen.add(name)
+            kind, help_text = _HELP.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in counters:
+        header(name)
+        # repr, not :g - six significant digits would round large counters
+        lines.append(f'{_series(name, labels)} {value!r}')
+    for (name, labels), (counts, total, count) in histograms:
+        header(name)
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, counts):
+            cumulative += n
+            lines.append(f'{_series(name + "_bucket", labels, (("le", f"{bound:g}"),))} {cumulative}')
+        lines.append(f'{_series(name + "_bucket", labels, (("le", "+Inf"),))} {count}')
+        lines.append(f'{_series(name + "_sum", labels)} {total!r}')
+        lines.append(f'{_series(name + "_count", labels)} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,181 @@
+"""
+Warm-fork worker pools: load the read-only scoring state once, then fork.
+
+A plain worker pool has every process import the scorer, load the VADER
+lexicon, compile the rubric patterns and (with semantic matching) load the
+sentence-transformers weights on its own. WarmPool does all of that once in
+the parent with preload() and forks the workers from it. Just for the fork the
+heap is frozen out of the garbage collector's reach (gc.freeze, so
+collections in the workers don't write to - and so copy - the shared
+pages); the parent unfreezes its own copy right after. The workers share
+those pages copy-on-write, so each extra worker costs little more than its
+own LanguageTool.
+
+LanguageTool is started after the fork, in each worker: a JVM, its threads
+and its sockets can't be carried over. For the same reason the sentence
+model is loaded but never run in the parent - torch's thread pool doesn't
+survive a fork. The scorer modules drop their parent's locks, thread
+pools and engine handles in any forked child (os.register_at_fork), so a
+lock some parent thread held at the fork isn't held forever in a worker.
+Each worker reports how long it took to start, and
+report() adds its memory from /proc: RSS, PSS (shared pages split between
+the processes sharing them) and private - the real per-worker cost.
+
+Forking is only used on Linux; worker_pool() falls back to a plain pool
+elsewhere or with SCORER_PREFORK=0.
+"""
+import gc
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_preloaded = set()
+_preload_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _preload_lock
+    _preload_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def prefork_available():
+    return sys.platform.startswith('linux') and os.environ.get('SCORER_PREFORK', '1') != '0'
+
+
+def process_memory(pid=None):
+    """{'rss_mb', 'pss_mb', 'private_mb'} of a process, from /proc (None if it is gone or there is no /proc)"""
+    pid = pid or os.getpid()
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        return None
+    return {
+        'rss_mb': round(fields.get('Rss', 0) / 1024, 1),
+        'pss_mb': round(fields.get('Pss', 0) / 1024, 1),
+        'private_mb': round((fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024, 1),
+    }
+
+
+def preload(semantic=False, rubric=None):
+    """
+    Load everything the workers only read: the scoring modules and their
+    compiled patterns, the rubric phrase matcher, the VADER lexicon, the
+    rubric plan and (semantic=True) the sentence model. Safe to call
+    again; only what is new gets loaded.
+    Returns {'seconds', 'memory'} for this process.
+    """
+    started = time.perf_counter()
+    with _preload_lock:
+        if 'core' not in _preloaded:
+            from . import analyzers, core  # noqa: F401 - module-level patterns compile on import
+            from .engines import advanced_nlp_installed, get_sentiment_analyzer
+            analyzers.rubric_matcher()
+            get_sentiment_analyzer()
+            if advanced_nlp_installed():
+                try:
+                    import language_tool_python  # noqa: F401 - the module only; the JVM starts per worker
+                except Exception:
+                    pass
+            _preloaded.add('core')
+        if rubric is not None:
+            from .rubric import get_plan
+            get_plan(rubric)  # compiled plans are cached, so this is cheap the second time
+        if semantic and 'semantic' not in _preloaded:
+            from .engines import get_sentence_model
+            get_sentence_model()
+            _preloaded.add('semantic')
+    return {'seconds': round(time.perf_counter() - started, 3), 'memory': process_memory()}
+
+
+def _init_warm_worker(cache_dir, reports):
+    from .batch import _init_worker
+    from .engines import engine_status
+    started = time.perf_counter()
+    _init_worker(cache_dir)
+    reports.put({'pid': os.getpid(), 'startup_sec': round(time.perf_counter() - started, 3),
+                 'engines': engine_status()})
+
+
+class WarmPool(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor whose workers are forked from a preloaded parent.
+
+    with WarmPool(8, semantic=True) as pool:
+        pool.start()                   # optional - fork and warm every worker now
+        pool.submit(score_record, record)
+        pool.report()                  # parent preload + per-worker startup and memory
+    """
+
+    def __init__(self, workers=None, cache_dir=None, semantic=False, rubric=None):
+        import multiprocessing
+        self.preload = preload(semantic, rubric)
+        context = multiprocessing.get_context('fork')
+        self._reports = context.Queue()
+        self._started = {}
+        self._forked = False
+        super().__init__(workers or os.cpu_count() or 1, mp_context=context,
+                         initializer=_init_warm_worker, initargs=(cache_dir, self._reports))
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self._forked:
+            return super().submit(fn, *args, **kwargs)
+        # With fork, the first submit starts the whole pool: freeze only for that
+        gc.collect()
+        gc.freeze()
+        try:
+            return super().submit(fn, *args, **kwargs)
+        finally:
+            self._forked = True
+            gc.unfreeze()
+
+    def start(self, timeout=None):
+        """Fork every worker and wait until each has started its engines; returns report()"""
+        from queue import Empty
+        # With fork, the first submit starts the whole pool
+        self.submit(os.getpid).result()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._started) < self._max_workers:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                info = self._reports.get(timeout=remaining)
+            except Empty:
+                break
+            self._started[info['pid']] = info
+        return self.report()
+
+    def report(self):
+        """{'parent': preload timings and memory, 'workers': [startup and memory of each live worker]}"""
+        from queue import Empty
+        while True:
+            try:
+                info = self._reports.get_nowait()
+            except Empty:
+                break
+            self._started[info['pid']] = info
+        workers = []
+        for pid, info in sorted(self._started.items()):
+            memory = process_memory(pid)
+            if memory is not None:
+                workers.append(dict(info, **memory))
+        return {'parent': dict(self.preload, memory=process_memory()), 'workers': workers}
+
+
+def worker_pool(workers=None, cache_dir=None, semantic=False, rubric=None):
+    """A WarmPool where forking is available, otherwise a plain pool that warms each worker on its own"""
+    if prefork_available():
+        return WarmPool(workers, cache_dir, semantic, rubric)
+    from .batch import _init_worker
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir,))
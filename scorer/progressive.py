@@ -0,0 +1,106 @@
+"""
+Scoring that shows the cheap criteria first.
+
+Salutation, keywords, flow, speech rate, vocabulary and clarity take
+microseconds; grammar and engagement wait on LanguageTool and VADER (and,
+on a cold start, on the JVM). ProgressiveScore scores the cheap criteria
+right away and sends grammar and engagement to background threads.
+result() can be called at any time: until a slow criterion lands, it is
+scored with its fallback method and reason 'pending', so the provisional
+overall score is always complete. Once both have landed, result() equals
+score_transcript's.
+"""
+from .analyzers import (
+    analyze_clarity, analyze_engagement_advanced, analyze_engagement_fallback, analyze_flow,
+    analyze_grammar_advanced, analyze_grammar_fallback, analyze_keywords, analyze_salutation,
+    analyze_speech_rate, analyze_vocabulary,
+)
+from .core import _advanced_executor, build_result
+from .document import as_document
+from .engines import advanced_nlp_available, fallback_forced
+
+
+class ProgressiveScore:
+    """
+    job = ProgressiveScore(text, duration_sec)
+    job.result()    # right away, with grammar/engagement provisional
+    job.done        # True once grammar and engagement have landed
+    job.cancel()    # drop the background checks (e.g. the transcript was resubmitted)
+    """
+
+    def __init__(self, text, duration_sec=None):
+        doc = self.doc = as_document(text)
+        if duration_sec is None:
+            duration_sec = doc.word_count / 2.58
+        self.duration_sec = max(duration_sec, 1)
+        self.cancelled = False
+
+        self._cheap = (
+            analyze_salutation(doc),
+            analyze_keywords(doc),
+            analyze_flow(doc),
+            analyze_speech_rate(doc.word_count, self.duration_sec),
+        )
+        self._vocabulary = analyze_vocabulary(doc)
+        self._clarity = analyze_clarity(doc)
+
+        self.advanced = advanced_nlp_available()
+        self._grammar_job = self._engagement_job = None
+        if self.advanced:
+            executor = _advanced_executor()
+            self._grammar_job = executor.submit(analyze_grammar_advanced, doc, True)
+            self._engagement_job = executor.submit(analyze_engagement_advanced, doc, True)
+
+    @property
+    def done(self):
+        """True when result() is final (or the job was cancelled)"""
+        if not self.advanced or self.cancelled:
+            return True
+        return self._grammar_job.done() and self._engagement_job.done()
+
+    @property
+    def pending(self):
+        """The criteria still being checked in the background"""
+        if not self.advanced or self.cancelled:
+            return []
+        jobs = (('grammar', self._grammar_job), ('engagement', self._engagement_job))
+        return [name for name, job in jobs if not job.done()]
+
+    def cancel(self):
+        """
+        Stop waiting for the background checks. A check that hasn't started is
+        dropped; one already running finishes and still fills the result cache.
+        """
+        self.cancelled = True
+        if self._grammar_job is not None:
+            self._grammar_job.cancel()
+            self._engagement_job.cancel()
+
+    def wait(self, timeout=None):
+        """Block until both slow criteria have landed (or timeout seconds), then return result()"""
+        if self.advanced and not self.cancelled:
+            from concurrent.futures import wait
+            wait([self._grammar_job, self._engagement_job], timeout=timeout)
+        return self.result()
+
+    def _slow(self, job, fallback):
+        if not self.advanced:
+            return fallback(self.doc), 'forced' if fallback_forced() else 'unavailable'
+        if self.cancelled:
+            return fallback(self.doc), 'cancelled'
+        if not job.done():
+            return fallback(self.doc), 'pending'
+        try:
+            return job.result(), None
+        except Exception:
+            return fallback(self.doc), 'error'
+
+    def result(self):
+        """The score as of now: final for the cheap criteria, provisional for pending ones"""
+        doc = self.doc
+        grammar, grammar_reason = self._slow(self._grammar_job, analyze_grammar_fallback)
+        engagement, engagement_reason = self._slow(self._engagement_job, analyze_engagement_fallback)
+        salutation, keywords, flow, speech_rate = self._cheap
+        return build_result(doc.word_count, doc.sentence_count, self.duration_sec, salutation, keywords, flow,
+                            speech_rate, grammar, self._vocabulary, self._clarity, engagement,
+                            grammar_reason, engagement_reason)
@@ -0,0 +1,209 @@
+"""
+Compact score results.
+
+ScoreResult holds only the numbers behind a score - points and metrics, the
+found keyword categories as bitmasks, the grammar issues and the fallback
+reasons - in a slotted object. The human-readable details are rendered only
+when asked for, and to_dict() gives the usual score_transcript JSON shape.
+"""
+from .analyzers import GOOD_TO_HAVE_PHRASES, MUST_HAVE_PHRASES
+from .checks import grammar_backend_name
+
+MUST_HAVE_KEYS = tuple(MUST_HAVE_PHRASES)
+GOOD_TO_HAVE_KEYS = tuple(GOOD_TO_HAVE_PHRASES)
+
+
+def keyword_mask(found, keys):
+    """Category names -> bitmask (bit i is keys[i])"""
+    mask = 0
+    for name in found:
+        mask |= 1 << keys.index(name)
+    return mask
+
+
+def keyword_names(mask, keys):
+    """Bitmask -> category names, in rubric order"""
+    return [key for bit, key in enumerate(keys) if mask >> bit & 1]
+
+
+class ScoreResult:
+    """One scored transcript. Points are ints, rates and ratios floats, as in the dict form."""
+
+    __slots__ = (
+        'word_count', 'sentence_count', 'duration_sec',
+        'salutation', 'salutation_detail', 'keywords', 'must_have_mask', 'good_to_have_mask',
+        'flow', 'flow_detail',
+        'speech_rate', 'wpm', 'speech_detail',
+        'grammar', 'grammar_issues', 'grammar_ratio', 'error_count',
+        'vocabulary', 'ttr', 'unique_words',
+        'clarity', 'filler_count', 'filler_rate',
+        'engagement', 'sentiment_score',
+        'grammar_reason', 'grammar_method', 'engagement_reason', 'timings',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f"unknown ScoreResult fields: {', '.join(fields)}")
+
+    @classmethod
+    def from_analyses(cls, word_count, sentence_count, duration_sec, salutation, keywords, flow, speech_rate,
+                      grammar, vocabulary, clarity, engagement, grammar_reason=None, engagement_reason=None):
+        """From the return values of the analyze_* functions"""
+        key_score, must_have, good_to_have = keywords
+        grammar_score, grammar_issues, grammar_ratio, error_count = grammar
+        return cls(
+            word_count=word_count,
+            sentence_count=sentence_count,
+            duration_sec=duration_sec,
+            salutation=salutation[0],
+            salutation_detail=salutation[1],
+            keywords=key_score,
+            must_have_mask=keyword_mask(must_have, MUST_HAVE_KEYS),
+            good_to_have_mask=keyword_mask(good_to_have, GOOD_TO_HAVE_KEYS),
+            flow=flow[0],
+            flow_detail=flow[1],
+            speech_rate=speech_rate[0],
+            wpm=speech_rate[1],
+            speech_detail=speech_rate[2],
+            grammar=grammar_score,
+            grammar_issues=tuple(grammar_issues[:3]),
+            grammar_ratio=grammar_ratio,
+            error_count=error_count,
+            vocabulary=vocabulary[0],
+            ttr=vocabulary[1],
+            unique_words=vocabulary[2],
+            clarity=clarity[0],
+            filler_count=clarity[1],
+            filler_rate=clarity[2],
+            engagement=engagement[0],
+            sentiment_score=engagement[1],
+            grammar_reason=grammar_reason,
+            grammar_method='fallback' if grammar_reason else grammar_backend_name(),
+            engagement_reason=engagement_reason,
+        )
+
+    @property
+    def must_have(self):
+        return keyword_names(self.must_have_mask, MUST_HAVE_KEYS)
+
+    @property
+    def good_to_have(self):
+        return keyword_names(self.good_to_have_mask, GOOD_TO_HAVE_KEYS)
+
+    @property
+    def content_score(self):
+        return self.salutation + self.keywords + self.flow
+
+    @property
+    def language_score(self):
+        return self.grammar + self.vocabulary
+
+    @property
+    def overall_score(self):
+        total = self.content_score + self.speech_rate + self.language_score + self.clarity + self.engagement
+        return round(total, 1)
+
+    @property
+    def methods(self):
+        return {
+            'grammar': {'method': self.grammar_method, 'reason': self.grammar_reason},
+            'engagement': {'method': 'fallback' if self.engagement_reason else 'vader', 'reason': self.engagement_reason},
+        }
+
+    def criteria(self):
+        """The per-criterion list of the dict form, details rendered now"""
+        must_have = self.must_have
+        good_to_have = self.good_to_have
+        grammar_issues = self.grammar_issues
+        filler_rate = self.filler_rate
+        engagement_score = self.engagement
+        return [
+            {
+                'name': 'Content & Structure',
+                'score': self.content_score,
+                'max': 40,
+                'weight': 40,
+                'details': [
+                    f" Salutation: {self.salutation}/5 - {self.salutation_detail}",
+                    f" Keywords: {self.keywords}/30 (Must-have: {len(must_have)}/5 [{', '.join(must_have) if must_have else 'None'}] | Good-to-have: {len(good_to_have)}/5 [{', '.join(good_to_have) if good_to_have else 'None'}])",
+                    f" Flow: {self.flow}/5 - {self.flow_detail}"
+                ]
+            },
+            {
+                'name': 'Speech Rate',
+                'score': self.speech_rate,
+                'max': 10,
+                'weight': 10,
+                'details': [
+                    f" WPM: {round(self.wpm, 1)} words/minute",
+                    f" Assessment: {self.speech_detail}",
+                    " Ideal range: 111-140 WPM"
+                ]
+            },
+            {
+                'name': 'Language & Grammar',
+                'score': self.language_score,
+                'max': 20,
+                'weight': 20,
+                'details': [
+                    f" Grammar: {self.grammar}/10 (Errors: {self.error_count}, Ratio: {self.grammar_ratio:.2f})",
+                    f" Vocabulary (TTR): {self.vocabulary}/10 (TTR: {self.ttr:.2f}, Unique: {self.unique_words}/{self.word_count})",
+                    f" Issues: {', '.join(str(i) for i in grammar_issues) if grammar_issues else 'None detected'}"
+                ]
+            },
+            {
+                'name': 'Clarity',
+                'score': self.clarity,
+                'max': 15,
+                'weight': 15,
+                'details': [
+                    f" Filler words: {self.filler_count} occurrences",
+                    f" Filler rate: {filler_rate:.2f}%",
+                    f" Assessment: {'Excellent clarity' if filler_rate <= 3 else 'Good' if filler_rate <= 6 else 'Needs improvement'}"
+                ]
+            },
+            {
+                'name': 'Engagement',
+                'score': engagement_score,
+                'max': 15,
+                'weight': 15,
+                'details': [
+                    f" Sentiment score: {self.sentiment_score:.3f}",
+                    f" Method: {'Word-based (fallback)' if self.engagement_reason else 'VADER (advanced)'}",
+                    f" Assessment: {'Very engaging' if engagement_score >= 12 else 'Moderately engaging' if engagement_score >= 9 else 'Could be more enthusiastic'}"
+                ]
+            }
+        ]
+
+    def to_dict(self):
+        """The score_transcript JSON shape"""
+        result = {
+            'overall_score': self.overall_score,
+            'word_count': self.word_count,
+            'sentence_count': self.sentence_count,
+            'duration': round(self.duration_sec, 1),
+            'wpm': round(self.wpm, 1),
+            'methods': self.methods,
+            'criteria': self.criteria(),
+        }
+        if self.timings is not None:
+            result['timings'] = self.timings
+        return result
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, ScoreResult):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return (f"ScoreResult(overall_score={self.overall_score}, word_count={self.word_count}, "
+                f"wpm={self.wpm:.1f})")
@@ -0,0 +1,741 @@
+"""
+Rubric definitions compiled into scoring plans.
+
+A rubric is plain data - JSON or YAML - holding the phrases, patterns,
+thresholds and weights of every criterion. default_rubric() is the built-in
+one, and `python -m scorer rubric dump` writes it out as a starting point.
+A file with "extends": "default" only needs to list what it changes.
+
+compile_rubric() validates a rubric once and builds an immutable
+ScoringPlan with every matcher precompiled. Plans are cached by a hash of
+the rubric, so several can share a process and recompiling an unchanged
+rubric is free. Criteria with "enabled": false, or that no group lists,
+are not computed at all.
+
+RubricFile re-reads a rubric file when it changes on disk, so long-running
+workers pick up edits without a restart.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .analyzers import (
+    AGE_NUMBER_TAIL_RE, CLOSING_PHRASES, FALLBACK_GRAMMAR_CHECKS, FILLER_WORDS, GOOD_TO_HAVE_PHRASES,
+    MUST_HAVE_PHRASES, NAME_INTRO_RE, NAME_TAIL_RE, NEGATIVE_WORDS, OPENING_RE, POSITIVE_WORDS,
+    SALUTATION_LEVELS, YEARS_OLD_TAIL_RE, digits_before,
+)
+from .checks import check_grammar, grammar_backend_name, polarity_scores
+from .document import as_document
+from .engines import EngineUnavailable, advanced_nlp_available, advanced_nlp_installed, fallback_forced
+from .matcher import PhraseMatcher
+
+CRITERIA = ('salutation', 'keywords', 'flow', 'speech_rate', 'grammar', 'vocabulary', 'clarity', 'engagement')
+RELOAD_INTERVAL = 2.0
+PLAN_CACHE_SIZE = 64
+
+
+class RubricError(ValueError):
+    """A rubric that can't be loaded or compiled"""
+
+
+def default_rubric():
+    """The built-in rubric as plain data (what score_transcript scores against)"""
+    name_tail = {'followed_by': NAME_TAIL_RE.pattern}
+    conditions = {('Name', phrase): name_tail for phrase in MUST_HAVE_PHRASES['Name']}
+    conditions[('Age', 'year')] = {'after_number': True, 'followed_by': YEARS_OLD_TAIL_RE.pattern}
+    conditions[('Age', 'age')] = {'followed_by': AGE_NUMBER_TAIL_RE.pattern}
+
+    def categories(phrases):
+        return {
+            category: [dict(conditions[(category, p)], phrase=p) if (category, p) in conditions else p
+                       for p in category_phrases]
+            for category, category_phrases in phrases.items()
+        }
+
+    return {
+        'name': 'default',
+        'groups': [
+            {'name': 'Content & Structure', 'criteria': ['salutation', 'keywords', 'flow']},
+            {'name': 'Speech Rate', 'criteria': ['speech_rate']},
+            {'name': 'Language & Grammar', 'criteria': ['grammar', 'vocabulary']},
+            {'name': 'Clarity', 'criteria': ['clarity']},
+            {'name': 'Engagement', 'criteria': ['engagement']},
+        ],
+        'criteria': {
+            'salutation': {
+                'max': 5,
+                'window': 50,
+                'levels': [{'points': points, 'label': label, 'phrases': phrases}
+                           for points, label, phrases in SALUTATION_LEVELS],
+                'otherwise': {'points': 0, 'label': "No salutation found"},
+            },
+            'keywords': {
+                'max': 30,
+                'tiers': [
+                    {'name': 'Must-have', 'points': 4, 'cap': 20, 'categories': categories(MUST_HAVE_PHRASES)},
+                    {'name': 'Good-to-have', 'points': 2, 'cap': 10, 'categories': categories(GOOD_TO_HAVE_PHRASES)},
+                ],
+            },
+            'flow': {
+                'max': 5,
+                'points': 5,
+                'opening_pattern': OPENING_RE.pattern,
+                'name_pattern': NAME_INTRO_RE.pattern,
+                'name_sentences': 2,
+                'closing_phrases': CLOSING_PHRASES,
+                'label': "Excellent flow - Proper structure followed",
+                'otherwise_label': "Flow not followed - Missing proper opening, name introduction, or closing",
+            },
+            'speech_rate': {
+                'max': 10,
+                'ranges': [
+                    {'above': 161, 'points': 2, 'label': "Too Fast"},
+                    {'from': 141, 'to': 160, 'points': 6, 'label': "Fast (Good)"},
+                    {'from': 111, 'to': 140, 'points': 10, 'label': "Ideal pace"},
+                    {'from': 81, 'to': 110, 'points': 6, 'label': "Slow (Acceptable)"},
+                ],
+                'otherwise': {'points': 2, 'label': "Too Slow"},
+                'ideal': "111-140",
+            },
+            'grammar': {
+                'max': 10,
+                'errors_per_100_cap': 10,
+                'ladder': {'at_least': [[0.9, 10], [0.7, 8], [0.5, 6], [0.3, 4]], 'otherwise': 2},
+                'fallback_checks': [{'pattern': pattern.pattern, 'message': message,
+                                     'ignore_case': bool(pattern.flags & re.IGNORECASE)}
+                                    for pattern, message in FALLBACK_GRAMMAR_CHECKS],
+            },
+            'vocabulary': {
+                'max': 10,
+                'ladder': {'at_least': [[0.9, 10], [0.7, 8], [0.5, 6], [0.3, 4]], 'otherwise': 2},
+            },
+            'clarity': {
+                'max': 15,
+                'fillers': FILLER_WORDS,
+                'ladder': {'at_most': [[3, 15], [6, 12], [9, 9], [12, 6]], 'otherwise': 3},
+                'assessments': {'at_most': [[3, "Excellent clarity"], [6, "Good"]], 'otherwise': "Needs improvement"},
+            },
+            'engagement': {
+                'max': 15,
+                'ladder': {'at_least': [[0.9, 15], [0.7, 12], [0.5, 9], [0.3, 6]], 'otherwise': 3},
+                'assessments': {'at_least': [[12, "Very engaging"], [9, "Moderately engaging"]],
+                                'otherwise': "Could be more enthusiastic"},
+                'positive_words': sorted(POSITIVE_WORDS),
+                'negative_words': sorted(NEGATIVE_WORDS),
+                'fallback_ladder': {'at_least': [[8, 0.9], [6, 0.7], [4, 0.5], [2, 0.3]], 'otherwise': 0.1},
+                'negative_penalty': 0.1,
+            },
+        },
+    }
+
+
+def _merge(base, override):
+    """override on top of base: dicts merge key by key, everything else replaces"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def resolve_rubric(config):
+    """Apply "extends": "default" and check the rubric's overall shape"""
+    if not isinstance(config, dict):
+        raise RubricError("a rubric must be a mapping")
+    config = copy.deepcopy(config)
+    extends = config.pop('extends', None)
+    if extends == 'default':
+        config = _merge(default_rubric(), config)
+    elif extends is not None:
+        raise RubricError(f"unknown base rubric {extends!r} (only 'default' can be extended)")
+    criteria = config.get('criteria')
+    if not isinstance(criteria, dict):
+        raise RubricError("'criteria' must be a mapping")
+    unknown = set(criteria) - set(CRITERIA)
+    if unknown:
+        raise RubricError(f"unknown criteria: {', '.join(sorted(unknown))}")
+    if not isinstance(config.get('groups'), list):
+        raise RubricError("'groups' must be a list")
+    return config
+
+
+def rubric_digest(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _is(value, kind):
+    # float means any number; bools are never numbers
+    if kind is float:
+        kind = (int, float)
+    return isinstance(value, kind) and not (isinstance(value, bool) and kind is not bool)
+
+
+def _field(spec, key, kind, where):
+    if not isinstance(spec, dict):
+        raise RubricError(f"{where}: expected a mapping")
+    if key not in spec:
+        raise RubricError(f"{where}: missing '{key}'")
+    value = spec[key]
+    if not _is(value, kind):
+        raise RubricError(f"{where}: '{key}' has the wrong type")
+    return value
+
+
+def _optional(spec, key, kind, default, where):
+    return _field(spec, key, kind, where) if key in spec else default
+
+
+def _ladder(spec, where, kind=float):
+    """kind is the type of the values: numbers for points, str for assessments"""
+    if not isinstance(spec, dict) or ('at_least' in spec) == ('at_most' in spec):
+        raise RubricError(f"{where}: a ladder needs exactly one of 'at_least' / 'at_most'")
+    at_most = 'at_most' in spec
+    steps = _field(spec, 'at_most' if at_most else 'at_least', list, where)
+    if not all(isinstance(step, (list, tuple)) and len(step) == 2 and _is(step[0], float) and _is(step[1], kind)
+               for step in steps):
+        raise RubricError(f"{where}: ladder steps must be [number, {'text' if kind is str else 'number'}] pairs")
+    return tuple((bound, value) for bound, value in steps), at_most, _field(spec, 'otherwise', kind, where)
+
+
+def _climb(value, ladder):
+    steps, at_most, otherwise = ladder
+    for bound, result in steps:
+        if (value <= bound) if at_most else (value >= bound):
+            return result
+    return otherwise
+
+
+def _compile_pattern(pattern, where, flags=re.IGNORECASE):
+    try:
+        return re.compile(pattern, flags)
+    except (re.error, TypeError) as e:
+        raise RubricError(f"{where}: bad pattern {pattern!r}: {e}")
+
+
+def _phrase_check(followed_by, after_number):
+    def check(text, start, end):
+        if after_number and not digits_before(text, start):
+            return False
+        return followed_by is None or followed_by.match(text, end) is not None
+    return check
+
+
+def _phrases(values, where):
+    if not isinstance(values, list) or not all(isinstance(v, str) and v for v in values):
+        raise RubricError(f"{where}: expected a list of phrases")
+    return [v.lower() for v in values]
+
+
+class ScoringPlan:
+    """
+    A compiled rubric. plan.score(text, duration_sec) returns the usual result
+    dict, plus 'rubric': {'name', 'digest'}. Plans are immutable.
+    """
+
+    __slots__ = ('name', 'digest', 'matcher', 'groups', '_rubric', '_criteria')
+
+    def __init__(self, config, digest):
+        set_ = object.__setattr__
+        set_(self, 'name', str(config.get('name', 'rubric')))
+        set_(self, 'digest', digest)
+        set_(self, '_rubric', json.dumps(config, sort_keys=True))
+
+        referenced = set()
+        for i, group in enumerate(config['groups']):
+            where = f"groups[{i}]"
+            for member in _field(group, 'criteria', list, where):
+                if member not in config['criteria']:
+                    raise RubricError(f"{where}: no criterion {member!r}")
+                referenced.add(member)
+
+        # Criteria no group scores are still validated, but never computed
+        rules = []
+        criteria = {}
+        for name, spec in config['criteria'].items():
+            if not isinstance(spec, dict):
+                raise RubricError(f"criteria.{name}: expected a mapping")
+            if spec.get('enabled', True):
+                compiled = _COMPILERS[name](spec, rules if name in referenced else [], f"criteria.{name}")
+                if name in referenced:
+                    criteria[name] = compiled
+
+        groups = []
+        for i, group in enumerate(config['groups']):
+            where = f"groups[{i}]"
+            enabled = tuple(m for m in group['criteria'] if m in criteria)
+            if not enabled:
+                continue
+            max_points = sum(criteria[m]['max'] for m in enabled)
+            weight = _optional(group, 'weight', float, max_points, where)
+            groups.append((_field(group, 'name', str, where), enabled, max_points, weight))
+
+        set_(self, 'groups', tuple(groups))
+        set_(self, '_criteria', tuple((name, criteria[name]) for name in CRITERIA if name in criteria))
+        set_(self, 'matcher', PhraseMatcher(rules) if rules else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScoringPlan is immutable")
+
+    @property
+    def rubric(self):
+        """The resolved rubric this plan was compiled from (a copy)"""
+        return json.loads(self._rubric)
+
+    @property
+    def enabled(self):
+        return [name for name, _ in self._criteria]
+
+    def score(self, text, duration_sec=None, strict=False):
+        doc = as_document(text)
+        word_count = doc.word_count
+        sentence_count = doc.sentence_count
+
+        if duration_sec is None:
+            duration_sec = word_count / 2.58
+
+        duration_sec = max(duration_sec, 1)
+
+        advanced = advanced_nlp_available()
+        if strict and not advanced and advanced_nlp_installed() and not fallback_forced():
+            raise EngineUnavailable("advanced NLP engines are installed but failed to start")
+
+        context = {
+            'doc': doc,
+            'hits': doc.match(self.matcher) if self.matcher is not None else Counter(),
+            'duration_sec': duration_sec,
+            'advanced': advanced,
+            'strict': strict,
+            'methods': {},
+        }
+        outcomes = {name: spec['score'](spec, context) for name, spec in self._criteria}
+
+        total = 0
+        criteria = []
+        for name, members, max_points, weight in self.groups:
+            score = sum(outcomes[m][0] for m in members)
+            total += score if weight == max_points else score * weight / max_points
+            criteria.append({
+                'name': name,
+                'score': score,
+                'max': max_points,
+                'weight': weight,
+                'details': [line for m in members for line in outcomes[m][1]]
+                           + [line for m in members for line in outcomes[m][2]],
+            })
+
+        wpm = (word_count / duration_sec) * 60
+        return {
+            'overall_score': round(total, 1),
+            'word_count': word_count,
+            'sentence_count': sentence_count,
+            'duration': round(duration_sec, 1),
+            'wpm': round(wpm, 1),
+            'methods': context['methods'],
+            'criteria': criteria,
+            'rubric': {'name': self.name, 'digest': self.digest[:12]},
+        }
+
+    def __repr__(self):
+        return f"ScoringPlan({self.name!r}, digest={self.digest[:12]}, criteria={self.enabled})"
+
+
+# ----- criteria: compile(spec, rules, where) -> dict with 'max' and 'score'(spec, context)
+#       -> (points, detail lines, trailing detail lines)
+
+def _compile_salutation(spec, rules, where):
+    levels = []
+    for i, level in enumerate(_field(spec, 'levels', list, where)):
+        level_where = f"{where}.levels[{i}]"
+        levels.append((_field(level, 'points', float, level_where), _field(level, 'label', str, level_where),
+                       _phrases(_field(level, 'phrases', list, level_where), level_where)))
+    otherwise = _field(spec, 'otherwise', dict, where)
+    return {
+        'max': _field(spec, 'max', float, where),
+        'window': _field(spec, 'window', int, where),
+        'levels': levels,
+        'otherwise': _otherwise(otherwise, where + '.otherwise'),
+        'score': _score_salutation,
+    }
+
+
+def _otherwise(spec, where):
+    return _optional(spec, 'points', float, 0, where), _optional(spec, 'label', str, '', where)
+
+
+def _score_salutation(spec, context):
+    start = context['doc'].lower_stripped[:spec['window']]
+    points, label = spec['otherwise']
+    for level_points, level_label, phrases in spec['levels']:
+        if any(phrase in start for phrase in phrases):
+            points, label = level_points, level_label
+            break
+    return points, [f" Salutation: {points}/{spec['max']} - {label}"], []
+
+
+def _compile_keywords(spec, rules, where):
+    tiers = []
+    for i, tier in enumerate(_field(spec, 'tiers', list, where)):
+        tier_where = f"{where}.tiers[{i}]"
+        categories = _field(tier, 'categories', dict, tier_where)
+        for category, entries in categories.items():
+            if not isinstance(entries, list):
+                raise RubricError(f"{tier_where}.categories.{category}: expected a list of phrases")
+            for j, entry in enumerate(entries):
+                entry_where = f"{tier_where}.categories.{category}[{j}]"
+                if isinstance(entry, str):
+                    entry = {'phrase': entry}
+                phrase = _phrases([_field(entry, 'phrase', str, entry_where)], entry_where)[0]
+                check = None
+                if entry.get('followed_by') or entry.get('after_number'):
+                    followed_by = entry.get('followed_by')
+                    check = _phrase_check(followed_by and _compile_pattern(followed_by, entry_where),
+                                          bool(entry.get('after_number')))
+                rules.append((phrase, 'keyword:' + category, bool(entry.get('whole_word', False)), check))
+        tiers.append((_field(tier, 'name', str, tier_where), _field(tier, 'points', float, tier_where),
+                      _field(tier, 'cap', float, tier_where), tuple(categories)))
+    return {'max': _field(spec, 'max', float, where), 'tiers': tiers, 'score': _score_keywords}
+
+
+def _score_keywords(spec, context):
+    hits = context['hits']
+    total = 0
+    parts = []
+    for name, points, cap, categories in spec['tiers']:
+        found = [c for c in categories if hits['keyword:' + c]]
+        total += min(len(found) * points, cap)
+        parts.append(f"{name}: {len(found)}/{len(categories)} [{', '.join(found) if found else 'None'}]")
+    return total, [f" Keywords: {total}/{spec['max']} ({' | '.join(parts)})"], []
+
+
+def _compile_flow(spec, rules, where):
+    for phrase in _phrases(spec.get('closing_phrases', []), where):
+        rules.append((phrase, 'closing', False))
+    return {
+        'max': _field(spec, 'max', float, where),
+        'points': _field(spec, 'points', float, where),
+        'opening': _compile_pattern(_field(spec, 'opening_pattern', str, where), where),
+        'name': _compile_pattern(_field(spec, 'name_pattern', str, where), where),
+        'name_sentences': _optional(spec, 'name_sentences', int, 2, where),
+        'label': _optional(spec, 'label', str, '', where),
+        'otherwise_label': _optional(spec, 'otherwise_label', str, '', where),
+        'score': _score_flow,
+    }
+
+
+def _score_flow(spec, context):
+    doc = context['doc']
+    has_opening = spec['opening'].match(doc.lower_stripped) is not None
+    has_closing = context['hits']['closing'] > 0
+    name_early = False
+    if doc.sentence_count >= 1:
+        first = ' '.join(doc.sentences[:spec['name_sentences']]).lower()
+        name_early = spec['name'].search(first) is not None
+    if has_opening and name_early and has_closing:
+        points, label = spec['points'], spec['label']
+    else:
+        points, label = 0, spec['otherwise_label']
+    return points, [f" Flow: {points}/{spec['max']} - {label}"], []
+
+
+_BOUNDS = {
+    'above': lambda wpm, bound: wpm > bound,
+    'from': lambda wpm, bound: wpm >= bound,
+    'to': lambda wpm, bound: wpm <= bound,
+    'below': lambda wpm, bound: wpm < bound,
+}
+
+
+def _compile_speech_rate(spec, rules, where):
+    ranges = []
+    for i, entry in enumerate(_field(spec, 'ranges', list, where)):
+        range_where = f"{where}.ranges[{i}]"
+        if not isinstance(entry, dict):
+            raise RubricError(f"{range_where}: expected a mapping")
+        bounds = tuple((_BOUNDS[key], _field(entry, key, float, range_where)) for key in _BOUNDS if key in entry)
+        if not bounds:
+            raise RubricError(f"{range_where}: needs at least one of {', '.join(_BOUNDS)}")
+        ranges.append((bounds, _field(entry, 'points', float, range_where), _field(entry, 'label', str, range_where)))
+    otherwise = _field(spec, 'otherwise', dict, where)
+    return {
+        'max': _field(spec, 'max', float, where),
+        'ranges': ranges,
+        'otherwise': _otherwise(otherwise, where + '.otherwise'),
+        'ideal': str(spec.get('ideal', '')),
+        'score': _score_speech_rate,
+    }
+
+
+def _score_speech_rate(spec, context):
+    wpm = (context['doc'].word_count / context['duration_sec']) * 60
+    points, label = spec['otherwise']
+    for bounds, range_points, range_label in spec['ranges']:
+        if all(test(wpm, bound) for test, bound in bounds):
+            points, label = range_points, range_label
+            break
+    lines = [f" WPM: {round(wpm, 1)} words/minute", f" Assessment: {label}"]
+    if spec['ideal']:
+        lines.append(f" Ideal range: {spec['ideal']} WPM")
+    return points, lines, []
+
+
+def _fallback_reason(context):
+    return 'forced' if fallback_forced() else 'unavailable'
+
+
+def _compile_grammar(spec, rules, where):
+    checks = []
+    for i, entry in enumerate(_optional(spec, 'fallback_checks', list, [], where)):
+        check_where = f"{where}.fallback_checks[{i}]"
+        pattern = _field(entry, 'pattern', str, check_where)
+        flags = re.IGNORECASE if entry.get('ignore_case') else 0
+        checks.append((_compile_pattern(pattern, check_where, flags),
+                       _field(entry, 'message', str, check_where)))
+    return {
+        'max': _field(spec, 'max', float, where),
+        'cap': _field(spec, 'errors_per_100_cap', float, where),
+        'ladder': _ladder(_field(spec, 'ladder', dict, where), where + '.ladder'),
+        'fallback_checks': checks,
+        'score': _score_grammar,
+    }
+
+
+def _score_grammar(spec, context):
+    doc = context['doc']
+    reason = None
+    if context['advanced']:
+        try:
+            matches = check_grammar(doc.text)
+            issues = [match['rule_id'] for match in matches[:3]]
+            error_count = len(matches)
+        except Exception:
+            if context['strict']:
+                raise
+            reason = 'error'
+    else:
+        reason = _fallback_reason(context)
+    if reason is not None:
+        issues = [message for pattern, message in spec['fallback_checks'] if pattern.search(doc.text)]
+        error_count = len(issues)
+    errors_per_100 = (error_count / doc.word_count) * 100
+    grammar_ratio = 1 - min(errors_per_100 / spec['cap'], 1)
+    points = _climb(grammar_ratio, spec['ladder'])
+    context['methods']['grammar'] = {'method': 'fallback' if reason else grammar_backend_name(), 'reason': reason}
+    return (
+        points,
+        [f" Grammar: {points}/{spec['max']} (Errors: {error_count}, Ratio: {grammar_ratio:.2f})"],
+        [f" Issues: {', '.join(str(i) for i in issues[:3]) if issues else 'None detected'}"],
+    )
+
+
+def _compile_vocabulary(spec, rules, where):
+    return {
+        'max': _field(spec, 'max', float, where),
+        'ladder': _ladder(_field(spec, 'ladder', dict, where), where + '.ladder'),
+        'score': _score_vocabulary,
+    }
+
+
+def _score_vocabulary(spec, context):
+    doc = context['doc']
+    unique_words = set(w.lower() for w in doc.tokens if w.isalpha())
+    ttr = len(unique_words) / len(doc.tokens)
+    points = _climb(ttr, spec['ladder'])
+    return points, [f" Vocabulary (TTR): {points}/{spec['max']} (TTR: {ttr:.2f}, Unique: {len(unique_words)}/{doc.word_count})"], []
+
+
+def _compile_clarity(spec, rules, where):
+    for phrase in _phrases(_field(spec, 'fillers', list, where), where):
+        rules.append((phrase, 'filler', True))
+    return {
+        'max': _field(spec, 'max', float, where),
+        'ladder': _ladder(_field(spec, 'ladder', dict, where), where + '.ladder'),
+        'assessments': _ladder(_field(spec, 'assessments', dict, where), where + '.assessments', str),
+        'score': _score_clarity,
+    }
+
+
+def _score_clarity(spec, context):
+    filler_count = context['hits']['filler']
+    filler_rate = (filler_count / context['doc'].word_count) * 100
+    points = _climb(filler_rate, spec['ladder'])
+    return points, [
+        f" Filler words: {filler_count} occurrences",
+        f" Filler rate: {filler_rate:.2f}%",
+        f" Assessment: {_climb(filler_rate, spec['assessments'])}",
+    ], []
+
+
+def _compile_engagement(spec, rules, where):
+    for word in _phrases(spec.get('positive_words', []), where):
+        rules.append((word, 'positive', True))
+    for word in _phrases(spec.get('negative_words', []), where):
+        rules.append((word, 'negative', True))
+    return {
+        'max': _field(spec, 'max', float, where),
+        'ladder': _ladder(_field(spec, 'ladder', dict, where), where + '.ladder'),
+        'assessments': _ladder(_field(spec, 'assessments', dict, where), where + '.assessments', str),
+        'fallback_ladder': _ladder(_field(spec, 'fallback_ladder', dict, where), where + '.fallback_ladder'),
+        'negative_penalty': _optional(spec, 'negative_penalty', float, 0.1, where),
+        'score': _score_engagement,
+    }
+
+
+def _score_engagement(spec, context):
+    doc = context['doc']
+    reason = None
+    if context['advanced']:
+        try:
+            positive_score = polarity_scores(doc.text)['pos']
+        except Exception:
+            if context['strict']:
+                raise
+            reason = 'error'
+    else:
+        reason = _fallback_reason(context)
+    if reason is not None:
+        hits = context['hits']
+        positive_rate = (hits['positive'] / len(doc.lower_tokens)) * 100
+        positive_score = _climb(positive_rate, spec['fallback_ladder'])
+        if hits['negative'] > 0:
+            floor = spec['fallback_ladder'][2]
+            positive_score = max(positive_score - (hits['negative'] * spec['negative_penalty']), floor)
+    points = _climb(positive_score, spec['ladder'])
+    context['methods']['engagement'] = {'method': 'fallback' if reason else 'vader', 'reason': reason}
+    return points, [
+        f" Sentiment score: {positive_score:.3f}",
+        f" Method: {'Word-based (fallback)' if reason else 'VADER (advanced)'}",
+        f" Assessment: {_climb(points, spec['assessments'])}",
+    ], []
+
+
+_COMPILERS = {
+    'salutation': _compile_salutation,
+    'keywords': _compile_keywords,
+    'flow': _compile_flow,
+    'speech_rate': _compile_speech_rate,
+    'grammar': _compile_grammar,
+    'vocabulary': _compile_vocabulary,
+    'clarity': _compile_clarity,
+    'engagement': _compile_engagement,
+}
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def compile_rubric(config):
+    """The ScoringPlan for a rubric, compiled once per distinct rubric (cached by hash)"""
+    config = resolve_rubric(config)
+    try:
+        digest = rubric_digest(config)
+    except (TypeError, ValueError) as e:
+        raise RubricError(f"a rubric must be plain JSON data: {e}")
+    with _plans_lock:
+        plan = _plans.get(digest)
+        if plan is not None:
+            _plans.move_to_end(digest)
+            return plan
+    try:
+        plan = ScoringPlan(config, digest)
+    except RubricError:
+        raise
+    except (TypeError, ValueError, AttributeError) as e:
+        # A shape the checks above missed must not escape as a crash mid-reload
+        raise RubricError(f"invalid rubric: {type(e).__name__}: {e}")
+    with _plans_lock:
+        plan = _plans.setdefault(digest, plan)
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def load_rubric(path):
+    """Read a rubric from a .json or .yaml/.yml file"""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    if str(path).lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise RubricError("YAML rubrics need PyYAML (pip install pyyaml)")
+        try:
+            return yaml.safe_load(source)
+        except yaml.YAMLError as e:
+            raise RubricError(f"{path}: {e}")
+    try:
+        return json.loads(source)
+    except ValueError as e:
+        raise RubricError(f"{path}: {e}")
+
+
+class RubricFile:
+    """
+    A rubric file, recompiled when it changes. The file is checked at most
+    every check_interval seconds; if an edit doesn't compile, the last good
+    plan stays in use and the problem is kept in .error.
+    """
+
+    def __init__(self, path, check_interval=RELOAD_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.error = None
+        self._plan = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def plan(self):
+        now = time.monotonic()
+        if self._plan is not None and now - self._checked < self.check_interval:
+            return self._plan
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if stamp != self._stamp:
+                    self._plan = compile_rubric(load_rubric(self.path))
+                    self._stamp = stamp
+                    self.error = None
+            except (OSError, RubricError) as e:
+                if self._plan is None:
+                    raise RubricError(f"{self.path}: {e}") if isinstance(e, OSError) else e
+                self.error = str(e)
+            return self._plan
+
+
+_files = {}
+_files_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _plans_lock, _files_lock
+    _plans_lock = threading.Lock()
+    _files_lock = threading.Lock()
+    for rubric_file in _files.values():
+        rubric_file._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_plan(rubric):
+    """A ScoringPlan from a plan, a rubric mapping or a rubric file path (hot-reloaded)"""
+    if isinstance(rubric, ScoringPlan):
+        return rubric
+    if isinstance(rubric, dict):
+        return compile_rubric(rubric)
+    path = os.path.abspath(os.fspath(rubric))
+    with _files_lock:
+        rubric_file = _files.get(path)
+        if rubric_file is None:
+            rubric_file = _files[path] = RubricFile(path)
+    return rubric_file.plan()
@@ -0,0 +1,191 @@
+"""
+Optional semantic keyword detection with sentence-transformers.
+
+The rubric regexes only find literal phrases, so "people call me Sam" or
+"I'm in eighth standard" don't count. Here every rubric category is
+described by a few prototype sentences, embedded once into an index (kept
+on disk next to the result cache, if one is configured). Transcript
+sentences are embedded in CPU batches - a whole batch chunk of transcripts
+per encode call - and memoized, so a sentence seen before costs a dict
+lookup. A category is found when one of its prototypes and some sentence
+are at least `threshold` cosine-similar.
+
+Semantic matches only add to what the regexes found. The regexes stay the
+default, and semantic matching is skipped when sentence-transformers is
+not installed (or raises EngineUnavailable in strict mode).
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .analyzers import GOOD_TO_HAVE_PHRASES, MUST_HAVE_PHRASES
+from .cache import get_result_cache
+from .document import as_document
+from .engines import SENTENCE_MODEL, EngineUnavailable, get_sentence_model
+from .metrics import note
+
+DEFAULT_THRESHOLD = 0.6
+ENCODE_BATCH_SIZE = 64
+EMBEDDING_MEMO_SIZE = 100_000
+
+CATEGORY_PROTOTYPES = {
+    'Name': ["My name is Priya.", "People call me Sam.", "I am Arjun, and I'm happy to introduce myself."],
+    'Age': ["I am thirteen years old.", "My age is 12.", "I turned fourteen this year."],
+    'School/Class': ["I study in class 8 at Delhi Public School.", "I am in the eighth grade.",
+                     "I go to St. Mary's school."],
+    'Family': ["I live with my mother, father and younger sister.", "There are four people in my family.",
+               "My parents and my brother live with me."],
+    'Hobbies/Interest': ["In my free time I like to play cricket.", "My hobby is painting.",
+                         "I really enjoy reading books."],
+    'About Family': ["My parents are very kind and caring.",
+                     "The special thing about my family is that we always eat dinner together."],
+    'Origin/Location': ["I am from Mumbai.", "I was born in Kerala and now live in Pune.",
+                        "My hometown is a small village."],
+    'Ambition/Goal/Dream': ["I want to become a doctor when I grow up.", "My dream is to be an astronaut.",
+                            "In the future I hope to improve my English."],
+    'Fun fact/Unique thing': ["A fun fact about me is that I can solve a Rubik's cube.",
+                              "Something unique about me is that I speak four languages."],
+    'Strengths/Achievements': ["I won first prize in the science fair.", "My strength is that I learn quickly.",
+                               "I am proud that I came first in my class."],
+}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_embedding_memo = OrderedDict()
+_embedding_memo_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _indexes_lock, _embedding_memo_lock
+    _indexes_lock = threading.Lock()
+    _embedding_memo_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class SemanticIndex:
+    """Normalized prototype embeddings, grouped by rubric category"""
+
+    def __init__(self, categories, vectors, starts):
+        self.categories = categories
+        self.vectors = vectors
+        self.starts = starts
+
+    def similarities(self, embeddings):
+        """(sentences x categories) best cosine similarity to any of each category's prototypes"""
+        if not len(embeddings):
+            return np.zeros((0, len(self.categories)), dtype=np.float32)
+        return np.maximum.reduceat(embeddings @ self.vectors.T, self.starts, axis=1)
+
+
+def _index_key(model_name, prototypes):
+    return hashlib.sha256(json.dumps([model_name, prototypes], sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _index_path(key):
+    cache = get_result_cache()
+    if cache is None:
+        return None
+    return os.path.join(os.path.dirname(cache.path), f'semantic-index-{key[:16]}.npy')
+
+
+def get_index(model_name=SENTENCE_MODEL, prototypes=CATEGORY_PROTOTYPES):
+    """The category index for this model and these prototypes, built (or loaded from disk) on first use"""
+    key = _index_key(model_name, prototypes)
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        if key not in _indexes:
+            categories = [c for c in list(MUST_HAVE_PHRASES) + list(GOOD_TO_HAVE_PHRASES) if c in prototypes]
+            sentences = [s for c in categories for s in prototypes[c]]
+            starts = np.cumsum([0] + [len(prototypes[c]) for c in categories[:-1]])
+            path = _index_path(key)
+            if path is not None and os.path.exists(path):
+                vectors = np.load(path)
+            else:
+                vectors = _encode(get_sentence_model(model_name), sentences)
+                if path is not None:
+                    np.save(path, vectors)
+            _indexes[key] = SemanticIndex(categories, vectors, starts)
+    return _indexes[key]
+
+
+def _encode(model, sentences):
+    return np.asarray(model.encode(sentences, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True,
+                                   convert_to_numpy=True, show_progress_bar=False), dtype=np.float32)
+
+
+def embed_sentences(sentences, model_name=SENTENCE_MODEL):
+    """Normalized embeddings of sentences; unseen ones are encoded together in one call"""
+    model = get_sentence_model(model_name)
+    vectors = [None] * len(sentences)
+    missing = {}
+    with _embedding_memo_lock:
+        for i, sentence in enumerate(sentences):
+            vector = _embedding_memo.get((model_name, sentence))
+            if vector is None:
+                missing.setdefault(sentence, []).append(i)
+            else:
+                _embedding_memo.move_to_end((model_name, sentence))
+                vectors[i] = vector
+    note('memo_hits', len(sentences) - sum(len(v) for v in missing.values()))
+    if missing:
+        note('sentences_embedded', len(missing))
+        encoded = _encode(model, list(missing))
+        with _embedding_memo_lock:
+            for (sentence, positions), vector in zip(missing.items(), encoded):
+                _embedding_memo[(model_name, sentence)] = vector
+                for i in positions:
+                    vectors[i] = vector
+            while len(_embedding_memo) > EMBEDDING_MEMO_SIZE:
+                _embedding_memo.popitem(last=False)
+    return np.array(vectors, dtype=np.float32).reshape(len(sentences), -1)
+
+
+def clear_embedding_memo():
+    with _embedding_memo_lock:
+        _embedding_memo.clear()
+
+
+def semantic_available(model_name=SENTENCE_MODEL):
+    return get_sentence_model(model_name) is not None
+
+
+def semantic_categories_many(docs, threshold=DEFAULT_THRESHOLD, model_name=SENTENCE_MODEL, strict=False):
+    """
+    For each transcript, {category: index of the first sentence expressing it}.
+    All sentences of all transcripts go through one embedding call. Returns
+    None when sentence-transformers is unavailable (strict=True raises).
+    """
+    if not semantic_available(model_name):
+        if strict:
+            raise EngineUnavailable("sentence-transformers is not available")
+        return None
+    index = get_index(model_name)
+    docs = [as_document(doc) for doc in docs]
+    sentences = [[doc.text[start:end] for start, end in doc.sentence_spans] for doc in docs]
+    embeddings = embed_sentences([s for per_doc in sentences for s in per_doc], model_name)
+    found = embeddings.shape[0] and (index.similarities(embeddings) >= threshold)
+
+    results = []
+    offset = 0
+    for per_doc in sentences:
+        first = {}
+        for i in range(len(per_doc)):
+            for c in np.flatnonzero(found[offset + i]):
+                first.setdefault(index.categories[c], i)
+        results.append(first)
+        offset += len(per_doc)
+    return results
+
+
+def semantic_categories(doc, threshold=DEFAULT_THRESHOLD, model_name=SENTENCE_MODEL, strict=False):
+    found = semantic_categories_many([doc], threshold, model_name, strict)
+    return None if found is None else found[0]
@@ -0,0 +1,388 @@
+"""
+HTTP scoring service - score_transcript over asyncio, for the LMS and other callers.
+
+    POST /score        {"text": ..., "duration_sec": ..., "deadline_ms": ...}
+                       -> the same JSON as the app's download button
+    POST /score/batch  {"transcripts": [{"id", "text", "duration_sec"}, ...]}
+                       -> {"results": [{"id", "result"} or {"id", "error"}, ...]}
+    GET  /healthz      liveness - the event loop and the worker pool are up
+    GET  /readyz       readiness - 503 until LanguageTool/VADER are warm (worker
+                       processes are re-checked every ENGINE_REFRESH_SEC)
+    GET  /metrics      latency histograms and counters, Prometheus text format
+
+Add "timings": true to a request to get the per-criterion timing breakdown
+in each result.
+
+The event loop only parses requests and writes responses. Scoring runs in a
+bounded process pool whose workers are forked from a parent that has loaded
+VADER and the rubric patterns once (see scorer.prefork), and each start
+LanguageTool once (with workers=1, in a few threads of this process
+instead). At most max_pending transcripts are admitted at a time; past
+that requests get 429 with Retry-After rather than queueing without bound.
+Connections are kept alive between requests.
+
+    python -m scorer serve --port 8000
+"""
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from . import batch, metrics
+from .cache import configure_result_cache
+from .core import score_transcript
+from .document import TOKEN_RE
+from .engines import EngineUnavailable, engine_status, warm_up
+
+DEFAULT_PORT = 8000
+DEFAULT_THREADS = 4
+MAX_BATCH = 1000
+MAX_BODY_BYTES = 16 * 1024 * 1024
+KEEPALIVE_TIMEOUT = 75.0
+# How often readiness re-asks the worker processes for their engine status
+ENGINE_REFRESH_SEC = 5.0
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 429: 'Too Many Requests',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+# Worst first - readiness reports the worst status any worker has
+_STATUS_RANK = {'failed': 0, 'cold': 1, 'missing': 2, 'warm': 3}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _score_one(text, duration_sec, strict, deadline_ms, timings, rubric=None):
+    return score_transcript(text, duration_sec, strict=strict, deadline_ms=deadline_ms, timings=timings,
+                            rubric=rubric)
+
+
+def _json_body(body):
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise HTTPError(400, f"invalid JSON: {e}")
+
+
+def _word_error(text):
+    # Punctuation-only text has no words, and every per-word rate divides by zero
+    if not isinstance(text, str) or not text.strip():
+        return "'text' must be a non-empty string"
+    if TOKEN_RE.search(text) is None:
+        return "'text' has no words"
+    return None
+
+
+def _number_or_none(request, field, default=None):
+    value = request.get(field, default)
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{field}' must be a number")
+
+
+async def _read_request(reader):
+    """(method, path, version, headers, body), or None when the client closed the connection"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(411, "send the body with a Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method, target.split('?', 1)[0], version, headers, body
+
+
+def _response(status, payload, headers, keep_alive):
+    if isinstance(payload, str):
+        body = payload.encode('utf-8')
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        content_type = 'application/json'
+    lines = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        f'Content-Type: {content_type}',
+        f'Content-Length: {len(body)}',
+        'Connection: keep-alive' if keep_alive else 'Connection: close',
+    ]
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+class ScoringService:
+    """
+    workers      - scoring processes (default: all cores); 1 scores in this process
+    max_pending  - transcripts admitted at once, queued or running (default: 8 per worker)
+    deadline_ms  - default latency budget per transcript (see score_transcript)
+    strict       - 503 instead of fallback results when the engines fail
+    rubric       - rubric file to score against instead of the built-in one,
+                   reloaded when it changes (see scorer.rubric)
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, workers=None, max_pending=None,
+                 max_batch=MAX_BATCH, chunksize=batch.DEFAULT_CHUNKSIZE, threads=DEFAULT_THREADS,
+                 deadline_ms=None, strict=False, cache_dir=None, rubric=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self.max_batch = min(max_batch, self.max_pending)
+        self.chunksize = chunksize
+        self.threads = threads
+        self.deadline_ms = deadline_ms
+        self.strict = strict
+        self.cache_dir = cache_dir
+        self.rubric = rubric
+        self.pending = 0
+        self.rejected = 0
+        self.ready = False
+        self.broken = False
+        self.engines = None
+        self._executor = None
+        self._server = None
+        self._warm_task = None
+        self._routes = {
+            '/score': ('POST', self._score),
+            '/score/batch': ('POST', self._score_batch),
+            '/healthz': ('GET', self._liveness),
+            '/readyz': ('GET', self._readiness),
+            '/metrics': ('GET', self._metrics),
+        }
+
+    @property
+    def in_process(self):
+        return self.workers == 1
+
+    async def start(self):
+        metrics.enable()
+        if self.in_process:
+            if self.cache_dir:
+                configure_result_cache(self.cache_dir)
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='scorer')
+        else:
+            from .prefork import worker_pool
+            self._executor = worker_pool(self.workers, self.cache_dir, rubric=self.rubric)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        # Listen right away (liveness passes) and report ready once the engines are up
+        self._warm_task = asyncio.ensure_future(self._warm())
+        return self
+
+    async def _worker_engines(self):
+        # One probe per worker - the pool starts them all, and each warms up first
+        statuses = await asyncio.gather(*[self._run(engine_status) for _ in range(self.workers)])
+        return {name: min((s[name] for s in statuses), key=_STATUS_RANK.get) for name in statuses[0]}
+
+    async def _warm(self):
+        try:
+            if self.in_process:
+                await self._run(warm_up)
+            else:
+                self.engines = await self._worker_engines()
+        except Exception:
+            return
+        self.ready = True
+        # A worker can lose an engine later (its JVM dies), so keep asking;
+        # in-process readiness reads engine_status() directly
+        while not self.in_process and not self.broken:
+            await asyncio.sleep(ENGINE_REFRESH_SEC)
+            try:
+                self.engines = await self._worker_engines()
+            except Exception:
+                continue  # a dead pool sets self.broken
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def _run(self, fn, *args):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except BrokenProcessPool:
+            self.broken = True
+            raise HTTPError(503, "scoring workers died")
+
+    @contextmanager
+    def _admit(self, count):
+        if self.pending + count > self.max_pending:
+            self.rejected += 1
+            raise HTTPError(429, "scorer is at capacity, retry shortly", {'Retry-After': '1'})
+        self.pending += count
+        try:
+            yield
+        finally:
+            self.pending -= count
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT)
+                    if request is None:
+                        break
+                    method, path, version, headers, body = request
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                    status, payload, extra = await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, payload, extra = e.status, {'error': str(e)}, e.headers
+                except asyncio.TimeoutError:
+                    break
+                except Exception as e:
+                    status, payload, extra = 500, {'error': f"{type(e).__name__}: {e}"}, {}
+                writer.write(_response(status, payload, extra, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        route = self._routes.get(path)
+        if route is None:
+            raise HTTPError(404, f"no such endpoint: {path}")
+        allowed, handler = route
+        if method != allowed:
+            raise HTTPError(405, f"use {allowed}", {'Allow': allowed})
+        status, payload = await handler(body)
+        return status, payload, {}
+
+    async def _score(self, body):
+        request = _json_body(body)
+        if not isinstance(request, dict):
+            raise HTTPError(400, "expected a JSON object")
+        text = request.get('text')
+        error = _word_error(text)
+        if error:
+            raise HTTPError(400, error)
+        duration = _number_or_none(request, 'duration_sec')
+        deadline_ms = _number_or_none(request, 'deadline_ms', self.deadline_ms)
+        wanted = bool(request.get('timings'))
+        with self._admit(1):
+            try:
+                result = await self._run(_score_one, text, duration, self.strict, deadline_ms,
+                                         wanted or not self.in_process, self.rubric)
+            except EngineUnavailable as e:
+                raise HTTPError(503, str(e))
+            except ValueError as e:
+                # Bad input the checks above didn't catch (a rubric that rejects it, ...)
+                raise HTTPError(400, f"{type(e).__name__}: {e}")
+        return 200, self._observe(result, wanted)
+
+    async def _score_batch(self, body):
+        request = _json_body(body)
+        records = request.get('transcripts') if isinstance(request, dict) else request
+        if not isinstance(records, list):
+            raise HTTPError(400, "expected {\"transcripts\": [...]}")
+        if len(records) > self.max_batch:
+            raise HTTPError(413, f"at most {self.max_batch} transcripts per batch")
+        options = request if isinstance(request, dict) else {}
+        deadline_ms = _number_or_none(options, 'deadline_ms', self.deadline_ms)
+        wanted = bool(options.get('timings'))
+        normalized = [
+            batch.normalize_record(record, i) if isinstance(record, (str, dict))
+            else {'id': i, 'text': None, 'duration_sec': None, 'error': "record must be an object or a string"}
+            for i, record in enumerate(records)
+        ]
+        for record in normalized:
+            text = record['text']
+            if not record.get('error') and isinstance(text, str) and text.strip() and TOKEN_RE.search(text) is None:
+                record['error'] = "ValueError: transcript has no words"
+        with self._admit(len(normalized)):
+            chunks = [normalized[i:i + self.chunksize] for i in range(0, len(normalized), self.chunksize)]
+            done = await asyncio.gather(*[
+                self._run(batch._score_chunk, chunk, self.strict, deadline_ms, wanted or not self.in_process,
+                          False, False, self.rubric)
+                for chunk in chunks
+            ])
+        outputs = [output for chunk in done for output in chunk]
+        for output in outputs:
+            if 'result' in output:
+                self._observe(output['result'], wanted)
+        return 200, {'results': outputs}
+
+    def _observe(self, result, wanted):
+        # Worker processes send their timings back to be aggregated here;
+        # in-process scoring has already recorded them
+        timings = result.get('timings') if wanted else result.pop('timings', None)
+        if timings is not None and not self.in_process:
+            metrics.record(timings)
+        return result
+
+    async def _metrics(self, body):
+        return 200, metrics.render_prometheus()
+
+    async def _liveness(self, body):
+        if self.broken:
+            return 503, {'status': 'broken'}
+        return 200, {'status': 'ok'}
+
+    async def _readiness(self, body):
+        engines = engine_status() if self.in_process or self.engines is None else self.engines
+        ready = self.ready and not self.broken and not (self.strict and 'failed' in engines.values())
+        response = {
+            'ready': ready,
+            'engines': engines,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+        }
+        if hasattr(self._executor, 'report'):
+            # Startup time and RSS/PSS of each forked worker
+            response['workers'] = self._executor.report()['workers']
+        return (200 if ready else 503), response
+
+
+def run(host='127.0.0.1', port=DEFAULT_PORT, on_start=None, **options):
+    """Serve until SIGINT/SIGTERM"""
+    async def main():
+        service = await ScoringService(host, port, **options).start()
+        if on_start is not None:
+            on_start(service)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+        await service.close()
+
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""ServerPoolBackend against the stub LanguageTool server in scorer.ltstub"""
+import http.client
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from scorer.backends import ServerPoolBackend, api_match_to_dict, stub_command
+from scorer.engines import EngineUnavailable
+from scorer.ltstub import check_text, serve
+
+TEXTS = [
+    "hello i am Sam.",
+    "My my name is  Priya and i gonna study.",
+    "Nothing wrong here.",
+    "i i i",
+    "We wanna play cricket  today.",
+] * 4
+
+
+def expected(text):
+    return [api_match_to_dict(m) for m in check_text(text)]
+
+
+def free_ports(count):
+    """count consecutive free ports on localhost"""
+    for _ in range(50):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            first = s.getsockname()[1]
+        if first + count > 65535:
+            continue
+        try:
+            sockets = []
+            for port in range(first, first + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind(('127.0.0.1', port))
+            return first
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+    pytest.skip("no free port range")
+
+
+@pytest.fixture
+def stub_urls():
+    servers = []
+    for _ in range(3):
+        server = serve(0, delay_ms=50)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield [f'http://127.0.0.1:{server.server_address[1]}' for server in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_results_follow_input_order(stub_urls):
+    # A small batch_chars splits the texts over several requests and servers
+    backend = ServerPoolBackend(urls=stub_urls, batch_chars=60)
+    try:
+        assert backend.check_many(TEXTS) == [expected(text) for text in TEXTS]
+        assert backend.check_many(TEXTS, join=False) == [expected(text) for text in TEXTS]
+    finally:
+        backend.close()
+
+
+def test_checks_run_concurrently(stub_urls):
+    backend = ServerPoolBackend(urls=stub_urls).start()
+    try:
+        started = time.perf_counter()
+        results = backend.check_many(TEXTS[:6], join=False)
+        elapsed = time.perf_counter() - started
+        assert results == [expected(text) for text in TEXTS[:6]]
+        # Six 50 ms requests over three servers: two rounds, not six
+        assert elapsed < 6 * 0.05
+        assert all(stats['requests'] == 2 for stats in backend.stats())
+    finally:
+        backend.close()
+
+
+def test_concurrent_callers_get_their_own_results(stub_urls):
+    backend = ServerPoolBackend(urls=stub_urls, batch_chars=40).start()
+    results = {}
+
+    def check(i):
+        texts = TEXTS[i:] + TEXTS[:i]
+        results[i] = backend.check_many(texts) == [expected(text) for text in texts]
+
+    threads = [threading.Thread(target=check, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    backend.close()
+    assert results == {i: True for i in range(8)}
+
+
+def test_dead_server_is_restarted():
+    backend = ServerPoolBackend(size=1, command=stub_command, start_port=free_ports(1)).start()
+    try:
+        server = backend.servers[0]
+        assert backend.check("i think so") == expected("i think so")
+        server.process.kill()
+        server.process.wait()
+        with pytest.raises((OSError, http.client.HTTPException)):
+            backend.check("i think so")
+        assert server.restarts == 1 and server.alive()
+        assert backend.check("i think so") == expected("i think so")
+    finally:
+        backend.close()
+
+
+def failing_command(port):
+    return [sys.executable, '-c', 'raise SystemExit(1)']
+
+
+def test_failed_restart_returns_server_to_pool():
+    backend = ServerPoolBackend(size=1, command=stub_command, start_port=free_ports(1), acquire_timeout=5).start()
+    try:
+        server = backend.servers[0]
+        server.command = failing_command(server._port)
+        server.process.kill()
+        server.process.wait()
+        for _ in range(2):
+            started = time.perf_counter()
+            with pytest.raises(EngineUnavailable):
+                backend.check("i think so")
+            # The server went back to the pool, so the next check doesn't wait for it
+            assert time.perf_counter() - started < 5
+    finally:
+        backend.close()
+
+
+def test_start_stops_servers_when_one_fails():
+    first = free_ports(2)
+    backend = ServerPoolBackend(size=2, start_port=first,
+                                command=lambda port: stub_command(port) if port == first else failing_command(port))
+    with pytest.raises(EngineUnavailable):
+        backend.start()
+    assert all(server.process is None for server in backend.servers)
+    assert not backend.warm()
@@ -0,0 +1,141 @@
+"""QuantileSketch accuracy and CohortSummary merging against exact answers"""
+import json
+import random
+
+import numpy as np
+import pytest
+
+from scorer import score_transcript
+from scorer.cohort import RELATIVE_ACCURACY, CohortSummary, QuantileSketch
+from scorer.engines import fallback_forced, force_fallback
+from scorer.frame import score_frame
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+QUANTILES = [0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+
+def samples():
+    rnd = random.Random(22)
+    return {
+        'lognormal': [rnd.lognormvariate(3, 1.5) for _ in range(5000)],
+        'scores': [round(rnd.uniform(20, 100), 1) for _ in range(3000)],
+        'with zeros': [0.0] * 700 + [rnd.expovariate(0.5) for _ in range(1300)],
+        'one value': [42.0] * 10,
+    }
+
+
+def sketch_of(values):
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize('name, values', samples().items())
+def test_quantiles_are_within_relative_accuracy(name, values):
+    sketch = sketch_of(values)
+    exact = sorted(values)
+    for q in QUANTILES:
+        truth = exact[int(q * (len(exact) - 1))]
+        assert abs(sketch.quantile(q) - truth) <= RELATIVE_ACCURACY * truth + 1e-12
+    assert sketch.count == len(values) and sketch.mean == pytest.approx(sum(values) / len(values))
+
+
+@pytest.mark.parametrize('name, values', samples().items())
+def test_rank_is_within_one_bucket(name, values):
+    sketch = sketch_of(values)
+    values = np.array(values)
+    for value in np.quantile(values, QUANTILES[1:-1]):
+        # Only values in value's own bucket can be miscounted
+        below = (values < value / sketch.gamma).mean()
+        at_most = (values <= value * sketch.gamma).mean()
+        assert below <= sketch.rank(value) <= at_most
+
+
+@pytest.mark.parametrize('name, values', samples().items())
+def test_add_many_equals_add(name, values):
+    one_by_one = sketch_of(values)
+    at_once = QuantileSketch()
+    at_once.add_many(values + [float('nan')])
+    assert at_once.to_dict() == dict(one_by_one.to_dict(), total=pytest.approx(one_by_one.total))
+
+
+def test_merge_equals_one_sketch_of_everything():
+    parts = list(samples().values())
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(sketch_of(part))
+    whole = sketch_of([value for part in parts for value in part])
+    assert merged.buckets == whole.buckets and merged.count == whole.count
+    assert (merged.min, merged.max, merged.zero_count) == (whole.min, whole.max, whole.zero_count)
+    assert [merged.quantile(q) for q in QUANTILES] == [whole.quantile(q) for q in QUANTILES]
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.05))
+
+
+def test_bad_values_and_empty_sketches():
+    sketch = QuantileSketch()
+    assert sketch.quantile(0.5) is None and sketch.rank(1) is None and sketch.mean is None
+    for value in (-1, float('nan')):
+        with pytest.raises(ValueError):
+            sketch.add(value)
+    assert QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))).to_dict() == sketch.to_dict()
+
+
+@pytest.fixture
+def cohort():
+    forced = fallback_forced()
+    force_fallback(True)
+    rnd = random.Random(3)
+    sentences = [s + '.' for s in SAMPLE_TRANSCRIPT.split('.') if s.strip()]
+    texts = [' '.join(rnd.sample(sentences, rnd.randint(2, len(sentences)))) for _ in range(60)]
+    yield [{'id': i, 'text': text, 'duration_sec': rnd.uniform(20, 90)} for i, text in enumerate(texts)]
+    force_fallback(forced)
+
+
+def summary_of(records):
+    summary = CohortSummary()
+    for record in records:
+        summary.add({'id': record['id'], 'result': score_transcript(record['text'], record['duration_sec'],
+                                                                      compact=True)})
+    return summary
+
+
+def test_columns_and_results_build_the_same_summary(cohort):
+    from_results = summary_of(cohort)
+    from_results.add({'id': 'bad', 'error': "ValueError: transcript is empty"})
+    from_columns = CohortSummary()
+    from_columns.add_columns(score_frame(cohort + [{'id': 'bad', 'text': ''}]))
+    expected = json.loads(json.dumps(from_results.to_dict()))
+    actual = json.loads(json.dumps(from_columns.to_dict()))
+    for data in (expected, actual):
+        for sketch in data['sketches'].values():
+            sketch['total'] = round(sketch['total'], 6)
+    assert actual == expected
+    assert from_columns.count == len(cohort)
+
+
+def test_merged_summaries_equal_the_whole_cohort(cohort, tmp_path):
+    whole = summary_of(cohort)
+    merged = CohortSummary.merged([summary_of(cohort[:25]), summary_of(cohort[25:40]), summary_of(cohort[40:])])
+    path = tmp_path / 'summary.json'
+    merged.save(path)
+    loaded = CohortSummary.load(path)
+    assert loaded.criteria == whole.criteria and loaded.keywords == whole.keywords
+    for name in ('overall_score', 'wpm', 'ttr', 'filler_rate', 'clarity', 'content'):
+        assert [loaded.quantile(name, q) for q in QUANTILES] == [whole.quantile(name, q) for q in QUANTILES]
+
+
+def test_bands_follow_the_better_direction(cohort):
+    summary = summary_of(cohort)
+    best, worst = summary.quantile('overall_score', 1), summary.quantile('overall_score', 0)
+    assert summary.band('overall_score', best) == 'top 10%'
+    assert summary.band('overall_score', worst) == 'bottom 50%'
+    assert summary.top_share('filler_rate', 0) == summary.rank('filler_rate', 0)
+    assert summary.band('filler_rate', 0) in ('top 10%', 'top 20%', 'top 50%')
+    with pytest.raises(ValueError):
+        summary.band('wpm', 120)
+    with pytest.raises(KeyError):
+        summary.rank('pace', 1)
+    coverage = summary.coverage()
+    assert all(0 <= share <= 1 for share in coverage.values()) and coverage['Name'] > 0
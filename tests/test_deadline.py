@@ -0,0 +1,75 @@
+"""score_transcript deadlines: slow or failing advanced criteria fall back per request"""
+import threading
+import time
+
+import pytest
+
+from scorer import core, score_transcript
+from scorer.analyzers import analyze_grammar_fallback
+from scorer.backends import ServerPoolBackend, configure_grammar_backend
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+GRAMMAR = (10, ['MORFOLOGIK_RULE_EN_US'], 0.95, 1)
+ENGAGEMENT = (12, 0.8, 0.9)
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Stand-ins for LanguageTool/VADER; set delay or error per criterion"""
+    behaviour = {'grammar': {}, 'engagement': {}}
+    release = threading.Event()
+
+    def fake(name, value):
+        def analyzer(doc, strict=False):
+            if behaviour[name].get('delay'):
+                release.wait(behaviour[name]['delay'])
+            if behaviour[name].get('error'):
+                raise RuntimeError(f"{name} broke")
+            return value
+        return analyzer
+
+    monkeypatch.setattr(core, 'advanced_nlp_available', lambda: True)
+    monkeypatch.setattr(core, 'analyze_grammar_advanced', fake('grammar', GRAMMAR))
+    monkeypatch.setattr(core, 'analyze_engagement_advanced', fake('engagement', ENGAGEMENT))
+    yield behaviour
+    release.set()
+
+
+def methods(result):
+    return {name: (method['method'], method['reason']) for name, method in result['methods'].items()}
+
+
+def test_without_deadline_the_advanced_methods_are_used(engines):
+    result = score_transcript(SAMPLE_TRANSCRIPT, 52)
+    assert methods(result) == {'grammar': ('languagetool', None), 'engagement': ('vader', None)}
+    assert result == score_transcript(SAMPLE_TRANSCRIPT, 52, deadline_ms=5000)
+
+
+def test_slow_criterion_falls_back_at_the_deadline(engines):
+    engines['grammar']['delay'] = 5
+    started = time.monotonic()
+    result = score_transcript(SAMPLE_TRANSCRIPT, 52, deadline_ms=100)
+    assert time.monotonic() - started < 2
+    assert methods(result) == {'grammar': ('fallback', 'deadline'), 'engagement': ('vader', None)}
+    _, _, ratio, errors = analyze_grammar_fallback(SAMPLE_TRANSCRIPT)
+    grammar = [c for c in result['criteria'] if c['name'] == 'Language & Grammar'][0]
+    assert f"(Errors: {errors}, Ratio: {ratio:.2f})" in grammar['details'][0]
+
+
+def test_failing_criterion_falls_back_unless_strict(engines):
+    engines['engagement']['error'] = True
+    for deadline_ms in (None, 1000):
+        result = score_transcript(SAMPLE_TRANSCRIPT, 52, deadline_ms=deadline_ms)
+        assert methods(result) == {'grammar': ('languagetool', None), 'engagement': ('fallback', 'error')}
+        with pytest.raises(RuntimeError):
+            score_transcript(SAMPLE_TRANSCRIPT, 52, strict=True, deadline_ms=deadline_ms)
+
+
+def test_grammar_method_names_the_backend(engines):
+    backend = configure_grammar_backend(ServerPoolBackend(urls=['http://127.0.0.1:9']))
+    try:
+        result = score_transcript(SAMPLE_TRANSCRIPT, 52, deadline_ms=1000, timings=True)
+        assert result['methods']['grammar'] == {'method': 'languagetool-server', 'reason': None}
+    finally:
+        configure_grammar_backend(None)
+        backend.close()
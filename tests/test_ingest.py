@@ -0,0 +1,141 @@
+"""Recording durations from WAV/RF64/FLAC headers, ASR timestamps and manifests"""
+import json
+import struct
+import wave
+
+import pytest
+
+from scorer.ingest import DurationError, audio_duration, ingest_file, ingest_record, timestamps_duration
+
+
+def write_wav(path, seconds, rate=16000, channels=1, width=2):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(width)
+        f.setframerate(rate)
+        f.writeframes(b'\0' * int(seconds * rate) * channels * width)
+    return path
+
+
+def fmt_chunk(order='<', rate=16000, channels=1, width=2):
+    body = struct.pack(order + 'HHIIHH', 1, channels, rate, rate * channels * width, channels * width, width * 8)
+    return b'fmt ' + struct.pack(order + 'I', len(body)) + body
+
+
+def flac_header(rate, channels, bits, total_samples, last=True):
+    packed = rate << 44 | (channels - 1) << 41 | (bits - 1) << 36 | total_samples
+    streaminfo = struct.pack('>HH', 4096, 4096) + b'\0' * 6 + packed.to_bytes(8, 'big') + b'\0' * 16
+    return b'fLaC' + bytes([0x80 if last else 0]) + len(streaminfo).to_bytes(3, 'big') + streaminfo
+
+
+@pytest.mark.parametrize('seconds, rate, channels, width', [
+    (1.5, 16000, 1, 2), (2.25, 44100, 2, 2), (0.5, 8000, 1, 1), (3, 48000, 2, 3),
+])
+def test_wav_duration(tmp_path, seconds, rate, channels, width):
+    path = write_wav(tmp_path / 'a.wav', seconds, rate, channels, width)
+    assert audio_duration(path) == pytest.approx(seconds, abs=1 / rate)
+
+
+def test_wav_chunks_before_data_are_skipped(tmp_path):
+    # An odd-sized LIST chunk is padded to an even length
+    data = b'\0' * 32000
+    body = b'WAVE' + b'LIST' + struct.pack('<I', 5) + b'INFOx\0' + fmt_chunk() + b'data' + struct.pack('<I', len(data))
+    path = tmp_path / 'list.wav'
+    path.write_bytes(b'RIFF' + struct.pack('<I', len(body) + len(data)) + body + data)
+    assert audio_duration(path) == 1.0
+
+
+def test_unfinished_wav_runs_to_end_of_file(tmp_path):
+    body = b'WAVE' + fmt_chunk() + b'data' + struct.pack('<I', 0)
+    path = tmp_path / 'streamed.wav'
+    path.write_bytes(b'RIFF' + struct.pack('<I', 0) + body + b'\0' * 48000)
+    assert audio_duration(path) == 1.5
+
+
+def test_big_endian_rifx(tmp_path):
+    data = b'\0' * 16000
+    body = b'WAVE' + fmt_chunk('>') + b'data' + struct.pack('>I', len(data))
+    path = tmp_path / 'rifx.wav'
+    path.write_bytes(b'RIFX' + struct.pack('>I', len(body) + len(data)) + body + data)
+    assert audio_duration(path) == 0.5
+
+
+def test_rf64_takes_the_data_size_from_ds64(tmp_path):
+    # Five hours of 16 kHz mono - more than a 32-bit RIFF size can hold
+    data_size = 5 * 3600 * 32000 * 10
+    ds64 = struct.pack('<QQQI', data_size + 100, data_size, data_size // 2, 0)
+    body = b'WAVE' + b'ds64' + struct.pack('<I', len(ds64)) + ds64 + fmt_chunk()
+    body += b'data' + struct.pack('<I', 0xFFFFFFFF)
+    path = tmp_path / 'long.wav'
+    path.write_bytes(b'RF64' + struct.pack('<I', 0xFFFFFFFF) + body + b'\0' * 64)
+    assert audio_duration(path) == 5 * 3600 * 10
+
+
+@pytest.mark.parametrize('rate, channels, bits, samples', [(16000, 1, 16, 24000), (44100, 2, 24, 44100 * 3600)])
+def test_flac_duration(tmp_path, rate, channels, bits, samples):
+    path = tmp_path / 'a.flac'
+    path.write_bytes(flac_header(rate, channels, bits, samples) + b'\xff\xf8' + b'\0' * 100)
+    assert audio_duration(path) == samples / rate
+
+
+@pytest.mark.parametrize('content', [
+    b'ID3\x03 not audio at all',
+    b'RIFF\0\0\0\0AVI LIST',
+    b'RIFF\x10\0\0\0WAVE' + b'fmt ' + struct.pack('<I', 4) + b'\0' * 4,
+    b'RIFF\x10\0\0\0WAVE' + fmt_chunk(),
+    flac_header(16000, 1, 16, 0),
+    b'fLaC\x04\0\0\x10' + b'\0' * 16,
+    b'',
+])
+def test_unreadable_headers_raise(tmp_path, content):
+    path = tmp_path / 'bad.wav'
+    path.write_bytes(content)
+    with pytest.raises(DurationError):
+        audio_duration(path)
+
+
+@pytest.mark.parametrize('data', [
+    [{'word': 'hi', 'start': 0.5, 'end': 0.9}, {'word': 'there', 'start': 1.0, 'end': 12.5}],
+    {'words': [{'start': 0.5, 'end': 2}, {'start': 3, 'end': 12.5}]},
+    {'segments': [{'start': 0.5, 'end': 6, 'words': [{'start': 0.5, 'end': 6}]},
+                  {'start': 7, 'end': 12.5, 'words': [{'start': 7, 'end': 12.5}]}]},
+    {'segments': [{'start': 0.5, 'end': 6}, {'start': 7, 'end': 12.5}]},
+])
+def test_timestamps_duration(data):
+    assert timestamps_duration(data) == 12.0
+
+
+def test_timestamps_without_words_raise():
+    for data in ([], {'words': []}, {'segments': [{'text': 'hi'}]}, 'hello'):
+        with pytest.raises(DurationError):
+            timestamps_duration(data)
+
+
+def test_duration_sources_in_order_of_preference(tmp_path):
+    write_wav(tmp_path / 'a.wav', 2)
+    (tmp_path / 'a.json').write_text(json.dumps([{'start': 0, 'end': 7}]), encoding='utf-8')
+    both = {'id': 'x', 'text': 'hi', 'audio_path': 'a.wav', 'timestamps_path': 'a.json'}
+    assert ingest_record(dict(both, duration_sec='31'), base_dir=str(tmp_path))['duration_sec'] == 31
+    assert ingest_record(both, base_dir=str(tmp_path))['duration_source'] == 'audio'
+    record = ingest_record({'id': 'x', 'text': 'hi', 'timestamps_path': 'a.json'}, base_dir=str(tmp_path))
+    assert (record['duration_sec'], record['duration_source']) == (7, 'timestamps')
+
+    missing = ingest_record({'id': 'x', 'text': 'hi', 'audio_path': 'gone.wav'}, base_dir=str(tmp_path))
+    assert missing['duration_sec'] is None and missing['duration_error'].startswith('FileNotFoundError')
+    unreadable = ingest_record({'id': 'x', 'text_path': 'gone.txt'}, base_dir=str(tmp_path))
+    assert unreadable['error'].startswith('FileNotFoundError')
+
+
+def test_ingest_file_keeps_manifest_order(tmp_path):
+    rows = []
+    for i in range(40):
+        write_wav(tmp_path / f'{i}.wav', 1 + i / 10, rate=8000)
+        (tmp_path / f'{i}.txt').write_text(f'\ufeffTranscript {i}', encoding='utf-8')
+        rows.append({'id': f'r{i}', 'text_path': f'{i}.txt', 'audio_path': f'{i}.wav'})
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text(''.join(json.dumps(row) + '\n' for row in rows) + 'not json\n', encoding='utf-8')
+    records = list(ingest_file(str(manifest), workers=4))
+    assert [r['id'] for r in records[:-1]] == [row['id'] for row in rows]
+    assert [r['text'] for r in records[:3]] == ['Transcript 0', 'Transcript 1', 'Transcript 2']
+    assert [r['duration_sec'] for r in records[:-1]] == pytest.approx([1 + i / 10 for i in range(40)])
+    assert records[-1]['error'].startswith('invalid JSON')
@@ -0,0 +1,145 @@
+"""Sharded jobs: resume, lease expiry, retries and dead letters on the SQLite queue"""
+import io
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from scorer import jobs, score_transcript
+from scorer.engines import fallback_forced, force_fallback
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+RECORDS = [{'id': f'r{i}', 'text': f"{SAMPLE_TRANSCRIPT} Record {i}.", 'duration_sec': 40 + i} for i in range(7)]
+RECORDS[4] = {'id': 'r4', 'text': '   '}
+
+
+@pytest.fixture(autouse=True)
+def fallback(monkeypatch):
+    forced = fallback_forced()
+    force_fallback(True)
+    monkeypatch.setattr(jobs, 'RETRY_BACKOFF', 0)
+    yield
+    force_fallback(forced)
+
+
+def collect(job_dir, partial=False):
+    output, dead_letter = io.StringIO(), io.StringIO()
+    counts = jobs.collect_results(job_dir, output, dead_letter, partial)
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    dead = [json.loads(line) for line in dead_letter.getvalue().splitlines()]
+    assert counts == (len(rows), len(dead))
+    return rows, dead
+
+
+def expected(record):
+    return score_transcript(record['text'], record['duration_sec'])
+
+
+def test_job_scores_every_record_once(tmp_path):
+    queue = jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    assert queue.status() == {'total': 3, 'records': 7, 'pending': 3, 'running': 0, 'done': 0, 'dead': 0}
+    assert jobs.run_worker(str(tmp_path), workers=1) == 3
+    assert jobs.run_worker(str(tmp_path), workers=1) == 0
+
+    rows, dead = collect(str(tmp_path))
+    assert [row['id'] for row in rows] == [record['id'] for record in RECORDS]
+    assert all(row['result'] == expected(record) for row, record in zip(rows, RECORDS) if record['id'] != 'r4')
+    # An empty transcript fails the same way every time, so it is dead-lettered without retries
+    assert dead == [{'id': 'r4', 'error': "ValueError: transcript is empty", 'attempts': 1,
+                     'record': {'id': 'r4', 'text': '   ', 'duration_sec': None}}]
+
+
+def test_create_job_twice_is_a_no_op(tmp_path):
+    jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    assert jobs.create_job(RECORDS[:2], str(tmp_path), shard_size=3).status()['records'] == 7
+    with pytest.raises(jobs.JobError):
+        jobs.create_job(RECORDS, str(tmp_path), shard_size=2)
+    with pytest.raises(jobs.JobError):
+        jobs.create_job(RECORDS, str(tmp_path), shard_size=3, strict=False)
+
+
+def create(job_dir):
+    try:
+        jobs.create_job(RECORDS, job_dir, shard_size=3)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def test_concurrent_creates_queue_one_job(tmp_path):
+    with multiprocessing.get_context('fork').Pool(6) as pool:
+        assert pool.map(create, [str(tmp_path)] * 6) == [None] * 6
+    assert jobs.SQLiteQueue(str(tmp_path)).status()['total'] == 3
+
+
+def test_live_lease_is_left_alone(tmp_path):
+    queue = jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    shard = queue.claim('other-node', lease_sec=3600)
+    assert jobs.run_worker(str(tmp_path), workers=1) == 2
+    assert queue.status()['running'] == 1
+    with pytest.raises(jobs.JobError):
+        collect(str(tmp_path))
+    rows, _ = collect(str(tmp_path), partial=True)
+    assert len(rows) == 7 - shard.count
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    # A node that claimed a shard and died: its lease is already over
+    queue.claim('lost-node', lease_sec=-1)
+    assert jobs.run_worker(str(tmp_path), workers=1) == 3
+    assert queue.status()['done'] == 3
+    assert [shard[4] for shard in queue.shards()] == [2, 1, 1]
+    assert len(collect(str(tmp_path))[0]) == 7
+
+
+def test_results_written_before_a_crash_are_not_rescored(tmp_path):
+    queue = jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    shard = queue.claim('lost-node', lease_sec=-1)
+    # The node wrote the shard's files, then died before marking it done
+    marker = [{'id': record['id'], 'result': 'from the lost node'} for record in RECORDS[:3]]
+    jobs._write_atomic(os.path.join(str(tmp_path), 'dead', shard.name), [])
+    jobs._write_atomic(os.path.join(str(tmp_path), 'results', shard.name), marker)
+    assert jobs.run_worker(str(tmp_path), workers=1) == 3
+    assert collect(str(tmp_path))[0][:3] == marker
+
+
+def test_shard_that_keeps_losing_its_worker_goes_dead(tmp_path):
+    jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    queue = jobs.SQLiteQueue(str(tmp_path), max_attempts=2)
+    queue.claim('node-a', lease_sec=-1)
+    queue.claim('node-b', lease_sec=-1)
+    assert jobs.run_worker(str(tmp_path), queue=queue, workers=1) == 2
+    assert queue.status()['dead'] == 1
+    rows, dead = collect(str(tmp_path))
+    assert len(rows) == 4
+    assert [letter['id'] for letter in dead] == ['r0', 'r1', 'r2', 'r4']
+    assert dead[0]['error'] == "worker lost (gave up after 2 attempts)"
+
+    assert queue.requeue_dead() == 1
+    assert jobs.run_worker(str(tmp_path), queue=queue, workers=1) == 1
+    assert len(collect(str(tmp_path))[0]) == 7
+
+
+def test_failing_transcripts_are_retried_then_dead_lettered(tmp_path, monkeypatch):
+    calls = {}
+    score_chunk = jobs._score_chunk
+
+    def flaky(chunk, *args):
+        outputs = score_chunk(chunk, *args)
+        for output in outputs:
+            calls[output['id']] = calls.get(output['id'], 0) + 1
+            # r1 fails once and then scores; r2 always fails
+            if output['id'] == 'r2' or output['id'] == 'r1' and calls['r1'] == 1:
+                output.pop('result', None)
+                output['error'] = "RuntimeError: engine hiccup"
+        return outputs
+
+    monkeypatch.setattr(jobs, '_score_chunk', flaky)
+    jobs.create_job(RECORDS, str(tmp_path), shard_size=3)
+    jobs.run_worker(str(tmp_path), workers=1, retries=2)
+    rows, dead = collect(str(tmp_path))
+    assert rows[1]['result'] == expected(RECORDS[1])
+    assert calls['r1'] == 2 and calls['r2'] == 3 and calls['r0'] == 1
+    assert [(letter['id'], letter['attempts']) for letter in dead] == [('r2', 3), ('r4', 1)]
+    assert dead[0]['record'] == RECORDS[2]
@@ -0,0 +1,58 @@
+"""Chunked long-form scoring against score_transcript on the whole text"""
+import random
+import re
+
+import pytest
+
+from scorer import longform, score_transcript
+from scorer.analyzers import CLOSING_PHRASES, FILLER_WORDS, GOOD_TO_HAVE_PHRASES, MUST_HAVE_PHRASES
+from scorer.engines import fallback_forced, force_fallback
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+CHUNK_SIZES = [5, 16, 40, 97, 1000]
+
+
+@pytest.fixture(autouse=True)
+def fallback():
+    # LanguageTool and VADER look at whole sentences, so only the fallback methods add up exactly
+    forced = fallback_forced()
+    force_fallback(True)
+    yield
+    force_fallback(forced)
+
+
+def transcripts():
+    words = [p for categories in (MUST_HAVE_PHRASES, GOOD_TO_HAVE_PHRASES) for ps in categories.values() for p in ps]
+    words += CLOSING_PHRASES + FILLER_WORDS + ['Hello everyone,', 'my name is Sam', 'i am 13 years old', 'Priya',
+                                               'gonna', 'myself Ravi', 'i like', ' ,', 'the', 'cricket']
+    rnd = random.Random(11)
+    texts = [SAMPLE_TRANSCRIPT]
+    for _ in range(12):
+        parts = [rnd.choice(words) + rnd.choice([' ', ' ', '  ', '\n', '. ', '! ', '? ', ', '])
+                 for _ in range(rnd.randint(5, 80))]
+        texts.append(''.join(parts))
+    # Unpunctuated ASR output is one long sentence, cut at whitespace
+    texts += [re.sub(r'[.!?]', '', text) for text in texts[:4]]
+    return texts
+
+
+@pytest.mark.parametrize('text', transcripts())
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_chunks_add_up_to_whole_text(text, size):
+    for duration in (None, 61.5):
+        assert longform.score_chunks(longform.split_text(text, size), duration) == score_transcript(text, duration)
+
+
+def test_long_sentence_is_cut_between_words():
+    text = re.sub(r'[.!?]', '', SAMPLE_TRANSCRIPT)
+    chunks = list(longform.split_text(text, 40))
+    assert ''.join(chunks) == text
+    assert len(chunks) > 10
+    assert all(chunk[-1].isspace() for chunk in chunks[:-1])
+
+
+def test_file_chunks_match_text(tmp_path):
+    text = re.sub(r'[.!?]', '', SAMPLE_TRANSCRIPT) + ' ' + SAMPLE_TRANSCRIPT
+    path = tmp_path / 'transcript.txt'
+    path.write_bytes(b'\xef\xbb\xbf' + (text * 3).replace('\n', '\r\n').encode('utf-8'))
+    assert longform.score_file(path, chunk_bytes=64) == score_transcript(text * 3)
@@ -0,0 +1,94 @@
+"""The single-pass rubric PhraseMatcher against the original per-phrase regexes"""
+import random
+import re
+
+import pytest
+
+from scorer.analyzers import (
+    CLOSING_PHRASES, FILLER_WORDS, GOOD_TO_HAVE_PHRASES, MUST_HAVE_PHRASES, NEGATIVE_WORDS, POSITIVE_WORDS,
+    rubric_matcher,
+)
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+# The patterns the app searched one by one before the matcher
+MUST_HAVE_PATTERNS = {
+    'Name': r'(my name is|myself|i am|i\'m)\s+[A-Z][a-z]+',
+    'Age': r'(\d+\s*years?\s*old|age\s*\d+)',
+    'School/Class': r'(school|class|grade|studying)',
+    'Family': r'(family|mother|father|parents|siblings|brother|sister)',
+    'Hobbies/Interest': r'(hobby|hobbies|enjoy|like|love|play|playing|interest|free time)',
+}
+GOOD_TO_HAVE_PATTERNS = {
+    'About Family': r'(special thing about|my family is|kind|caring)',
+    'Origin/Location': r'(from|live in|staying in|born in|parents are from)',
+    'Ambition/Goal/Dream': r'(goal|dream|ambition|want to|aspire|improve|future)',
+    'Fun fact/Unique thing': r'(fun fact|interesting|unique|special about me|don\'t know about me)',
+    'Strengths/Achievements': r'(strength|achievement|good at|best at|proud of)',
+}
+CLOSING_PATTERN = r'(thank you|thanks|that\'s all|that is all)'
+
+EDGE_CASES = [
+    "",
+    "My name is Sam. I am 13 years old.",
+    "myself Priya, age 12, 13years old, 7 year old, 8 yearsold, age twelve",
+    "i'm  Ravi and I AM RAVI; i am 9; my name is... Tom",
+    "like like like, likely unlike liked _like like_ like1 1like",
+    "you know, you  know, you-know, sort of, sortof, i mean, I MEAN",
+    "so...um uh hmm ah okay okay. well, right? actually basically kinda",
+    "Thanks! thank you. That's all, that is all, thankyou",
+    "I love my parents are from Delhi and my family is kind and caring",
+    "fun fact: I don't know about me. special about me? My strength is being good at and best at chess, proud of it",
+    "I hate boring, bad and terrible days but love great, wonderful ones",
+    "café naïve über Straße goal dream ambition want to aspire improve future",
+    "interest interesting interests hobby hobbies playing play player",
+    "schoolclassgradestudying familymotherfather",
+]
+
+
+def corpus():
+    # Random mixes of every rubric phrase, near-misses and punctuation
+    phrases = [p for categories in (MUST_HAVE_PHRASES, GOOD_TO_HAVE_PHRASES) for ps in categories.values() for p in ps]
+    phrases += CLOSING_PHRASES + FILLER_WORDS + sorted(POSITIVE_WORDS) + sorted(NEGATIVE_WORDS)
+    glue = [' ', ' ', ' ', ', ', '. ', '! ', '', '-', '_', '  ', "'s ", ' 13 ', ' 7 years ', ' Sam ']
+    rnd = random.Random(5)
+    texts = []
+    for _ in range(300):
+        parts = []
+        for _ in range(rnd.randint(1, 25)):
+            word = rnd.choice(phrases)
+            if rnd.random() < 0.2:
+                word = word.upper() if rnd.random() < 0.5 else word.capitalize()
+            parts.append(word + rnd.choice(glue))
+        texts.append(''.join(parts))
+    return [SAMPLE_TRANSCRIPT] + EDGE_CASES + texts
+
+
+def reference(text):
+    """Category presence and word counts the way the original app computed them"""
+    lower = text.lower()
+    found = {}
+    for patterns in (MUST_HAVE_PATTERNS, GOOD_TO_HAVE_PATTERNS):
+        for category, pattern in patterns.items():
+            found[category] = re.search(pattern, text, re.IGNORECASE) is not None
+    found['closing'] = re.search(CLOSING_PATTERN, lower) is not None
+    words = re.findall(r'\b\w+\b', lower)
+    counts = {
+        'filler': sum(len(re.findall(r'\b' + re.escape(filler) + r'\b', lower)) for filler in FILLER_WORDS),
+        'positive': sum(1 for word in words if word in POSITIVE_WORDS),
+        'negative': sum(1 for word in words if word in NEGATIVE_WORDS),
+    }
+    return found, counts
+
+
+@pytest.mark.parametrize('text', corpus())
+def test_matcher_matches_per_phrase_regexes(text):
+    hits = rubric_matcher().scan(text.lower())
+    found, counts = reference(text)
+    assert {category: hits[category] > 0 for category in found} == found
+    assert {name: hits[name] for name in counts} == counts
+
+
+def test_sample_transcript_hits():
+    hits = rubric_matcher().scan(SAMPLE_TRANSCRIPT.lower())
+    assert all(hits[category] for category in MUST_HAVE_PHRASES)
+    assert hits['closing'] == 1
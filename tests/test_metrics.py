@@ -0,0 +1,124 @@
+"""Timing breakdowns and the Prometheus exposition of scorer.metrics"""
+import re
+
+import pytest
+
+from scorer import metrics, score_transcript
+from scorer.engines import fallback_forced, force_fallback
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+CRITERIA = ['salutation', 'keywords', 'flow', 'speech_rate', 'grammar', 'vocabulary', 'clarity', 'engagement']
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    enabled = metrics.metrics_enabled()
+    forced = fallback_forced()
+    force_fallback(True)
+    metrics.enable(False)
+    metrics.reset()
+    yield
+    metrics.reset()
+    metrics.enable(enabled)
+    force_fallback(forced)
+
+
+def timings(total_ms, grammar_ms, **grammar):
+    return {
+        'total': {'wall_ms': total_ms, 'cpu_ms': total_ms},
+        'document': {},
+        'criteria': {
+            'grammar': dict({'wall_ms': grammar_ms, 'cpu_ms': grammar_ms / 2, 'backend': 'languagetool'}, **grammar),
+            'flow': {'backend': 'rules'},
+        },
+    }
+
+
+def parse(text):
+    """{series: value} and the # TYPE of every metric"""
+    values, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split()
+            assert name not in types
+            types[name] = kind
+        elif line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            values[series] = float(value)
+    return values, types
+
+
+def test_timings_cover_every_criterion():
+    result = score_transcript(SAMPLE_TRANSCRIPT, 52, timings=True)
+    sections = result['timings']['criteria']
+    assert list(sections) == CRITERIA
+    assert all(section['wall_ms'] >= 0 and section['cpu_ms'] >= 0 for section in sections.values())
+    assert sections['grammar']['backend'] == 'fallback' and sections['grammar']['fallback_reason'] == 'forced'
+    assert sections['keywords']['backend'] == 'rules' and 'fallback_reason' not in sections['keywords']
+    assert 'timings' not in score_transcript(SAMPLE_TRANSCRIPT, 52)
+
+
+def test_only_enabled_metrics_are_aggregated():
+    score_transcript(SAMPLE_TRANSCRIPT, 52)
+    assert metrics.snapshot() == {'counters': {}, 'histograms': {}}
+    metrics.enable()
+    score_transcript(SAMPLE_TRANSCRIPT, 52)
+    score_transcript(SAMPLE_TRANSCRIPT, 52, timings=True)
+    counters = metrics.snapshot()['counters']
+    assert counters['scorer_transcripts_total'] == 2
+    assert counters['scorer_fallbacks_total{criterion="grammar",reason="forced"}'] == 2
+    assert counters['scorer_criterion_backend_total{criterion="clarity",backend="rules"}'] == 2
+
+
+def test_prometheus_exposition():
+    metrics.record(timings(3, 0.2, memo_hits=4))
+    metrics.record(timings(40, 12, memo_hits=1, sentences_checked=2))
+    metrics.record(timings(20000, 7, fallback_reason='deadline'))
+    values, types = parse(metrics.render_prometheus())
+
+    assert types == {
+        'scorer_transcripts_total': 'counter',
+        'scorer_criterion_cpu_seconds_total': 'counter',
+        'scorer_criterion_backend_total': 'counter',
+        'scorer_fallbacks_total': 'counter',
+        'scorer_cache_events_total': 'counter',
+        'scorer_score_seconds': 'histogram',
+        'scorer_criterion_seconds': 'histogram',
+    }
+    assert values['scorer_transcripts_total'] == 3
+    assert values['scorer_cache_events_total{criterion="grammar",event="memo_hits"}'] == 5
+    assert values['scorer_cache_events_total{criterion="grammar",event="sentences_checked"}'] == 2
+    assert values['scorer_fallbacks_total{criterion="grammar",reason="deadline"}'] == 1
+    assert values['scorer_criterion_backend_total{criterion="flow",backend="rules"}'] == 3
+    assert values['scorer_criterion_cpu_seconds_total{criterion="grammar"}'] == pytest.approx(0.0096)
+
+    buckets = [(float(re.search(r'le="([^"]+)"', series).group(1)), value) for series, value in values.items()
+               if series.startswith('scorer_score_seconds_bucket')]
+    assert [bound for bound, _ in buckets] == list(metrics.LATENCY_BUCKETS) + [float('inf')]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    assert dict(buckets)[0.005] == 1 and dict(buckets)[0.05] == 2 and dict(buckets)[10.0] == 2
+    assert dict(buckets)[float('inf')] == values['scorer_score_seconds_count'] == 3
+    assert values['scorer_score_seconds_sum'] == pytest.approx(20.043)
+    assert values['scorer_criterion_seconds_count{criterion="grammar"}'] == 3
+    assert 'scorer_criterion_seconds_count{criterion="flow"}' not in values
+
+
+def test_large_values_keep_every_digit():
+    for _ in range(3):
+        metrics.record(timings(1234567.5, 1, memo_hits=1234567))
+    values, _ = parse(metrics.render_prometheus())
+    assert values['scorer_cache_events_total{criterion="grammar",event="memo_hits"}'] == 3703701
+    assert values['scorer_score_seconds_sum'] == pytest.approx(3703.7025)
+
+
+def test_hooks_get_every_recorded_call():
+    seen = []
+    hook = metrics.add_hook(seen.append)
+    try:
+        metrics.enable()
+        score_transcript(SAMPLE_TRANSCRIPT, 52)
+    finally:
+        metrics.remove_hook(hook)
+    score_transcript(SAMPLE_TRANSCRIPT, 52)
+    assert len(seen) == 1 and list(seen[0]['criteria']) == CRITERIA
@@ -0,0 +1,135 @@
+"""Rubric validation, the default plan and hot reload of rubric files"""
+import json
+import os
+
+import pytest
+
+from scorer import score_transcript
+from scorer.cli import main
+from scorer.engines import fallback_forced, force_fallback
+from scorer.rubric import RubricError, RubricFile, compile_rubric, default_rubric, get_plan
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+
+@pytest.fixture(autouse=True)
+def fallback():
+    forced = fallback_forced()
+    force_fallback(True)
+    yield
+    force_fallback(forced)
+
+
+def extends(**criteria):
+    return {'extends': 'default', 'criteria': criteria}
+
+
+BAD_RUBRICS = [
+    ([], "a rubric must be a mapping"),
+    ({'extends': 'strict'}, "unknown base rubric"),
+    (extends(pace={}), "unknown criteria: pace"),
+    (extends(vocabulary={'ladder': {'at_least': 5}}), "criteria.vocabulary.ladder"),
+    (extends(vocabulary={'ladder': {'at_least': [['a', 10]]}}), "criteria.vocabulary.ladder"),
+    (extends(vocabulary={'ladder': {'at_least': [[0.5, 10]], 'otherwise': 'low'}}), "criteria.vocabulary.ladder"),
+    (extends(clarity={'assessments': {'at_most': [[3, 15]], 'otherwise': "ok"}}), "criteria.clarity.assessments"),
+    (extends(speech_rate={'ranges': ['fast']}), "criteria.speech_rate.ranges[0]"),
+    (extends(speech_rate={'ranges': [{'from': 'x', 'points': 1, 'label': "x"}]}), "criteria.speech_rate.ranges[0]"),
+    (extends(speech_rate={'ranges': [{'points': 1, 'label': "x"}]}), "criteria.speech_rate.ranges[0]"),
+    (extends(grammar={'fallback_checks': 'x'}), "criteria.grammar"),
+    (extends(grammar={'fallback_checks': [{'pattern': '(', 'message': "x"}]}), "criteria.grammar.fallback_checks[0]"),
+    (extends(flow={'name_sentences': '2'}), "criteria.flow"),
+    (extends(flow={'opening_pattern': 5}), "criteria.flow"),
+    (extends(keywords={'tiers': [{'name': 'M', 'points': 4, 'cap': 20, 'categories': {'Name': 'my name is'}}]}),
+     "criteria.keywords.tiers[0].categories.Name"),
+    (extends(keywords={'tiers': [{'name': 'M', 'points': 4, 'cap': 20, 'categories': {'Name': [7]}}]}),
+     "criteria.keywords.tiers[0].categories.Name[0]"),
+    (extends(salutation=[]), "criteria.salutation"),
+    ({'extends': 'default', 'groups': [{'name': 'Clarity', 'criteria': ['clarity'], 'weight': '10'}]}, "groups[0]"),
+    ({'extends': 'default', 'groups': [{'name': 'Pace', 'criteria': ['pace']}]}, "groups[0]"),
+    ({'extends': 'default', 'groups': ['clarity']}, "groups[0]"),
+]
+
+
+@pytest.mark.parametrize('rubric, message', BAD_RUBRICS)
+def test_bad_rubrics_are_rejected(rubric, message):
+    with pytest.raises(RubricError) as e:
+        compile_rubric(rubric)
+    assert message in str(e.value)
+
+
+def test_default_plan_scores_like_score_transcript():
+    result = compile_rubric(default_rubric()).score(SAMPLE_TRANSCRIPT, 52)
+    assert result.pop('rubric')['name'] == 'default'
+    assert result == score_transcript(SAMPLE_TRANSCRIPT, 52)
+
+
+def test_plans_are_cached_by_content():
+    assert compile_rubric({'extends': 'default'}) is compile_rubric(default_rubric())
+    assert get_plan({'extends': 'default'}) is compile_rubric(default_rubric())
+
+
+def test_only_grouped_criteria_are_computed():
+    groups = [{'name': 'Clarity', 'criteria': ['clarity'], 'weight': 50}]
+    plan = compile_rubric({'extends': 'default', 'groups': groups})
+    assert plan.enabled == ['clarity']
+    result = plan.score(SAMPLE_TRANSCRIPT, 52)
+    [clarity] = result['criteria']
+    assert clarity['max'] == 15 and clarity['weight'] == 50
+    assert result['overall_score'] == round(clarity['score'] * 50 / 15, 1)
+    assert result['methods'] == {}
+
+
+def write(path, rubric):
+    # A different size changes the file's stamp even within one mtime tick
+    path.write_text(json.dumps(rubric), encoding='utf-8')
+
+
+def test_rubric_file_keeps_last_good_plan(tmp_path):
+    path = tmp_path / 'rubric.json'
+    write(path, {'extends': 'default', 'name': 'first'})
+    rubric_file = RubricFile(str(path), check_interval=0)
+    first = rubric_file.plan()
+    assert first.name == 'first' and rubric_file.error is None
+
+    write(path, extends(vocabulary={'ladder': {'at_least': 5}}))
+    assert rubric_file.plan() is first
+    assert 'criteria.vocabulary.ladder' in rubric_file.error
+
+    path.write_text('{"extends": ', encoding='utf-8')
+    assert rubric_file.plan() is first
+    assert rubric_file.error
+
+    write(path, {'extends': 'default', 'name': 'second edit'})
+    assert rubric_file.plan().name == 'second edit'
+    assert rubric_file.error is None
+
+    os.remove(path)
+    assert rubric_file.plan().name == 'second edit'
+    assert rubric_file.error
+
+
+def test_rubric_file_checks_at_most_every_interval(tmp_path):
+    path = tmp_path / 'rubric.json'
+    write(path, {'extends': 'default', 'name': 'first'})
+    rubric_file = RubricFile(str(path), check_interval=3600)
+    first = rubric_file.plan()
+    write(path, {'extends': 'default', 'name': 'edited'})
+    assert rubric_file.plan() is first
+
+
+def test_missing_or_broken_file_without_a_plan_raises(tmp_path):
+    with pytest.raises(RubricError):
+        RubricFile(str(tmp_path / 'missing.json')).plan()
+    path = tmp_path / 'rubric.json'
+    write(path, extends(flow={'name_sentences': '2'}))
+    with pytest.raises(RubricError):
+        RubricFile(str(path)).plan()
+
+
+def test_cli_reports_bad_rubrics(tmp_path, capsys):
+    path = tmp_path / 'rubric.json'
+    write(path, {'extends': 'default', 'groups': [{'name': 'Clarity', 'criteria': ['clarity'], 'weight': '10'}]})
+    assert main(['rubric', 'check', str(path)]) == 1
+    assert "bad rubric: groups[0]" in capsys.readouterr().err
+    write(path, {'extends': 'default', 'name': 'ok'})
+    assert main(['rubric', 'check', str(path)]) == 0
+    assert "ok: ok" in capsys.readouterr().out
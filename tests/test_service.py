@@ -0,0 +1,140 @@
+"""The HTTP scoring service, in-process (workers=1) on a free port"""
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+from scorer import score_transcript, service
+from scorer.engines import fallback_forced, force_fallback
+from scorer.samples import SAMPLE_TRANSCRIPT
+
+WARM = {'language_tool': 'warm', 'vader': 'warm'}
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """The engine status the service sees; warm-up itself is a no-op"""
+    status = dict(WARM)
+    forced = fallback_forced()
+    force_fallback(True)
+    monkeypatch.setattr(service, 'warm_up', lambda: True)
+    monkeypatch.setattr(service, 'engine_status', lambda: dict(status))
+    yield status
+    force_fallback(forced)
+
+
+@pytest.fixture
+def start(engines):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    started = []
+
+    def start(**options):
+        svc = asyncio.run_coroutine_threadsafe(service.ScoringService(port=0, workers=1, **options).start(),
+                                               loop).result(10)
+        asyncio.run_coroutine_threadsafe(asyncio.wait_for(svc._warm_task, 10), loop).result(10)
+        started.append(svc)
+        return svc
+
+    yield start
+    for svc in started:
+        asyncio.run_coroutine_threadsafe(svc.close(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def request(svc, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', svc.port, timeout=10)
+    try:
+        if body is not None and not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        conn.request(method, path, body=body)
+        response = conn.getresponse()
+        payload = response.read().decode('utf-8')
+        if response.getheader('Content-Type') == 'application/json':
+            payload = json.loads(payload)
+        return response.status, payload, dict(response.getheaders())
+    finally:
+        conn.close()
+
+
+def test_score_matches_score_transcript(start):
+    svc = start()
+    status, payload, _ = request(svc, 'POST', '/score', {'text': SAMPLE_TRANSCRIPT, 'duration_sec': 52})
+    assert status == 200
+    assert payload == score_transcript(SAMPLE_TRANSCRIPT, 52)
+
+
+@pytest.mark.parametrize('body, message', [
+    ('{"text": ', "invalid JSON"),
+    ([SAMPLE_TRANSCRIPT], "expected a JSON object"),
+    ({'text': '   '}, "'text' must be a non-empty string"),
+    ({'text': 42}, "'text' must be a non-empty string"),
+    ({'text': '... !!'}, "'text' has no words"),
+    ({'text': SAMPLE_TRANSCRIPT, 'duration_sec': 'long'}, "'duration_sec' must be a number"),
+])
+def test_bad_requests_get_400(start, body, message):
+    status, payload, _ = request(start(), 'POST', '/score', body)
+    assert status == 400
+    assert message in payload['error']
+
+
+def test_batch_reports_bad_records_in_place(start):
+    svc = start(chunksize=2)
+    records = [{'id': 'a', 'text': SAMPLE_TRANSCRIPT}, {'id': 'b', 'text': '?!'}, 7, 'Hello, I am Sam.']
+    status, payload, _ = request(svc, 'POST', '/score/batch', {'transcripts': records})
+    assert status == 200
+    results = payload['results']
+    assert [r['id'] for r in results] == ['a', 'b', 2, 3]
+    assert results[0]['result'] == score_transcript(SAMPLE_TRANSCRIPT)
+    assert results[1]['error'] == "ValueError: transcript has no words"
+    assert results[2]['error'] == "record must be an object or a string"
+    assert results[3]['result'] == score_transcript('Hello, I am Sam.')
+
+
+def test_routes_and_methods(start):
+    svc = start()
+    assert request(svc, 'GET', '/nowhere')[0] == 404
+    status, _, headers = request(svc, 'GET', '/score')
+    assert status == 405 and headers['Allow'] == 'POST'
+    assert request(svc, 'GET', '/healthz')[:2] == (200, {'status': 'ok'})
+
+
+def test_requests_past_max_pending_get_429(start, monkeypatch):
+    release = threading.Event()
+    entered = threading.Event()
+
+    def blocked(*args):
+        entered.set()
+        release.wait(10)
+        return {'overall_score': 0}
+
+    monkeypatch.setattr(service, '_score_one', blocked)
+    svc = start(max_pending=1, max_batch=5)
+    first = threading.Thread(target=request, args=(svc, 'POST', '/score', {'text': 'Hello there'}))
+    first.start()
+    try:
+        assert entered.wait(10)
+        status, payload, headers = request(svc, 'POST', '/score', {'text': 'Hello again'})
+        assert status == 429 and headers['Retry-After'] == '1'
+        assert request(svc, 'POST', '/score/batch', {'transcripts': ['a', 'b']})[0] == 413
+    finally:
+        release.set()
+        first.join()
+    assert request(svc, 'GET', '/readyz')[1]['rejected'] == 1
+    assert request(svc, 'POST', '/score', {'text': 'Hello again'})[0] == 200
+
+
+def test_readiness_follows_engines(start, engines):
+    svc = start()
+    status, payload, _ = request(svc, 'GET', '/readyz')
+    assert status == 200 and payload['ready'] and payload['engines'] == WARM
+    engines['language_tool'] = 'failed'
+    # Fallback results are still results; only strict services stop being ready
+    assert request(svc, 'GET', '/readyz')[0] == 200
+    strict = start(strict=True)
+    status, payload, _ = request(strict, 'GET', '/readyz')
+    assert status == 503 and payload['engines']['language_tool'] == 'failed'